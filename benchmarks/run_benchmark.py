@@ -0,0 +1,382 @@
+"""
+Offline extraction benchmark.
+
+Serves the recorded listing pages in benchmarks/corpus from a local HTTP server,
+runs ParallelURLExtractor.run_bulk against them with an in-memory stand-in for the
+Supabase client, and reports throughput, latency, peak memory, child process count
+and product-count accuracy per page kind and strategy.
+
+Usage:
+    python benchmarks/run_benchmark.py [--repeat 5] [--workers 4] [--json out.json]
+    python benchmarks/run_benchmark.py --storage sqlite --repeat 50 --workers 128
+
+With --storage sqlite the URLs are seeded into the local SQLite storage backend and
+claimed through the claim_product_page_urls RPC, exercising the full claim → extract
+→ write path and claim contention instead of a plain run_bulk.
+
+Extractor settings (USE_PLAYWRIGHT, ASYNC_PIPELINE, SNAPSHOT_PARSING, ...) are read
+from the environment as usual, so the same corpus can compare configurations.
+"""
+
+import argparse
+import functools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(BENCH_DIR, "corpus")
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+# Every fixture is served from one host; don't let per-domain politeness limits
+# turn the benchmark into a measurement of DOMAIN_MAX_IN_FLIGHT
+os.environ.setdefault("DOMAIN_MAX_IN_FLIGHT", "1000")
+
+import main  # noqa: E402
+
+
+# ----------------------------------------------------------------------------
+# Fixture server
+# ----------------------------------------------------------------------------
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        # Product links and images in the fixtures are never fetched by the extractor,
+        # but the browser may request images; answer them cheaply
+        if self.path.startswith("/images/") or self.path.startswith("/static/"):
+            self.send_response(204)
+            self.end_headers()
+            return
+        super().do_GET()
+
+
+def start_fixture_server() -> ThreadingHTTPServer:
+    handler = functools.partial(_QuietHandler, directory=CORPUS_DIR)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="FixtureServer", daemon=True).start()
+    return server
+
+
+# ----------------------------------------------------------------------------
+# In-memory database
+# ----------------------------------------------------------------------------
+
+
+class _Response:
+    def __init__(self, data: List[Dict[str, Any]]):
+        self.data = data
+
+
+class _Query:
+    """The subset of the postgrest query builder the extractor calls."""
+
+    def __init__(self, db: "BenchmarkDB", table: str):
+        self.db = db
+        self.table = table
+        self.action = "select"
+        self.payload: Any = None
+
+    def insert(self, rows, **_kwargs):
+        self.action, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows, **_kwargs):
+        self.action, self.payload = "insert", rows
+        return self
+
+    def update(self, payload, **_kwargs):
+        self.action, self.payload = "update", payload
+        return self
+
+    def select(self, *_args, **_kwargs):
+        return self
+
+    def eq(self, *_args):
+        return self
+
+    def in_(self, *_args):
+        return self
+
+    def order(self, *_args, **_kwargs):
+        return self
+
+    def range(self, *_args):
+        return self
+
+    def limit(self, *_args):
+        return self
+
+    def execute(self) -> _Response:
+        if self.action == "insert":
+            rows = self.payload if isinstance(self.payload, list) else [self.payload]
+            with self.db.lock:
+                self.db.rows.setdefault(self.table, []).extend(rows)
+            return _Response(rows)
+        if self.action == "update":
+            with self.db.lock:
+                self.db.updates += 1
+            return _Response([self.payload])
+        return _Response([])
+
+
+class BenchmarkDB:
+    """Accepts product writes and URL status updates in memory."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows: Dict[str, List[Dict[str, Any]]] = {}
+        self.updates = 0
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    def rpc(self, *_args, **_kwargs) -> _Query:
+        return _Query(self, "rpc")
+
+
+# ----------------------------------------------------------------------------
+# Resource sampling
+# ----------------------------------------------------------------------------
+
+
+def _process_tree() -> List[int]:
+    """PIDs of this process and all of its descendants."""
+    parents: Dict[int, int] = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        status = main._safe_read_text(f"/proc/{name}/status") or ""
+        for line in status.splitlines():
+            if line.startswith("PPid:"):
+                parents[int(name)] = int(line.split()[1])
+                break
+    tree = [os.getpid()]
+    index = 0
+    while index < len(tree):
+        tree.extend(pid for pid, ppid in parents.items() if ppid == tree[index])
+        index += 1
+    return tree
+
+
+def _rss_bytes(pid: int) -> int:
+    status = main._safe_read_text(f"/proc/{pid}/status") or ""
+    for line in status.splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) * 1024
+    return 0
+
+
+class ResourceSampler:
+    """Tracks peak RSS of the whole process tree and peak direct child count."""
+
+    def __init__(self, interval: float = 0.25):
+        self.interval = interval
+        self.peak_rss = 0
+        self.peak_children = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ResourceSampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                tree = _process_tree()
+                self.peak_rss = max(self.peak_rss, sum(_rss_bytes(pid) for pid in tree))
+                self.peak_children = max(self.peak_children, main._count_child_processes())
+            except Exception:
+                pass
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+# ----------------------------------------------------------------------------
+# Reporting
+# ----------------------------------------------------------------------------
+
+
+def _percentile(values: List[float], pct: int) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, -(-pct * len(ordered) // 100) - 1)]
+
+
+def _accuracy(found: int, expected: int) -> float:
+    if expected == 0:
+        return 1.0 if found == 0 else 0.0
+    return min(found, expected) / expected
+
+
+def build_report(pages: List[Dict[str, Any]], results: List[Dict[str, Any]], duration: float,
+                 sampler: ResourceSampler, rows_written: int) -> Dict[str, Any]:
+    expected_by_path = {page["path"]: page for page in pages}
+    latencies = [result.get("duration_seconds") or 0.0 for result in results]
+    kinds: Dict[str, Dict[str, Any]] = {}
+    for result in results:
+        path = (result.get("page_url") or "").split("?", 1)[0].rsplit("/", 1)[-1]
+        page = expected_by_path.get(path, {"kind": "unknown", "expected_products": 0})
+        row = kinds.setdefault(page["kind"], {
+            "expected_products": page["expected_products"],
+            "runs": 0,
+            "failures": 0,
+            "accuracy_sum": 0.0,
+            "found": [],
+            "latencies": [],
+            "strategies": {},
+        })
+        row["runs"] += 1
+        row["latencies"].append(result.get("duration_seconds") or 0.0)
+        if not result.get("success"):
+            row["failures"] += 1
+            continue
+        found = result.get("num_products", 0) or 0
+        row["found"].append(found)
+        row["accuracy_sum"] += _accuracy(found, page["expected_products"])
+        strategy = result.get("strategy") or "none"
+        row["strategies"][strategy] = row["strategies"].get(strategy, 0) + 1
+
+    per_kind = {}
+    for kind, row in kinds.items():
+        per_kind[kind] = {
+            "expected_products": row["expected_products"],
+            "runs": row["runs"],
+            "failures": row["failures"],
+            "mean_found": round(sum(row["found"]) / len(row["found"]), 2) if row["found"] else 0.0,
+            "accuracy": round(row["accuracy_sum"] / row["runs"], 3),
+            "p95_latency_s": round(_percentile(row["latencies"], 95), 3),
+            "strategies": row["strategies"],
+        }
+
+    return {
+        "urls": len(results),
+        "duration_s": round(duration, 2),
+        "urls_per_sec": round(len(results) / duration, 2) if duration > 0 else 0.0,
+        "p50_latency_s": round(_percentile(latencies, 50), 3),
+        "p95_latency_s": round(_percentile(latencies, 95), 3),
+        "peak_rss_mb": round(sampler.peak_rss / 1_048_576, 1),
+        "peak_child_processes": sampler.peak_children,
+        "rows_written": rows_written,
+        "per_kind": per_kind,
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    print("\n" + "=" * 80)
+    print("EXTRACTION BENCHMARK")
+    print("=" * 80)
+    print(f"URLs               : {report['urls']} in {report['duration_s']}s ({report['urls_per_sec']} URLs/sec)")
+    print(f"Latency (s)        : p50 {report['p50_latency_s']}, p95 {report['p95_latency_s']}")
+    print(f"Peak RSS (tree)    : {report['peak_rss_mb']} MB")
+    print(f"Peak children      : {report['peak_child_processes']}")
+    print(f"Rows written       : {report['rows_written']}")
+    print(f"\n  {'kind':<16}{'runs':>6}{'fail':>6}{'expected':>10}{'found':>8}{'accuracy':>10}{'p95 s':>8}  strategies")
+    for kind, row in sorted(report["per_kind"].items()):
+        strategies = ", ".join(f"{name}×{count}" for name, count in sorted(row["strategies"].items()))
+        print(
+            f"  {kind:<16}{row['runs']:>6}{row['failures']:>6}{row['expected_products']:>10}"
+            f"{row['mean_found']:>8}{row['accuracy']:>10.1%}{row['p95_latency_s']:>8}  {strategies}"
+        )
+
+
+# ----------------------------------------------------------------------------
+# Entry point
+# ----------------------------------------------------------------------------
+
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the extractor against the offline fixture corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="times each fixture page is submitted")
+    parser.add_argument("--workers", type=int, default=None, help="worker threads (default: autosized)")
+    parser.add_argument("--max-items", type=int, default=50)
+    parser.add_argument("--wait-seconds", type=int, default=5)
+    parser.add_argument("--storage", choices=("memory", "sqlite"), default="memory",
+                        help="in-memory write sink, or the SQLite storage backend with streamed claims")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    with open(os.path.join(CORPUS_DIR, "manifest.json"), encoding="utf-8") as handle:
+        pages = json.load(handle)["pages"]
+
+    db: Optional[BenchmarkDB] = None
+    if args.storage == "sqlite":
+        os.environ["STORAGE_BACKEND"] = "sqlite"
+        os.environ["SQLITE_STORAGE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="extractor-bench-"), "storage.sqlite3")
+    else:
+        db = BenchmarkDB()
+        main._get_supabase_client = lambda: db
+
+    server = start_fixture_server()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    # A query string keeps repeated submissions distinct in the results and the DB
+    urls = [
+        f"{base}/{page['path']}?run={run}"
+        for run in range(max(1, args.repeat))
+        for page in pages
+    ]
+    print(f"[*] Serving {len(pages)} fixture pages at {base}; submitting {len(urls)} URLs")
+
+    if db is None:
+        main._get_supabase_client().seed_urls(urls)
+
+    with ResourceSampler() as sampler:
+        start = time.time()
+        with main.ParallelURLExtractor(max_workers=args.workers) as runner:
+            if db is None:
+                worker_prefix = uuid.uuid4().hex[:8]
+
+                def claim(size: int) -> List[Dict[str, Any]]:
+                    rows, _ = main._claim_urls_batch(size, worker_id=worker_prefix)
+                    return [
+                        {
+                            "url": row["product_page_url"],
+                            "url_id": row["id"],
+                            "retry_count": row.get("retry_count") or 0,
+                            "max_items": args.max_items,
+                            "wait_seconds": args.wait_seconds,
+                        }
+                        for row in rows
+                    ]
+
+                summary = runner.run_stream(claim)
+            else:
+                summary = runner.run_bulk(urls, max_items=args.max_items, wait_seconds=args.wait_seconds)
+        duration = time.time() - start
+    server.shutdown()
+
+    if db is None:
+        client = main._get_supabase_client()
+        rows_written = len(client.table("r_product_data").select("id").execute().data)
+        statuses: Dict[str, int] = {}
+        for row in client.table("product_page_urls").select("processing_status").execute().data:
+            statuses[row["processing_status"]] = statuses.get(row["processing_status"], 0) + 1
+        print(f"[*] URL statuses after run: {statuses}")
+    else:
+        rows_written = sum(len(rows) for rows in db.rows.values())
+
+    report = build_report(pages, summary["results"], duration, sampler, rows_written)
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
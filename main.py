@@ -11,19 +11,21 @@ Design mirrors `LaunchPad/universalSearch.py` for consistency:
 - Optional JSON-LD/schema.org extraction as a fallback
 """
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from collections import deque
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import NoSuchElementException
 try:
     from webdriver_manager.chrome import ChromeDriverManager
     WEBDRIVER_MANAGER_AVAILABLE = True
 except ImportError:
     WEBDRIVER_MANAGER_AVAILABLE = False
-from urllib.parse import urlparse, urljoin
+from urllib.parse import urlparse, urljoin, quote
 import json
 import re
 import time
@@ -34,18 +36,34 @@ import random
 from datetime import datetime, timezone
 from typing import List, Dict, Any, Optional, Iterable, Union, Tuple
 import shutil
+import atexit
+import hashlib
+import math
+import sqlite3
 import asyncio
+import functools
+import itertools
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import weakref
+import multiprocessing
+import queue as queue_module
 try:
     from playwright.async_api import (
         async_playwright,
         Playwright as AsyncPlaywright,
-        Browser as AsyncBrowser,
         Page as AsyncPage,
         ElementHandle,
     )
     PLAYWRIGHT_AVAILABLE = True
 except Exception:
     PLAYWRIGHT_AVAILABLE = False
+try:
+    import lxml.html
+    from lxml.cssselect import CSSSelector
+    LXML_AVAILABLE = True
+except Exception:
+    LXML_AVAILABLE = False
 
 
 def _get_thread_id() -> str:
@@ -63,23 +81,232 @@ def _log_with_thread(message: str, prefix: str = ""):
         print(f"[{thread_id}] {message}")
 
 
+# ---------------------------------------------------------------------------
+# Network resource blocking profiles
+# ---------------------------------------------------------------------------
+
+# Third-party analytics, ad, tag-manager and session-replay hosts (subdomains match too)
+_TRACKER_DOMAINS = frozenset({
+    "google-analytics.com", "googletagmanager.com", "googletagservices.com", "doubleclick.net",
+    "googlesyndication.com", "googleadservices.com", "adservice.google.com", "facebook.net",
+    "connect.facebook.net", "analytics.tiktok.com", "bat.bing.com", "clarity.ms", "hotjar.com",
+    "hotjar.io", "segment.com", "segment.io", "mixpanel.com", "amplitude.com", "heap.io",
+    "heapanalytics.com", "fullstory.com", "mouseflow.com", "crazyegg.com", "optimizely.com",
+    "newrelic.com", "nr-data.net", "criteo.com", "criteo.net", "taboola.com", "outbrain.com",
+    "adnxs.com", "amazon-adsystem.com", "scorecardresearch.com", "quantserve.com", "quantcount.com",
+    "pinimg.com", "ads-twitter.com", "analytics.twitter.com", "snap.licdn.com", "px.ads.linkedin.com",
+    "sc-static.net", "tr.snapchat.com", "yandex.ru", "mc.yandex.ru", "onetrust.com", "cookielaw.org",
+    "trustarc.com", "intercom.io", "intercomcdn.com", "zendesk.com", "zdassets.com", "livechatinc.com",
+    "tawk.to", "klaviyo.com", "braze.com", "pushowl.com", "onesignal.com", "sentry.io",
+    "bugsnag.com", "datadoghq.com", "browser-intake-datadoghq.com", "cloudflareinsights.com",
+})
+
+# Embedded video players; never useful for listing extraction
+_VIDEO_PLAYER_PATTERNS = [
+    r"//(?:www\.)?youtube(?:-nocookie)?\.com/(?:embed|iframe_api|s/player)",
+    r"//(?:[a-z0-9-]+\.)?ytimg\.com/",
+    r"//player\.vimeo\.com/",
+    r"//(?:[a-z0-9-]+\.)?jwplayer\.com/",
+    r"//(?:[a-z0-9-]+\.)?brightcove(?:cdn)?\.(?:com|net)/",
+    r"//fast\.wistia\.(?:com|net)/",
+]
+
+_BLOCKING_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Previous default: skip images and media only
+    "minimal": {
+        "resource_types": frozenset({"image", "media"}),
+        "block_trackers": False,
+        "url_patterns": [],
+    },
+    "aggressive": {
+        "resource_types": frozenset({
+            "image", "media", "font", "stylesheet", "texttrack", "manifest", "eventsource", "websocket",
+        }),
+        "block_trackers": True,
+        "url_patterns": _VIDEO_PLAYER_PATTERNS,
+    },
+    # Only the document, scripts and data requests needed to render JSON-LD/inline state
+    "structured-data-only": {
+        "resource_types": frozenset({
+            "image", "media", "font", "stylesheet", "texttrack", "manifest", "eventsource", "websocket", "other",
+        }),
+        "block_trackers": True,
+        "url_patterns": _VIDEO_PLAYER_PATTERNS,
+    },
+}
+
+# File extensions used to approximate resource types where only URL patterns are available (Selenium/CDP)
+_RESOURCE_TYPE_URL_PATTERNS = {
+    "image": ["*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*"],
+    "media": ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*", "*.ogg*"],
+    "font": ["*.woff*", "*.ttf*", "*.otf*", "*.eot*"],
+    "stylesheet": ["*.css*"],
+}
+
+# Aborted requests never report a size, so blocked bandwidth is estimated from typical payloads
+_TYPICAL_RESOURCE_BYTES = {
+    "image": 45_000, "media": 400_000, "font": 35_000, "stylesheet": 25_000, "script": 30_000,
+    "xhr": 5_000, "fetch": 5_000, "texttrack": 5_000, "manifest": 1_000, "other": 5_000,
+}
+
+_BLOCKING_CONFIG_LOCK = threading.Lock()
+_BLOCKING_CONFIG: Optional[Dict[str, Any]] = None
+
+
+def _get_blocking_config() -> Dict[str, Any]:
+    """Parse BLOCKING_PROFILE, BLOCKING_PROFILE_OVERRIDES and BLOCKING_EXTRA_PATTERNS once."""
+    global _BLOCKING_CONFIG
+    with _BLOCKING_CONFIG_LOCK:
+        if _BLOCKING_CONFIG is not None:
+            return _BLOCKING_CONFIG
+        default = (os.getenv("BLOCKING_PROFILE") or "minimal").strip().lower()
+        if default not in _BLOCKING_PROFILES:
+            print(f"[!] Unknown BLOCKING_PROFILE '{default}', using 'minimal'")
+            default = "minimal"
+        overrides: Dict[str, str] = {}
+        raw_overrides = os.getenv("BLOCKING_PROFILE_OVERRIDES")
+        if raw_overrides:
+            try:
+                for domain, name in json.loads(raw_overrides).items():
+                    name = str(name).strip().lower()
+                    if name in _BLOCKING_PROFILES:
+                        overrides[str(domain).strip().lower().lstrip(".")] = name
+                    else:
+                        print(f"[!] Ignoring unknown blocking profile '{name}' for {domain}")
+            except (ValueError, AttributeError) as exc:
+                print(f"[!] Invalid BLOCKING_PROFILE_OVERRIDES: {exc}")
+        extra_patterns = [p.strip() for p in (os.getenv("BLOCKING_EXTRA_PATTERNS") or "").split(",") if p.strip()]
+        compiled: Dict[str, Dict[str, Any]] = {}
+        for name, profile in _BLOCKING_PROFILES.items():
+            patterns = list(profile["url_patterns"]) + extra_patterns
+            compiled[name] = dict(
+                profile,
+                name=name,
+                url_regex=re.compile("|".join(f"(?:{p})" for p in patterns), re.I) if patterns else None,
+            )
+        _BLOCKING_CONFIG = {"default": default, "overrides": overrides, "profiles": compiled}
+        return _BLOCKING_CONFIG
+
+
+def _host_suffixes(host: str) -> List[str]:
+    parts = host.split(".")
+    return [".".join(parts[i:]) for i in range(len(parts) - 1)]
+
+
+def _resolve_blocking_profile(url: str) -> Dict[str, Any]:
+    """Profile for a target page: the most specific domain override, else the default."""
+    config = _get_blocking_config()
+    host = (urlparse(url).hostname or "").lower()
+    for suffix in _host_suffixes(host):
+        name = config["overrides"].get(suffix)
+        if name:
+            return config["profiles"][name]
+    return config["profiles"][config["default"]]
+
+
+def _blocking_reason(profile: Dict[str, Any], resource_type: str, request_url: str) -> Optional[str]:
+    """Why a request should be aborted under `profile` ('type', 'tracker', 'pattern'), or None."""
+    if resource_type == "document":
+        return None
+    if resource_type in profile["resource_types"]:
+        return "type"
+    if profile["block_trackers"]:
+        host = (urlparse(request_url).hostname or "").lower()
+        if any(suffix in _TRACKER_DOMAINS for suffix in _host_suffixes(host)):
+            return "tracker"
+    regex = profile["url_regex"]
+    if regex is not None and regex.search(request_url):
+        return "pattern"
+    return None
+
+
+def _new_blocking_stats(profile: Dict[str, Any]) -> Dict[str, Any]:
+    return {"profile": profile["name"], "requests_blocked": 0, "bytes_blocked_est": 0, "bytes_loaded": 0, "by_reason": {}}
+
+
+def _count_blocked_request(stats: Dict[str, Any], reason: str, resource_type: str):
+    stats["requests_blocked"] += 1
+    stats["bytes_blocked_est"] += _TYPICAL_RESOURCE_BYTES.get(resource_type, 5_000)
+    stats["by_reason"][reason] = stats["by_reason"].get(reason, 0) + 1
+
+
+def _selenium_blocked_url_patterns(profile: Dict[str, Any]) -> List[str]:
+    """Wildcard patterns for CDP Network.setBlockedURLs approximating `profile`."""
+    patterns: List[str] = []
+    for resource_type in sorted(profile["resource_types"]):
+        patterns.extend(_RESOURCE_TYPE_URL_PATTERNS.get(resource_type, []))
+    if profile["block_trackers"]:
+        for domain in sorted(_TRACKER_DOMAINS):
+            patterns.append(f"*://{domain}/*")
+            patterns.append(f"*.{domain}/*")
+    return patterns
+
+
 class _PlaywrightAsyncManager:
-    """Singleton manager that runs Playwright async API on a dedicated event loop thread."""
+    """
+    Singleton manager that runs Playwright async API on a dedicated event loop thread.
+
+    Contexts are spread over a pool of browser shards (least-loaded first). Each shard
+    is health-checked periodically and relaunched transparently if it crashes or hangs,
+    without touching contexts that live on other shards.
+    """
 
     _instance: Optional["_PlaywrightAsyncManager"] = None
     _lock = threading.Lock()
+    _requested_shards: Optional[int] = None
+
+    _BROWSER_ARGS = [
+        "--no-sandbox",
+        "--disable-dev-shm-usage",
+        "--disable-gpu",
+        "--disable-software-rasterizer",
+        "--no-zygote",
+        "--js-flags=--max-old-space-size=128",
+        "--disable-extensions",
+        "--disable-logging",
+        "--disable-notifications",
+        "--disable-default-apps",
+        "--disable-background-timer-throttling",
+        "--disable-backgrounding-occluded-windows",
+        "--disable-renderer-backgrounding",
+        "--disable-features=TranslateUI",
+        "--disable-ipc-flooding-protection",
+        "--disk-cache-size=0",
+        "--media-cache-size=0",
+    ]
 
     def __init__(self):
         if not PLAYWRIGHT_AVAILABLE:
             raise RuntimeError("Playwright is not installed or failed to import")
         self.loop = asyncio.new_event_loop()
         self._startup_complete = threading.Event()
+        self._startup_error: Optional[BaseException] = None
         self._playwright: Optional[AsyncPlaywright] = None
-        self._browser: Optional[AsyncBrowser] = None
+        shard_count = self._requested_shards or _get_env_int("PLAYWRIGHT_BROWSERS", 1)
+        self._shards: List[Dict[str, Any]] = [
+            {"index": i, "browser": None, "contexts": 0, "launches": 0, "relaunch": None}
+            for i in range(max(1, shard_count))
+        ]
+        self._health_interval = _get_env_int("PLAYWRIGHT_HEALTH_INTERVAL", 30)
+        self._health_timeout = _get_env_int("PLAYWRIGHT_HEALTH_TIMEOUT", 10)
+        self._browser_args = list(self._BROWSER_ARGS)
+        renderer_limit = _get_env_int("PLAYWRIGHT_RENDERER_LIMIT", 0)
+        if renderer_limit > 0:
+            self._browser_args.append(f"--renderer-process-limit={renderer_limit}")
+        # Warm pool of reset contexts/pages; only touched from the loop thread
+        self._pool_enabled = _parse_bool_env("CONTEXT_POOL", True)
+        self._pool_max_idle = max(0, _get_env_int("CONTEXT_POOL_SIZE", 16))
+        self._pool_warm = min(self._pool_max_idle, max(0, _get_env_int("CONTEXT_POOL_WARM", 2)))
+        self._recycle_heap_bytes = max(0, _get_env_int("CONTEXT_RECYCLE_HEAP_MB", 96)) * 1024 * 1024
+        self._idle_pages: List[Tuple[Any, Any]] = []
+        self._warming = 0
+        self._pool_stats = {"created": 0, "reused": 0, "recycled": 0, "reset_failures": 0}
         self._thread = threading.Thread(target=self._run_loop, daemon=True, name="PlaywrightAsyncLoop")
         self._thread.start()
         # Wait for startup to finish
         self._startup_complete.wait()
+        if self._startup_error is not None:
+            raise RuntimeError(f"Playwright startup failed: {self._startup_error}")
 
     @classmethod
     def instance(cls) -> "_PlaywrightAsyncManager":
@@ -88,37 +315,129 @@ class _PlaywrightAsyncManager:
                 cls._instance = cls()
         return cls._instance
 
+    @classmethod
+    def configure_shards(cls, shards: int):
+        """Set the browser shard count used when the singleton is first created."""
+        with cls._lock:
+            if cls._instance is None:
+                cls._requested_shards = max(1, shards)
+
     def _run_loop(self):
         asyncio.set_event_loop(self.loop)
-        self.loop.run_until_complete(self._startup())
+        try:
+            self.loop.run_until_complete(self._startup())
+        except BaseException as exc:
+            self._startup_error = exc
         self._startup_complete.set()
-        self.loop.run_forever()
+        if self._startup_error is None:
+            self.loop.run_forever()
 
     async def _startup(self):
         self._playwright = await async_playwright().start()
-        self._browser = await self._playwright.chromium.launch(
-            headless=True,
-            args=[
-                "--no-sandbox",
-                "--disable-dev-shm-usage",
-                "--disable-gpu",
-                "--disable-software-rasterizer",
-                "--no-zygote",
-                "--renderer-process-limit=1",
-                "--js-flags=--max-old-space-size=128",
-                "--disable-extensions",
-                "--disable-logging",
-                "--disable-notifications",
-                "--disable-default-apps",
-                "--disable-background-timer-throttling",
-                "--disable-backgrounding-occluded-windows",
-                "--disable-renderer-backgrounding",
-                "--disable-features=TranslateUI",
-                "--disable-ipc-flooding-protection",
-                "--disk-cache-size=0",
-                "--media-cache-size=0",
-            ],
-        )
+        for shard in self._shards:
+            try:
+                await self._launch_shard(shard)
+            except Exception as exc:
+                print(f"[!] Failed to launch browser shard {shard['index']}: {exc}")
+        if not any(shard["browser"] is not None for shard in self._shards):
+            raise RuntimeError("no browser shard could be launched")
+        if self._health_interval > 0:
+            self.loop.create_task(self._health_check_loop())
+        if self._pool_enabled and self._pool_warm:
+            self._schedule_warmup(self._pool_warm)
+
+    async def _launch_shard(self, shard: Dict[str, Any]):
+        assert self._playwright is not None
+        browser = await self._playwright.chromium.launch(headless=True, args=self._browser_args)
+        shard["browser"] = browser
+        shard["contexts"] = 0
+        shard["launches"] += 1
+        browser.on("disconnected", lambda _browser: self._on_shard_disconnected(shard, _browser))
+
+    def _on_shard_disconnected(self, shard: Dict[str, Any], browser):
+        if shard["browser"] is not browser:
+            return
+        print(f"[!] Browser shard {shard['index']} disconnected; relaunching")
+        shard["browser"] = None
+        shard["contexts"] = 0
+        self._idle_pages = [entry for entry in self._idle_pages if entry[0]._pool_state["browser"] is not browser]
+        self.loop.create_task(self._relaunch_shard(shard))
+
+    async def _relaunch_shard(self, shard: Dict[str, Any]):
+        """Relaunch `shard`, or wait for the relaunch already in progress."""
+        if shard["relaunch"] is None:
+            shard["relaunch"] = self.loop.create_task(self._relaunch_shard_once(shard))
+        # Shielded so one cancelled waiter does not abort the relaunch for the others
+        await asyncio.shield(shard["relaunch"])
+
+    async def _relaunch_shard_once(self, shard: Dict[str, Any]):
+        try:
+            old_browser, shard["browser"] = shard["browser"], None
+            if old_browser is not None:
+                try:
+                    await asyncio.wait_for(old_browser.close(), timeout=self._health_timeout)
+                except Exception:
+                    pass
+            await self._launch_shard(shard)
+            print(f"[✓] Browser shard {shard['index']} relaunched (launch #{shard['launches']})")
+        except Exception as exc:
+            print(f"[!] Failed to relaunch browser shard {shard['index']}: {exc}")
+        finally:
+            shard["relaunch"] = None
+
+    async def _shard_is_healthy(self, shard: Dict[str, Any]) -> bool:
+        browser = shard["browser"]
+        if browser is None or not browser.is_connected():
+            return False
+        try:
+            session = await asyncio.wait_for(browser.new_browser_cdp_session(), timeout=self._health_timeout)
+            try:
+                await asyncio.wait_for(session.send("Browser.getVersion"), timeout=self._health_timeout)
+            finally:
+                try:
+                    await session.detach()
+                except Exception:
+                    pass
+            return True
+        except Exception:
+            return False
+
+    async def _health_check_loop(self):
+        while True:
+            await asyncio.sleep(self._health_interval)
+            for shard in self._shards:
+                if shard["relaunch"] is not None:
+                    continue
+                if not await self._shard_is_healthy(shard):
+                    print(f"[!] Browser shard {shard['index']} failed health check; relaunching")
+                    await self._relaunch_shard(shard)
+
+    async def _pick_shard(self) -> Dict[str, Any]:
+        """Least-loaded connected shard; relaunches one if every shard is down."""
+        live = [s for s in self._shards if s["browser"] is not None and s["browser"].is_connected()]
+        if not live:
+            # Join a relaunch that is already running before starting another
+            relaunching = [s for s in self._shards if s["relaunch"] is not None]
+            shard = relaunching[0] if relaunching else min(self._shards, key=lambda s: s["launches"])
+            await self._relaunch_shard(shard)
+            if shard["browser"] is None:
+                raise RuntimeError("no browser shard available")
+            return shard
+        return min(live, key=lambda s: s["contexts"])
+
+    def shard_stats(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "index": s["index"],
+                "connected": bool(s["browser"] is not None and s["browser"].is_connected()),
+                "contexts": s["contexts"],
+                "launches": s["launches"],
+            }
+            for s in self._shards
+        ]
+
+    def pool_stats(self) -> Dict[str, int]:
+        return dict(self._pool_stats, idle=len(self._idle_pages))
 
     def run_sync(self, coro):
         return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
@@ -126,13 +445,152 @@ class _PlaywrightAsyncManager:
     def new_context_page(self):
         return self.run_sync(self._new_context_page())
 
+    def acquire_context_page(self):
+        return self.run_sync(self._acquire_context_page())
+
+    def release_context_page(self, context, page):
+        self.run_sync(self._release_context_page(context, page))
+
+    def prewarm(self, count: int):
+        """Top the idle pool up to `count` pages in the background (thread-safe)."""
+        self.loop.call_soon_threadsafe(self._schedule_warmup, count)
+
+    def _schedule_warmup(self, count: int):
+        if not self._pool_enabled:
+            return
+        target = min(max(count, self._pool_warm), self._pool_max_idle)
+        missing = target - len(self._idle_pages) - self._warming
+        for _ in range(max(0, missing)):
+            self._warming += 1
+            self.loop.create_task(self._warm_one())
+
+    async def _warm_one(self):
+        try:
+            context, page = await self._new_context_page()
+            if len(self._idle_pages) < self._pool_max_idle:
+                self._idle_pages.append((context, page))
+            else:
+                await self._discard_context(context)
+        except Exception as exc:
+            print(f"[!] Failed to pre-warm browser context: {exc}")
+        finally:
+            self._warming -= 1
+
+    async def _acquire_context_page(self):
+        """Hand out a warm, reset page when one is idle; otherwise create a fresh one."""
+        if not self._pool_enabled:
+            return await self._new_context_page()
+        while self._idle_pages:
+            context, page = self._idle_pages.pop()
+            state = context._pool_state
+            browser = state["browser"]
+            if state["shard"]["browser"] is browser and browser.is_connected() and not page.is_closed():
+                self._pool_stats["reused"] += 1
+                self._schedule_warmup(self._pool_warm)
+                return context, page
+            await self._discard_context(context)
+        self._schedule_warmup(self._pool_warm)
+        return await self._new_context_page()
+
+    async def _release_context_page(self, context, page):
+        """Reset a page for the next job, or close it when it is broken or its heap has grown too much."""
+        if not self._pool_enabled or len(self._idle_pages) >= self._pool_max_idle:
+            await self._discard_context(context)
+            return
+        state = getattr(context, "_pool_state", None)
+        if state is None or state["shard"]["browser"] is not state["browser"]:
+            await self._discard_context(context)
+            return
+        try:
+            await asyncio.wait_for(self._reset_page(context, page), timeout=self._health_timeout)
+        except Exception:
+            self._pool_stats["reset_failures"] += 1
+            await self._discard_context(context)
+            return
+        # Measured on about:blank after a GC, so only memory the reset left behind counts
+        if self._recycle_heap_bytes:
+            heap = await self._heap_used(state, collect_garbage=True)
+            if heap is not None and heap - state["baseline_heap"] > self._recycle_heap_bytes:
+                self._pool_stats["recycled"] += 1
+                await self._discard_context(context)
+                return
+        state["uses"] += 1
+        self._idle_pages.append((context, page))
+
+    async def _reset_page(self, context, page):
+        """Wipe cookies, storage and extra tabs, and park the page on about:blank."""
+        parsed = urlparse(page.url or "")
+        cdp = context._pool_state["cdp"]
+        if cdp is not None and parsed.scheme in ("http", "https"):
+            await cdp.send(
+                "Storage.clearDataForOrigin",
+                {"origin": f"{parsed.scheme}://{parsed.netloc}", "storageTypes": "all"},
+            )
+        await context.clear_cookies()
+        for extra in list(context.pages):
+            if extra is not page:
+                await extra.close()
+        await page.goto("about:blank", wait_until="commit")
+
+    async def _heap_used(self, state: Dict[str, Any], collect_garbage: bool = False) -> Optional[int]:
+        cdp = state["cdp"]
+        if cdp is None:
+            return None
+        if collect_garbage:
+            try:
+                await asyncio.wait_for(cdp.send("HeapProfiler.collectGarbage"), timeout=self._health_timeout)
+            except Exception:
+                pass
+        try:
+            usage = await asyncio.wait_for(cdp.send("Runtime.getHeapUsage"), timeout=self._health_timeout)
+            return int(usage.get("usedSize", 0))
+        except Exception:
+            return None
+
+    async def _discard_context(self, context):
+        try:
+            await context.close()
+        except Exception:
+            pass
+
     async def _new_context_page(self):
-        assert self._browser is not None
-        context = await self._browser.new_context(ignore_https_errors=True)
+        shard = await self._pick_shard()
+        browser = shard["browser"]
+        context = await browser.new_context(ignore_https_errors=True)
+        try:
+            await context.add_init_script(_INFLIGHT_TRACKER_JS)
+        except Exception:
+            pass
+        shard["contexts"] += 1
+        self._pool_stats["created"] += 1
+
+        def on_close(_context):
+            # Contexts of a crashed browser are already accounted for by the relaunch
+            if shard["browser"] is browser:
+                shard["contexts"] = max(0, shard["contexts"] - 1)
+
+        context.on("close", on_close)
+
+        # Per-context bookkeeping: shard ownership, heap baseline (warm pool) and the
+        # blocking profile/counters of the job currently using the page
+        profile = _resolve_blocking_profile("")
+        state: Dict[str, Any] = {
+            "shard": shard,
+            "browser": browser,
+            "cdp": None,
+            "baseline_heap": 0,
+            "uses": 0,
+            "blocking_profile": profile,
+            "blocking": _new_blocking_stats(profile),
+        }
+        context._pool_state = state  # type: ignore[attr-defined]
 
         async def route_handler(route):
-            resource_type = route.request.resource_type
-            if resource_type in ("image", "media"):
+            request = route.request
+            resource_type = request.resource_type
+            reason = _blocking_reason(state["blocking_profile"], resource_type, request.url)
+            if reason:
+                _count_blocked_request(state["blocking"], reason, resource_type)
                 await route.abort()
             else:
                 await route.continue_()
@@ -143,10 +601,42 @@ class _PlaywrightAsyncManager:
 
         page = await context.new_page()
         await page.set_viewport_size({"width": 1920, "height": 1080})
-        await page.set_default_navigation_timeout(30000)
-        await page.set_default_timeout(10000)
+        page.set_default_navigation_timeout(30000)
+        page.set_default_timeout(10000)
+
+        try:
+            cdp = await context.new_cdp_session(page)
+
+            def on_loading_finished(event):
+                state["blocking"]["bytes_loaded"] += int(event.get("encodedDataLength") or 0)
+
+            cdp.on("Network.loadingFinished", on_loading_finished)
+            await cdp.send("Network.enable")
+            state["cdp"] = cdp
+            if self._pool_enabled:
+                state["baseline_heap"] = await self._heap_used(state, collect_garbage=True) or 0
+        except Exception:
+            state["cdp"] = None
         return context, page
 
+    @staticmethod
+    def start_job(context, url: str):
+        """Select the blocking profile for `url` and reset the page's per-job counters."""
+        state = getattr(context, "_pool_state", None)
+        if state is None:
+            return
+        profile = _resolve_blocking_profile(url)
+        state["blocking_profile"] = profile
+        state["blocking"] = _new_blocking_stats(profile)
+
+    @staticmethod
+    def blocking_stats(context) -> Optional[Dict[str, Any]]:
+        state = getattr(context, "_pool_state", None)
+        if state is None:
+            return None
+        stats = state["blocking"]
+        return dict(stats, by_reason=dict(stats["by_reason"]))
+
     def close_context(self, context):
         self.run_sync(context.close())
 
@@ -166,8 +656,20 @@ _SUPABASE_CLIENT_LOCK = threading.Lock()
 _SUPABASE_CLIENT: Optional[Client] = None
 
 
+def _storage_backend() -> str:
+    """Configured storage backend: "supabase" (default) or "sqlite"."""
+    return (os.getenv("STORAGE_BACKEND") or "supabase").strip().lower()
+
+
 def _get_supabase_client() -> Optional[Client]:
     global _SUPABASE_CLIENT
+    if _storage_backend() == "sqlite":
+        with _SUPABASE_CLIENT_LOCK:
+            if _SUPABASE_CLIENT is None:
+                path = os.getenv("SQLITE_STORAGE_PATH", "/tmp/extractor_storage.sqlite3")
+                _SUPABASE_CLIENT = _SQLiteStorageClient(path)
+                print(f"[✓] Using local SQLite storage at {path}\n")
+            return _SUPABASE_CLIENT
     if not SUPABASE_AVAILABLE or not SUPABASE_KEY:
         return None
     with _SUPABASE_CLIENT_LOCK:
@@ -181,13 +683,1733 @@ def _get_supabase_client() -> Optional[Client]:
         return _SUPABASE_CLIENT
 
 
+# Local stand-in for the hosted database (STORAGE_BACKEND=sqlite)
+_SQLITE_STORAGE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS product_page_urls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_type_id INTEGER,
+    product_page_url TEXT NOT NULL,
+    processing_status TEXT NOT NULL DEFAULT 'pending',
+    retry_count INTEGER NOT NULL DEFAULT 0,
+    claimed_at TEXT,
+    claimed_by TEXT
+);
+CREATE INDEX IF NOT EXISTS product_page_urls_status_idx ON product_page_urls (processing_status, id);
+CREATE TABLE IF NOT EXISTS r_product_data (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_url TEXT,
+    product_name TEXT,
+    platform_url TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS r_product_data_url_idx ON r_product_data (product_url);
+"""
+
+_SQL_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class _SQLiteResponse:
+    def __init__(self, data: List[Dict[str, Any]]):
+        self.data = data
+
+
+class _SQLiteQuery:
+    """The subset of the postgrest query builder used by this module, executed against SQLite."""
+
+    def __init__(self, client: "_SQLiteStorageClient", table: str):
+        self._client = client
+        self._table = client._identifier(table)
+        self._op = "select"
+        self._columns = "*"
+        self._payload: Any = None
+        self._on_conflict: List[str] = []
+        self._default_to_null = True
+        self._filters: List[Tuple[str, List[Any]]] = []
+        self._order: Optional[str] = None
+        self._limit: Optional[int] = None
+        self._offset: Optional[int] = None
+
+    def select(self, columns: str = "*", **_kwargs) -> "_SQLiteQuery":
+        self._columns = columns
+        return self
+
+    def insert(self, rows: Union[Dict[str, Any], List[Dict[str, Any]]], **_kwargs) -> "_SQLiteQuery":
+        self._op, self._payload = "insert", rows
+        return self
+
+    def upsert(
+        self,
+        rows: Union[Dict[str, Any], List[Dict[str, Any]]],
+        on_conflict: str = "id",
+        default_to_null: bool = True,
+        **_kwargs,
+    ) -> "_SQLiteQuery":
+        self._op, self._payload = "upsert", rows
+        self._on_conflict = [column.strip() for column in on_conflict.split(",") if column.strip()]
+        self._default_to_null = default_to_null
+        return self
+
+    def update(self, payload: Dict[str, Any], **_kwargs) -> "_SQLiteQuery":
+        self._op, self._payload = "update", payload
+        return self
+
+    def eq(self, column: str, value: Any) -> "_SQLiteQuery":
+        self._filters.append((f'"{self._client._identifier(column)}" IS ?', [value]))
+        return self
+
+    def in_(self, column: str, values: Iterable[Any]) -> "_SQLiteQuery":
+        values = list(values)
+        if not values:
+            self._filters.append(("0", []))
+        else:
+            self._filters.append((f'"{self._client._identifier(column)}" IN ({",".join("?" * len(values))})', values))
+        return self
+
+    def order(self, column: str, desc: bool = False, **_kwargs) -> "_SQLiteQuery":
+        self._order = f'"{self._client._identifier(column)}" {"DESC" if desc else "ASC"}'
+        return self
+
+    def limit(self, count: int, **_kwargs) -> "_SQLiteQuery":
+        self._limit = count
+        return self
+
+    def range(self, start: int, end: int, **_kwargs) -> "_SQLiteQuery":
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    def _where(self) -> Tuple[str, List[Any]]:
+        if not self._filters:
+            return "", []
+        params: List[Any] = []
+        for _, values in self._filters:
+            params.extend(self._client._to_sql(value) for value in values)
+        return " WHERE " + " AND ".join(sql for sql, _ in self._filters), params
+
+    def execute(self) -> _SQLiteResponse:
+        if self._op == "select":
+            return _SQLiteResponse(self._client._select(self._table, self._columns, *self._where(),
+                                                         self._order, self._limit, self._offset))
+        rows = self._payload if isinstance(self._payload, list) else [self._payload]
+        if self._op == "insert":
+            return _SQLiteResponse(self._client._insert(self._table, rows))
+        if self._op == "upsert":
+            return _SQLiteResponse(
+                self._client._upsert(self._table, rows, self._on_conflict, self._default_to_null)
+            )
+        return _SQLiteResponse(self._client._update(self._table, self._payload, *self._where()))
+
+
+class _SQLiteRPC:
+    def __init__(self, client: "_SQLiteStorageClient", name: str, params: Dict[str, Any]):
+        self._client = client
+        self._name = name
+        self._params = params
+
+    def execute(self) -> _SQLiteResponse:
+        if self._name != "claim_product_page_urls":
+            raise ValueError(f"Unknown RPC {self._name!r} for the SQLite storage backend")
+        return _SQLiteResponse(self._client._claim_product_page_urls(**self._params))
+
+
+class _SQLiteStorageClient:
+    """
+    In-process stand-in for the Supabase client, backed by one SQLite file.
+
+    Emulates the product_page_urls and r_product_data tables, the query-builder calls
+    this module makes (select/insert/upsert/update with eq/in_/order/limit/range) and
+    the claim_product_page_urls RPC, so the full claim → extract → write path can be
+    load-tested locally. Columns written that the table lacks are added on the fly.
+    Every write runs in a BEGIN IMMEDIATE transaction, so claims are atomic across
+    threads and processes sharing the file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._columns: Dict[str, set] = {}
+        self._conn().executescript(_SQLITE_STORAGE_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; write paths open explicit transactions
+            conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    @staticmethod
+    def _identifier(name: str) -> str:
+        name = name.strip()
+        if not _SQL_IDENTIFIER.match(name):
+            raise ValueError(f"Invalid column or table name: {name!r}")
+        return name
+
+    @staticmethod
+    def _column_list(names: List[str]) -> str:
+        return ", ".join(f'"{name}"' for name in names)
+
+    @staticmethod
+    def _assignments(names: List[str]) -> str:
+        return ", ".join(f'"{name}" = ?' for name in names)
+
+    @staticmethod
+    def _to_sql(value: Any) -> Any:
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        return value
+
+    def _table_columns(self, conn: sqlite3.Connection, table: str) -> set:
+        columns = self._columns.get(table)
+        if columns is None:
+            columns = {row["name"] for row in conn.execute(f'PRAGMA table_info("{table}")')}
+            self._columns[table] = columns
+        return columns
+
+    def _ensure_columns(self, conn: sqlite3.Connection, table: str, names: Iterable[str]):
+        with self._schema_lock:
+            columns = self._table_columns(conn, table)
+            for name in names:
+                if name in columns:
+                    continue
+                try:
+                    conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{self._identifier(name)}"')
+                except sqlite3.OperationalError as exc:
+                    # Another process added it first
+                    if "duplicate column" not in str(exc):
+                        raise
+                columns.add(name)
+
+    def _select(self, table: str, columns: str, where: str, params: List[Any],
+                order: Optional[str] = None, limit: Optional[int] = None, offset: Optional[int] = None,
+                conn: Optional[sqlite3.Connection] = None) -> List[Dict[str, Any]]:
+        conn = conn or self._conn()
+        if columns.strip() == "*":
+            projection = "*"
+        else:
+            wanted = [self._identifier(column) for column in columns.split(",") if column.strip()]
+            # Columns never written yet read as NULL, as they would from a nullable column
+            self._ensure_columns(conn, table, wanted)
+            projection = self._column_list(wanted)
+        sql = f'SELECT {projection} FROM "{table}"{where}'
+        if order:
+            sql += f" ORDER BY {order}"
+        if limit is not None or offset is not None:
+            sql += f" LIMIT {int(limit) if limit is not None else -1} OFFSET {int(offset or 0)}"
+        return [dict(row) for row in conn.execute(sql, params)]
+
+    def _insert_row(self, conn: sqlite3.Connection, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        names = [self._identifier(name) for name in row]
+        self._ensure_columns(conn, table, names)
+        if names:
+            cursor = conn.execute(
+                f'INSERT INTO "{table}" ({self._column_list(names)}) VALUES ({",".join("?" * len(names))})',
+                [self._to_sql(row[name]) for name in names],
+            )
+        else:
+            cursor = conn.execute(f'INSERT INTO "{table}" DEFAULT VALUES')
+        return dict(row, id=cursor.lastrowid)
+
+    def _insert(self, table: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        with self._write() as conn:
+            return [self._insert_row(conn, table, row) for row in rows]
+
+    def _upsert(self, table: str, rows: List[Dict[str, Any]], keys: List[str],
+                default_to_null: bool) -> List[Dict[str, Any]]:
+        all_names = list(dict.fromkeys(name for row in rows for name in row))
+        saved: List[Dict[str, Any]] = []
+        with self._write() as conn:
+            self._ensure_columns(conn, table, all_names)
+            for row in rows:
+                if default_to_null:
+                    row = {name: row.get(name) for name in all_names}
+                where = " AND ".join(f'"{self._identifier(key)}" IS ?' for key in keys)
+                existing = conn.execute(
+                    f'SELECT id FROM "{table}" WHERE {where} LIMIT 1', [self._to_sql(row.get(key)) for key in keys]
+                ).fetchone()
+                if existing is None:
+                    saved.append(self._insert_row(conn, table, row))
+                    continue
+                names = [name for name in row if name not in keys]
+                if names:
+                    conn.execute(
+                        f'UPDATE "{table}" SET {self._assignments(names)} WHERE id = ?',
+                        [self._to_sql(row[name]) for name in names] + [existing["id"]],
+                    )
+                saved.append(dict(row, id=existing["id"]))
+        return saved
+
+    def _update(self, table: str, payload: Dict[str, Any], where: str, params: List[Any]) -> List[Dict[str, Any]]:
+        names = [self._identifier(name) for name in payload]
+        with self._write() as conn:
+            self._ensure_columns(conn, table, names)
+            ids = [row["id"] for row in conn.execute(f'SELECT id FROM "{table}"{where}', params)]
+            if not ids or not names:
+                return []
+            id_list = ",".join("?" * len(ids))
+            conn.execute(
+                f'UPDATE "{table}" SET {self._assignments(names)} WHERE id IN ({id_list})',
+                [self._to_sql(payload[name]) for name in names] + ids,
+            )
+            return self._select(table, "*", f" WHERE id IN ({id_list})", ids, conn=conn)
+
+    def _claim_product_page_urls(
+        self,
+        p_batch_size: int,
+        p_worker_id: str,
+        p_status_filters: Optional[List[str]] = None,
+        p_min_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        statuses = p_status_filters or ["pending", "retrying"]
+        with self._write() as conn:
+            ids = [row["id"] for row in conn.execute(
+                f'SELECT id FROM product_page_urls WHERE processing_status IN ({",".join("?" * len(statuses))}) '
+                "AND (? IS NULL OR id >= ?) ORDER BY id LIMIT ?",
+                statuses + [p_min_id, p_min_id, max(0, int(p_batch_size))],
+            )]
+            if not ids:
+                return []
+            id_list = ",".join("?" * len(ids))
+            conn.execute(
+                f"UPDATE product_page_urls SET processing_status = 'processing', claimed_by = ?, claimed_at = ? "
+                f"WHERE id IN ({id_list})",
+                [p_worker_id, datetime.now(timezone.utc).isoformat()] + ids,
+            )
+            return self._select("product_page_urls", "*", f" WHERE id IN ({id_list})", ids, order="id", conn=conn)
+
+    def table(self, name: str) -> _SQLiteQuery:
+        return _SQLiteQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> _SQLiteRPC:
+        return _SQLiteRPC(self, name, params or {})
+
+    def seed_urls(self, urls: Iterable[str], product_type_id: Optional[int] = None) -> int:
+        """Queue `urls` as pending product_page_urls rows; returns how many were added."""
+        rows = [{"product_page_url": url, "product_type_id": product_type_id} for url in urls]
+        return len(self._insert("product_page_urls", rows))
+
+
+# HTTP client for the browserless fast path
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+# urllib3 transparently decodes brotli responses when either package is present
+try:
+    import brotli  # type: ignore  # noqa: F401
+    BROTLI_AVAILABLE = True
+except ImportError:
+    try:
+        import brotlicffi  # type: ignore  # noqa: F401
+        BROTLI_AVAILABLE = True
+    except ImportError:
+        BROTLI_AVAILABLE = False
+
+_BROWSER_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+)
+
+
+class _HTTPFetcher:
+    """Pooled keep-alive HTTP client shared by all workers for plain HTML fetches."""
+
+    def __init__(self):
+        if not REQUESTS_AVAILABLE:
+            raise RuntimeError("requests is not installed or failed to import")
+        self.timeout = float(_get_env_int("HTTP_FAST_PATH_TIMEOUT", 10))
+        self.max_bytes = _get_env_int("HTTP_FAST_PATH_MAX_BYTES", 5_000_000)
+        adapter = HTTPAdapter(
+            pool_connections=_get_env_int("HTTP_POOL_HOSTS", 64),
+            pool_maxsize=_get_env_int("HTTP_POOL_MAXSIZE", 32),
+            max_retries=0,
+        )
+        self._session = requests.Session()
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.headers.update({
+            "User-Agent": _BROWSER_USER_AGENT,
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": "en-US,en;q=0.9",
+            "Accept-Encoding": "gzip, deflate, br" if BROTLI_AVAILABLE else "gzip, deflate",
+            "Connection": "keep-alive",
+        })
+
+    def fetch_html(self, url: str) -> Optional[str]:
+        """GET `url` and return its HTML body, or None for non-HTML, oversized or failed responses."""
+        try:
+            with self._session.get(url, timeout=self.timeout, stream=True, allow_redirects=True) as response:
+                if response.status_code != 200:
+                    return None
+                content_type = (response.headers.get("Content-Type") or "").lower()
+                if content_type and "html" not in content_type:
+                    return None
+                chunks: List[bytes] = []
+                size = 0
+                for chunk in response.iter_content(chunk_size=65536):
+                    size += len(chunk)
+                    if self.max_bytes and size > self.max_bytes:
+                        return None
+                    chunks.append(chunk)
+                body = b"".join(chunks)
+                encoding = response.encoding if "charset=" in content_type else "utf-8"
+                return body.decode(encoding or "utf-8", errors="replace")
+        except Exception as exc:
+            _log_with_thread(f"HTTP fetch failed for {url}: {exc}", "[!]")
+            return None
+
+
+_HTTP_FETCHER_LOCK = threading.Lock()
+_HTTP_FETCHER: Optional[_HTTPFetcher] = None
+
+
+def _get_http_fetcher() -> _HTTPFetcher:
+    global _HTTP_FETCHER
+    with _HTTP_FETCHER_LOCK:
+        if _HTTP_FETCHER is None:
+            _HTTP_FETCHER = _HTTPFetcher()
+        return _HTTP_FETCHER
+
+
+class _ExtractionRecipeStore:
+    """
+    Persistent per-domain record of the strategy and selectors that last produced
+    valid products. Recipes expire after `ttl_seconds` so layouts get re-learned.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int, save_interval: int = 30):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._recipes: Dict[str, Dict[str, Any]] = {}
+        self._domain_stats: Dict[str, Dict[str, int]] = {}
+        self._stats = {"hits": 0, "misses": 0, "learned": 0, "expired": 0}
+        self._dirty = False
+        self._last_save = time.time()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+            recipes = data.get("recipes", {}) if isinstance(data, dict) else {}
+            for domain, recipe in recipes.items():
+                if isinstance(recipe, dict) and recipe.get("strategy"):
+                    self._recipes[domain] = recipe
+            print(f"[*] Loaded {len(self._recipes)} extraction recipes from {self.path}")
+        except FileNotFoundError:
+            pass
+        except Exception as exc:
+            print(f"[!] Failed to load extraction recipes from {self.path}: {exc}")
+
+    def _bump(self, domain: str, key: str):
+        self._stats[key] += 1
+        domain_stats = self._domain_stats.setdefault(domain, {"hits": 0, "misses": 0, "learned": 0})
+        if key in domain_stats:
+            domain_stats[key] += 1
+
+    def get(self, domain: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            recipe = self._recipes.get(domain)
+            if recipe is None:
+                return None
+            if self.ttl_seconds > 0 and time.time() - recipe.get("learned_at", 0) > self.ttl_seconds:
+                del self._recipes[domain]
+                self._stats["expired"] += 1
+                self._dirty = True
+                return None
+            return dict(recipe)
+
+    def learn(self, domain: str, recipe: Dict[str, Any]):
+        entry = dict(recipe)
+        entry["learned_at"] = time.time()
+        with self._lock:
+            self._recipes[domain] = entry
+            self._bump(domain, "learned")
+            self._dirty = True
+        self._maybe_save()
+
+    def record_hit(self, domain: str):
+        with self._lock:
+            self._bump(domain, "hits")
+
+    def record_miss(self, domain: str):
+        with self._lock:
+            self._bump(domain, "misses")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+            stats["domains"] = len(self._recipes)
+            stats["per_domain"] = {d: dict(v) for d, v in self._domain_stats.items()}
+            return stats
+
+    def _maybe_save(self):
+        if time.time() - self._last_save >= self.save_interval:
+            self.flush()
+
+    def flush(self):
+        """Write recipes to disk if anything changed since the last save."""
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                payload = {"recipes": dict(self._recipes)}
+                self._dirty = False
+                self._last_save = time.time()
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as handle:
+                    json.dump(payload, handle)
+                os.replace(tmp_path, self.path)
+            except Exception as exc:
+                print(f"[!] Failed to save extraction recipes to {self.path}: {exc}")
+                with self._lock:
+                    self._dirty = True
+
+
+_RECIPE_STORE_LOCK = threading.Lock()
+_RECIPE_STORE: Optional[_ExtractionRecipeStore] = None
+
+
+def _get_recipe_store() -> Optional[_ExtractionRecipeStore]:
+    """Return the process-wide recipe store, or None when RECIPE_CACHE is disabled."""
+    global _RECIPE_STORE
+    if not _parse_bool_env("RECIPE_CACHE", False):
+        return None
+    with _RECIPE_STORE_LOCK:
+        if _RECIPE_STORE is None:
+            _RECIPE_STORE = _ExtractionRecipeStore(
+                os.getenv("RECIPE_CACHE_PATH", "/tmp/extraction_recipes.json"),
+                ttl_seconds=_get_env_int("RECIPE_TTL_SECONDS", 86400),
+                save_interval=_get_env_int("RECIPE_CACHE_SAVE_INTERVAL", 30),
+            )
+        return _RECIPE_STORE
+
+
+# Columns whose change makes a product row worth re-writing
+_CHANGE_HASH_COLUMNS = ("product_name", "current_price", "in_stock", "rating", "reviews")
+
+
+def _product_content_hash(row: Dict[str, Any]) -> str:
+    def norm(column: str, value: Any) -> Any:
+        if value is None:
+            return None
+        if column in ("current_price", "rating"):
+            try:
+                return f"{float(value):.2f}"
+            except (TypeError, ValueError):
+                return str(value)
+        if column == "reviews":
+            try:
+                return int(float(value))
+            except (TypeError, ValueError):
+                return str(value)
+        if column == "in_stock":
+            return bool(value)
+        return " ".join(str(value).split())
+
+    payload = json.dumps([norm(col, row.get(col)) for col in _CHANGE_HASH_COLUMNS], separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class _ProductChangeIndex:
+    """
+    On-disk (SQLite) map of product_url -> content hash of the last row written to
+    r_product_data. Rows whose hash is unchanged are skipped before they reach
+    Supabase. A background reconciliation pass periodically re-reads the oldest
+    verified entries from the database and corrects or drops drifted ones.
+    """
+
+    def __init__(self, path: str, reconcile_seconds: int, reconcile_batch: int):
+        self.path = path
+        self.reconcile_seconds = reconcile_seconds
+        self.reconcile_batch = max(1, reconcile_batch)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS product_hashes ("
+            "product_url TEXT PRIMARY KEY, content_hash TEXT NOT NULL, "
+            "written_at REAL NOT NULL, verified_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS product_hashes_verified ON product_hashes (verified_at)")
+        self._last_reconcile = time.time()
+        self._reconciling = False
+        self._stats = {
+            "checked": 0, "unchanged": 0, "changed": 0, "new": 0,
+            "reconcile_runs": 0, "reconcile_checked": 0, "reconcile_fixed": 0,
+        }
+
+    def filter_changed(self, rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """Return (rows that are new or changed, number of unchanged rows skipped)."""
+        if not rows:
+            return rows, 0
+        urls = [row["product_url"] for row in rows]
+        known: Dict[str, str] = {}
+        with self._lock:
+            for start in range(0, len(urls), 500):
+                part = urls[start: start + 500]
+                placeholders = ",".join("?" * len(part))
+                cursor = self._conn.execute(
+                    f"SELECT product_url, content_hash FROM product_hashes WHERE product_url IN ({placeholders})", part
+                )
+                known.update(cursor.fetchall())
+        changed: List[Dict[str, Any]] = []
+        unchanged = new = 0
+        for row in rows:
+            previous = known.get(row["product_url"])
+            if previous is None:
+                new += 1
+                changed.append(row)
+            elif previous == _product_content_hash(row):
+                unchanged += 1
+            else:
+                changed.append(row)
+        with self._lock:
+            self._stats["checked"] += len(rows)
+            self._stats["unchanged"] += unchanged
+            self._stats["new"] += new
+            self._stats["changed"] += len(changed) - new
+        self._maybe_reconcile()
+        return changed, unchanged
+
+    def record(self, rows: List[Dict[str, Any]]):
+        """Remember the hashes of rows that were just written successfully."""
+        if not rows:
+            return
+        now = time.time()
+        values = [(row["product_url"], _product_content_hash(row), now, now) for row in rows if row.get("product_url")]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO product_hashes (product_url, content_hash, written_at, verified_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(product_url) DO UPDATE SET content_hash = excluded.content_hash, "
+                "written_at = excluded.written_at, verified_at = excluded.verified_at",
+                values,
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["write_savings"] = (stats["unchanged"] / stats["checked"]) if stats["checked"] else 0.0
+        return stats
+
+    def _maybe_reconcile(self):
+        if self.reconcile_seconds <= 0:
+            return
+        with self._lock:
+            if self._reconciling or time.time() - self._last_reconcile < self.reconcile_seconds:
+                return
+            self._reconciling = True
+        threading.Thread(target=self.reconcile, daemon=True, name="ChangeIndexReconcile").start()
+
+    def reconcile(self):
+        """Re-check the least recently verified entries against r_product_data."""
+        try:
+            client = _get_supabase_client()
+            if client is None:
+                return
+            with self._lock:
+                urls = [r[0] for r in self._conn.execute(
+                    "SELECT product_url FROM product_hashes ORDER BY verified_at LIMIT ?", (self.reconcile_batch,)
+                )]
+            if not urls:
+                return
+            db_hashes: Dict[str, str] = {}
+            for start in range(0, len(urls), 100):
+                response = (
+                    client.table("r_product_data")
+                    .select(",".join(("product_url",) + _CHANGE_HASH_COLUMNS))
+                    .in_("product_url", urls[start: start + 100])
+                    .execute()
+                )
+                for db_row in response.data or []:
+                    db_hashes[db_row["product_url"]] = _product_content_hash(db_row)
+            now = time.time()
+            fixed = 0
+            with self._lock:
+                known = dict(self._conn.execute(
+                    f"SELECT product_url, content_hash FROM product_hashes WHERE product_url IN ({','.join('?' * len(urls))})",
+                    urls,
+                ).fetchall())
+                for url in urls:
+                    db_hash = db_hashes.get(url)
+                    if db_hash is None:
+                        # Row vanished from the database: forget it so the next scrape rewrites it
+                        self._conn.execute("DELETE FROM product_hashes WHERE product_url = ?", (url,))
+                        fixed += 1
+                    elif db_hash != known.get(url):
+                        self._conn.execute(
+                            "UPDATE product_hashes SET content_hash = ?, verified_at = ? WHERE product_url = ?",
+                            (db_hash, now, url),
+                        )
+                        fixed += 1
+                    else:
+                        self._conn.execute("UPDATE product_hashes SET verified_at = ? WHERE product_url = ?", (now, url))
+                self._stats["reconcile_runs"] += 1
+                self._stats["reconcile_checked"] += len(urls)
+                self._stats["reconcile_fixed"] += fixed
+            if fixed:
+                print(f"[*] Change index reconciliation corrected {fixed}/{len(urls)} entries")
+        except Exception as exc:
+            print(f"[!] Change index reconciliation failed: {exc}")
+        finally:
+            with self._lock:
+                self._reconciling = False
+                self._last_reconcile = time.time()
+
+
+_CHANGE_INDEX_LOCK = threading.Lock()
+_CHANGE_INDEX: Optional[_ProductChangeIndex] = None
+
+
+def _get_change_index() -> Optional[_ProductChangeIndex]:
+    """Return the process-wide change index, or None when CHANGE_DETECTION is disabled."""
+    global _CHANGE_INDEX
+    if not _parse_bool_env("CHANGE_DETECTION", False):
+        return None
+    with _CHANGE_INDEX_LOCK:
+        if _CHANGE_INDEX is None:
+            _CHANGE_INDEX = _ProductChangeIndex(
+                os.getenv("CHANGE_INDEX_PATH", "/tmp/product_hashes.sqlite3"),
+                reconcile_seconds=_get_env_int("CHANGE_INDEX_RECONCILE_SECONDS", 3600),
+                reconcile_batch=_get_env_int("CHANGE_INDEX_RECONCILE_BATCH", 500),
+            )
+        return _CHANGE_INDEX
+
+
+def _insert_product_row(client, row: Dict[str, Any]) -> Tuple[bool, bool]:
+    """Insert one row; returns (saved, written). Duplicates count as saved but not written."""
+    try:
+        # If product_url has unique constraint, duplicates will be handled by database
+        response = client.table("r_product_data").insert(row).execute()
+        return bool(response.data), bool(response.data)
+    except Exception as e:
+        error_msg = str(e).lower()
+        # Handle duplicate key errors gracefully (if product_url has unique constraint)
+        if "duplicate" in error_msg or "unique" in error_msg or "constraint" in error_msg:
+            # Product already exists, count as successful
+            return True, False
+        _log_with_thread(f"Error saving product: {e}", "[✗]")
+        return False, False
+
+
+def _bulk_insert_chunk(client, chunk: List[Dict[str, Any]]) -> List[bool]:
+    """Insert `chunk` in one request and return per-row stored flags; raises if the statement fails."""
+    response = client.table("r_product_data").insert(chunk).execute()
+    returned = response.data or []
+    if len(returned) >= len(chunk):
+        return [True] * len(chunk)
+    keys = {(r.get("platform_url"), r.get("product_url")) for r in returned}
+    return [(r["platform_url"], r["product_url"]) in keys for r in chunk]
+
+
+def _known_product_rows(client, chunk: List[Dict[str, Any]]) -> Optional[List[bool]]:
+    """
+    Per-row flag for rows that would hit the unique key: already stored, or repeating an
+    earlier row of the same chunk. None when the existing-key lookup fails.
+    """
+    urls = list(dict.fromkeys(row.get("product_url") for row in chunk))
+    existing: set = set()
+    for values in _batch_by_encoded_length(urls, _KEY_LOOKUP_QUERY_BUDGET, len(chunk)):
+        try:
+            response = client.table("r_product_data").select("platform_url,product_url").in_("product_url", values).execute()
+        except Exception as exc:
+            _log_with_thread(f"Existing-key lookup failed ({exc})", "[!]")
+            return None
+        existing.update((r.get("platform_url"), r.get("product_url")) for r in (response.data or []))
+    known: List[bool] = []
+    for row in chunk:
+        key = (row.get("platform_url"), row.get("product_url"))
+        known.append(key in existing)
+        existing.add(key)
+    return known
+
+
+def _insert_product_rows(
+    client, rows: List[Dict[str, Any]], chunk_size: int, written_out: Optional[List[bool]] = None
+) -> List[bool]:
+    """
+    Insert rows into r_product_data with one request per `chunk_size` rows and return a
+    per-row saved flag. When a chunk fails on a duplicate key (one duplicate aborts the
+    statement), already-known rows are looked up and the rest re-inserted in one
+    request; only if that fails too is the chunk retried row by row. Rows rejected as
+    duplicates count as saved; `written_out`, when given, gets a per-row flag that is
+    only True for rows the database actually stored.
+    """
+    chunk_size = max(1, chunk_size)
+    outcomes: List[bool] = []
+    written: List[bool] = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start: start + chunk_size]
+        if len(chunk) > 1:
+            try:
+                chunk_saved = _bulk_insert_chunk(client, chunk)
+                outcomes.extend(chunk_saved)
+                written.extend(chunk_saved)
+                continue
+            except Exception as e:
+                error_msg = str(e).lower()
+                duplicate = "duplicate" in error_msg or "unique" in error_msg or "constraint" in error_msg
+                known = _known_product_rows(client, chunk) if duplicate else None
+                if known is not None and any(known):
+                    fresh = [row for row, seen in zip(chunk, known) if not seen]
+                    try:
+                        fresh_stored = iter(_bulk_insert_chunk(client, fresh) if fresh else [])
+                        chunk_written = [False if seen else next(fresh_stored) for seen in known]
+                        outcomes.extend(True if seen else stored for seen, stored in zip(known, chunk_written))
+                        written.extend(chunk_written)
+                        continue
+                    except Exception as retry_exc:
+                        e = retry_exc
+                _log_with_thread(f"Bulk insert of {len(chunk)} rows failed ({e}); retrying row by row", "[!]")
+        for row in chunk:
+            saved, stored = _insert_product_row(client, row)
+            outcomes.append(saved)
+            written.append(stored)
+    if written_out is not None:
+        written_out.extend(written)
+    return outcomes
+
+
+# The existing-key lookup is a GET whose `in.(...)` filter carries full product
+# URLs; keep its query string well under common PostgREST/proxy URL limits.
+_KEY_LOOKUP_QUERY_BUDGET = 4000
+
+
+def _batch_by_encoded_length(values: List[Any], budget: int, max_count: int) -> Iterable[List[Any]]:
+    """Split `values` into batches whose URL-encoded size stays within `budget` characters."""
+    batch: List[Any] = []
+    size = 0
+    for value in values:
+        encoded = len(quote(str(value), safe="")) + 3  # separator and quoting
+        if batch and (size + encoded > budget or len(batch) >= max_count):
+            yield batch
+            batch, size = [], 0
+        batch.append(value)
+        size += encoded
+    if batch:
+        yield batch
+
+
+def _upsert_product_rows(
+    client,
+    rows: List[Dict[str, Any]],
+    chunk_size: int,
+    key_columns: List[str],
+    update_columns: List[str],
+    written_out: Optional[List[bool]] = None,
+) -> Tuple[List[bool], int, int]:
+    """
+    Idempotent write keyed on `key_columns`: rows whose key already exists only get
+    `update_columns` refreshed, new rows are written in full. Existing keys are looked
+    up first so the result can report (per-row saved flags, inserted, updated).
+    `written_out` gets per-row flags as in _insert_product_rows.
+    """
+    chunk_size = max(1, chunk_size)
+    key_of = lambda row: tuple(row.get(col) for col in key_columns)  # noqa: E731
+    # One statement cannot touch the same key twice; keep the last row per key
+    latest: Dict[Tuple[Any, ...], int] = {key_of(row): idx for idx, row in enumerate(rows)}
+    outcomes = [False] * len(rows)
+    written = [False] * len(rows)
+
+    unique_idx = sorted(latest.values())
+    existing: set = set()
+    lookup_col = key_columns[-1]
+    lookup_values = list(dict.fromkeys(rows[i].get(lookup_col) for i in unique_idx))
+    for values in _batch_by_encoded_length(lookup_values, _KEY_LOOKUP_QUERY_BUDGET, chunk_size):
+        try:
+            response = client.table("r_product_data").select(",".join(key_columns)).in_(lookup_col, values).execute()
+            existing.update(key_of(r) for r in (response.data or []))
+        except Exception as exc:
+            _log_with_thread(f"Existing-key lookup failed ({exc}); counting all rows as inserts", "[!]")
+
+    # The insert tuple is checked for NOT NULL before the conflict is detected, so
+    # updates still carry the required name/URL columns alongside the refreshed ones
+    update_fields = list(dict.fromkeys(key_columns + ["platform_url", "product_name", "product_url"] + update_columns))
+    new_idx = [i for i in unique_idx if key_of(rows[i]) not in existing]
+    old_idx = [i for i in unique_idx if key_of(rows[i]) in existing]
+    inserted = updated = 0
+    for indices, is_update in ((new_idx, False), (old_idx, True)):
+        for start in range(0, len(indices), chunk_size):
+            chunk_idx = indices[start: start + chunk_size]
+            if is_update:
+                payload = [{col: rows[i].get(col) for col in update_fields} for i in chunk_idx]
+            else:
+                payload = [rows[i] for i in chunk_idx]
+            try:
+                client.table("r_product_data").upsert(
+                    payload, on_conflict=",".join(key_columns), default_to_null=False
+                ).execute()
+                chunk_saved = [True] * len(chunk_idx)
+                chunk_written = chunk_saved
+            except Exception as e:
+                # e.g. no unique constraint on the key: fall back to plain inserts
+                _log_with_thread(f"Upsert of {len(chunk_idx)} rows failed ({e}); falling back to insert", "[!]")
+                chunk_written = []
+                chunk_saved = _insert_product_rows(client, [rows[i] for i in chunk_idx], chunk_size, chunk_written)
+            for i, saved, stored in zip(chunk_idx, chunk_saved, chunk_written):
+                outcomes[i] = saved
+                written[i] = stored
+                if stored:
+                    if is_update:
+                        updated += 1
+                    else:
+                        inserted += 1
+    # Rows superseded by a later row for the same key share its outcome
+    for idx, row in enumerate(rows):
+        outcomes[idx] = outcomes[latest[key_of(row)]]
+        written[idx] = written[latest[key_of(row)]]
+    if written_out is not None:
+        written_out.extend(written)
+    return outcomes, inserted, updated
+
+
+def _write_product_rows(client, rows: List[Dict[str, Any]], chunk_size: int) -> Tuple[List[bool], int, int]:
+    """Persist rows per DB_WRITE_MODE (insert or upsert); returns (per-row saved flags, inserted, updated)."""
+    written: List[bool] = []
+    outcomes, inserted, updated = _write_product_rows_by_mode(client, rows, chunk_size, written)
+    change_index = _get_change_index()
+    if change_index is not None:
+        # Duplicate-rejected rows were not stored; their new content must not read as written
+        change_index.record([row for row, stored in zip(rows, written) if stored])
+    return outcomes, inserted, updated
+
+
+def _write_product_rows_by_mode(
+    client, rows: List[Dict[str, Any]], chunk_size: int, written_out: List[bool]
+) -> Tuple[List[bool], int, int]:
+    if (os.getenv("DB_WRITE_MODE") or "insert").strip().lower() == "upsert":
+        key_columns = [c.strip() for c in (os.getenv("DB_UPSERT_KEY") or "product_url").split(",") if c.strip()]
+        update_columns = [
+            c.strip()
+            for c in (os.getenv("DB_UPSERT_UPDATE_COLUMNS") or "current_price,original_price,in_stock,rating,reviews").split(",")
+            if c.strip()
+        ]
+        return _upsert_product_rows(client, rows, chunk_size, key_columns, update_columns, written_out)
+    outcomes = _insert_product_rows(client, rows, chunk_size, written_out)
+    return outcomes, sum(written_out), 0
+
+
+class _WriteBehindQueue:
+    """
+    Bounded queue that takes product rows and URL status updates off the scraping
+    workers. Writer threads coalesce rows from many jobs into large inserts and group
+    status updates with identical payloads into one `id IN (...)` update. A URL's status
+    is only written once all of its rows are stored, with `products_saved` set to the
+    number that actually landed.
+    """
+
+    _TIMESTAMP_FIELDS = ("updated_at", "processed_at")
+
+    def __init__(self, threads: int, max_rows: int, batch_rows: int, flush_seconds: float, chunk_size: int):
+        self.max_rows = max(1, max_rows)
+        self.batch_rows = max(1, batch_rows)
+        self.flush_seconds = max(0.0, flush_seconds)
+        self.chunk_size = chunk_size
+        self._cond = threading.Condition()
+        self._rows: List[Tuple[Optional[int], Dict[str, Any]]] = []
+        self._statuses: List[Tuple[int, Dict[str, Any]]] = []
+        self._pending_rows: Dict[int, int] = {}
+        self._saved_by_url: Dict[int, int] = {}
+        self._closed = False
+        self._stats = {"rows_saved": 0, "rows_failed": 0, "rows_inserted": 0, "rows_updated": 0, "statuses": 0, "row_batches": 0, "status_batches": 0, "blocked_puts": 0}
+        self._threads = [
+            threading.Thread(target=self._writer_loop, daemon=True, name=f"WriteBehind-{i}")
+            for i in range(max(1, threads))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit_rows(self, url_id: Optional[int], rows: List[Dict[str, Any]], already_saved: int = 0) -> int:
+        """
+        Queue rows for insert, blocking while the queue is full (backpressure).
+        `already_saved` counts rows of this URL that need no write (e.g. unchanged).
+        """
+        if already_saved and url_id is not None:
+            with self._cond:
+                self._saved_by_url[url_id] = self._saved_by_url.get(url_id, 0) + already_saved
+        if not rows:
+            return 0
+        with self._cond:
+            if len(self._rows) >= self.max_rows and not self._closed:
+                self._stats["blocked_puts"] += 1
+                _log_with_thread(f"Write-behind queue full ({len(self._rows)} rows); waiting for writers", "[!]")
+                while len(self._rows) >= self.max_rows and not self._closed:
+                    self._cond.wait()
+            if self._closed:
+                raise RuntimeError("write-behind queue is closed")
+            self._rows.extend((url_id, row) for row in rows)
+            if url_id is not None:
+                self._pending_rows[url_id] = self._pending_rows.get(url_id, 0) + len(rows)
+                self._saved_by_url.setdefault(url_id, 0)
+            self._cond.notify_all()
+        return len(rows)
+
+    def submit_status(self, url_id: int, payload: Dict[str, Any]):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("write-behind queue is closed")
+            self._statuses.append((url_id, dict(payload)))
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return dict(self._stats, queued_rows=len(self._rows), queued_statuses=len(self._statuses))
+
+    def close(self, timeout: Optional[float] = None):
+        """Stop accepting work, write everything still queued and join the writers."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _ready_statuses(self) -> List[Tuple[int, Dict[str, Any]]]:
+        ready = [s for s in self._statuses if not self._pending_rows.get(s[0])]
+        if ready:
+            self._statuses = [s for s in self._statuses if self._pending_rows.get(s[0])]
+        return ready
+
+    def _take_batch(self):
+        """Wait for a full batch or the flush interval; None once closed and drained."""
+        with self._cond:
+            deadline: Optional[float] = None
+            while not self._closed and len(self._rows) < self.batch_rows:
+                if not (self._rows or self._statuses):
+                    deadline = None
+                    self._cond.wait()
+                    continue
+                if deadline is None:
+                    # Give other jobs a moment to add rows to this batch
+                    deadline = time.time() + self.flush_seconds
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            rows, self._rows = self._rows[: self.batch_rows], self._rows[self.batch_rows:]
+            statuses = self._ready_statuses()
+            if not rows and not statuses:
+                if self._closed and not self._rows and not self._statuses:
+                    return None
+                # Remaining statuses wait on rows another writer is still inserting
+                self._cond.wait(0.05)
+            self._cond.notify_all()
+            return rows, statuses
+
+    def _writer_loop(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            rows, statuses = batch
+            if not rows and not statuses:
+                continue
+            try:
+                self._write_batch(rows, statuses)
+            except Exception as exc:
+                _log_with_thread(f"Write-behind batch failed: {exc}", "[✗]")
+
+    def _write_batch(self, rows: List[Tuple[Optional[int], Dict[str, Any]]], statuses: List[Tuple[int, Dict[str, Any]]]):
+        client = _get_supabase_client()
+        if rows:
+            try:
+                outcomes, inserted, updated = (
+                    _write_product_rows(client, [row for _, row in rows], self.chunk_size) if client else ([], 0, 0)
+                )
+            except Exception as exc:
+                _log_with_thread(f"Write-behind insert failed: {exc}", "[✗]")
+                outcomes, inserted, updated = [], 0, 0
+            outcomes += [False] * (len(rows) - len(outcomes))
+            with self._cond:
+                self._stats["row_batches"] += 1
+                self._stats["rows_inserted"] += inserted
+                self._stats["rows_updated"] += updated
+                for (url_id, _), saved in zip(rows, outcomes):
+                    self._stats["rows_saved" if saved else "rows_failed"] += 1
+                    if url_id is None:
+                        continue
+                    if saved:
+                        self._saved_by_url[url_id] = self._saved_by_url.get(url_id, 0) + 1
+                    self._pending_rows[url_id] -= 1
+                    if self._pending_rows[url_id] <= 0:
+                        del self._pending_rows[url_id]
+                self._cond.notify_all()
+        if statuses and client:
+            self._write_statuses(client, statuses)
+
+    def _write_statuses(self, client, statuses: List[Tuple[int, Dict[str, Any]]]):
+        now = datetime.now(timezone.utc).isoformat()
+        groups: Dict[str, Tuple[Dict[str, Any], List[int]]] = {}
+        with self._cond:
+            for url_id, payload in statuses:
+                saved = self._saved_by_url.pop(url_id, None)
+                if "products_saved" in payload and saved is not None:
+                    payload["products_saved"] = saved
+                for field in self._TIMESTAMP_FIELDS:
+                    if field in payload:
+                        payload[field] = now
+                key = json.dumps(payload, sort_keys=True, default=str)
+                groups.setdefault(key, (payload, []))[1].append(url_id)
+            self._stats["statuses"] += len(statuses)
+            self._stats["status_batches"] += len(groups)
+        for payload, ids in groups.values():
+            try:
+                client.table("product_page_urls").update(payload).in_("id", ids).execute()
+            except Exception as exc:
+                print(f"[!] Failed to update URL status for ids={ids}: {exc}")
+
+
+_WRITE_QUEUE_LOCK = threading.Lock()
+_WRITE_QUEUE: Optional[_WriteBehindQueue] = None
+
+
+def _get_write_queue() -> Optional[_WriteBehindQueue]:
+    """Return the process-wide write-behind queue, or None when WRITE_BEHIND is disabled."""
+    global _WRITE_QUEUE
+    if not _parse_bool_env("WRITE_BEHIND", False):
+        return None
+    with _WRITE_QUEUE_LOCK:
+        if _WRITE_QUEUE is None:
+            _WRITE_QUEUE = _WriteBehindQueue(
+                threads=_get_env_int("WRITE_BEHIND_THREADS", 2),
+                max_rows=_get_env_int("WRITE_BEHIND_MAX_ROWS", 5000),
+                batch_rows=_get_env_int("WRITE_BEHIND_BATCH_ROWS", 500),
+                flush_seconds=_get_env_int("WRITE_BEHIND_FLUSH_MS", 250) / 1000.0,
+                chunk_size=_get_env_int("DB_INSERT_CHUNK_SIZE", 100),
+            )
+            atexit.register(_shutdown_write_queue)
+        return _WRITE_QUEUE
+
+
+def _shutdown_write_queue() -> None:
+    """Flush and stop the write-behind queue; a later submit starts a fresh one."""
+    global _WRITE_QUEUE
+    with _WRITE_QUEUE_LOCK:
+        queue, _WRITE_QUEUE = _WRITE_QUEUE, None
+    if queue is not None:
+        queue.close()
+        stats = queue.stats()
+        print(
+            f"[✓] Write-behind queue flushed: {stats['rows_saved']} rows saved "
+            f"({stats['rows_inserted']} inserted, {stats['rows_updated']} updated), {stats['rows_failed']} failed, "
+            f"{stats['statuses']} URL statuses in {stats['status_batches']} updates"
+        )
+
+
+# In-page card extraction program. Mirrors the per-field selector walk of
+# UniversalProductExtractor._extract_fields_from_card but runs for every card in
+# a single script evaluation; values are returned raw and normalized in Python.
+_CARD_FIELDS_JS = r"""
+(payload) => {
+    const sets = payload.sets;
+    const clean = (value) => {
+        if (value === null || value === undefined) return null;
+        const txt = String(value).replace(/\s+/g, ' ').trim();
+        return txt || null;
+    };
+    const attr = (el, name) => {
+        if (!el) return null;
+        if (name === 'href' || name === 'src') {
+            const prop = el[name];
+            if (typeof prop === 'string' && prop) return prop;
+        }
+        return el.getAttribute(name);
+    };
+    const text = (el) => {
+        const value = el.innerText;
+        return typeof value === 'string' ? value : (el.textContent || '');
+    };
+    const first = (root, sel) => {
+        try { return root.querySelector(sel); } catch (e) { return null; }
+    };
+    // Walk `field` selectors in priority order; `read` returns the element's value or null
+    const pick = (card, field, read, matched) => {
+        for (const sel of sets[field]) {
+            const el = first(card, sel);
+            if (!el) continue;
+            const value = read(el);
+            if (value) { matched[field] = sel; return value; }
+        }
+        return null;
+    };
+    const readText = (el) => clean(attr(el, 'content') || attr(el, 'aria-label') || text(el));
+    const readAttr = (name) => (el) => attr(el, name);
+    const extract = (card) => {
+        const raw = {};
+        const matched = {};
+
+        let title = null;
+        const anchor = first(card, 'a[href]');
+        if (anchor) title = clean(attr(anchor, 'title') || text(anchor));
+        if (!title) {
+            const img = first(card, 'img');
+            if (img) title = clean(attr(img, 'alt'));
+        }
+        raw.title = title || pick(card, 'title', readText, matched);
+
+        raw.link = pick(card, 'link', (el) => attr(el, 'href') || attr(el, 'content'), matched);
+        raw.image = pick(card, 'image', (el) => attr(el, 'src') || attr(el, 'data-src')
+            || attr(el, 'data-original') || attr(el, 'data-srcset') || attr(el, 'content'), matched);
+        raw.raw_price = pick(card, 'price', (el) => clean(attr(el, 'content') || text(el)), matched);
+        raw.currency = pick(card, 'currency', (el) => clean(attr(el, 'content') || text(el)), matched);
+        raw.card_text = raw.raw_price ? null : text(card);
+        raw.rating = pick(card, 'rating', readText, matched);
+        raw.reviews = pick(card, 'reviews', readText, matched);
+        raw.availability = pick(card, 'availability', readText, matched);
+        raw.brand = pick(card, 'brand', readText, matched) || pick(card, 'brand', readAttr('data-brand'), matched);
+        raw.sku = pick(card, 'sku', readText, matched) || pick(card, 'sku', readAttr('data-sku'), matched)
+            || pick(card, 'sku', readAttr('data-product-sku'), matched);
+        raw.description = pick(card, 'description', (el) => {
+            const desc = clean(attr(el, 'content') || text(el));
+            return desc && desc.length > 15 ? desc : null;
+        }, matched);
+        raw._matched = matched;
+        return raw;
+    };
+    return payload.cards.map((card) => {
+        try { return card ? extract(card) : null; } catch (e) { return null; }
+    });
+}
+"""
+
+
+# Clicks the first `limit` visible matches of each selector; returns how many were clicked.
+_CLICK_VISIBLE_JS = r"""
+(payload) => {
+    const visible = (el) => {
+        const style = window.getComputedStyle(el);
+        if (style.visibility === 'hidden' || style.display === 'none') return false;
+        const rect = el.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0;
+    };
+    let clicked = 0;
+    for (const sel of payload.selectors) {
+        let els;
+        try { els = Array.from(document.querySelectorAll(sel)).slice(0, payload.limit); } catch (e) { continue; }
+        for (const el of els) {
+            if (!visible(el)) continue;
+            if (payload.requireEnabled && el.disabled) continue;
+            try { el.click(); clicked += 1; } catch (e) {}
+        }
+    }
+    return clicked;
+}
+"""
+
+
+# Counts product cards with the first card selector that matches, in priority order
+# (as DOM extraction picks them), ignoring matches nested inside another match.
+_COUNT_CARDS_JS = r"""
+(payload) => {
+    for (const sel of payload.selectors) {
+        let els;
+        try { els = document.querySelectorAll(sel); } catch (e) { continue; }
+        if (!els.length) continue;
+        let count = 0;
+        for (const el of els) {
+            const parent = el.parentElement;
+            if (!parent || !parent.closest(sel)) count += 1;
+        }
+        return count;
+    }
+    return 0;
+}
+"""
+
+
+# Visibility, blacklisted-ancestor flag and bounding box for a list of elements,
+# answered in one evaluation instead of is_displayed() plus a parent walk each.
+# The ancestor walk mirrors UniversalProductExtractor._is_within_blacklisted_section.
+_ELEMENT_PROFILE_JS = r"""
+(payload) => {
+    const blacklist = new Set(payload.blacklist.map((t) => t.toLowerCase()));
+    return payload.elements.map((el) => {
+        if (!el || !el.getBoundingClientRect) return null;
+        const rect = el.getBoundingClientRect();
+        const style = window.getComputedStyle(el);
+        const visible = rect.width > 0 && rect.height > 0
+            && style.visibility !== 'hidden' && style.display !== 'none' && style.opacity !== '0';
+        let blacklisted = false;
+        let node = el;
+        for (let depth = 0; depth < 6 && node; depth++) {
+            const tag = (node.tagName || '').toLowerCase();
+            if (blacklist.has(tag)) { blacklisted = true; break; }
+            if (tag === 'body' || tag === 'html') break;
+            node = node.parentElement;
+        }
+        return {
+            visible,
+            blacklisted,
+            rect: {x: rect.x, y: rect.y, width: rect.width, height: rect.height},
+        };
+    });
+}
+"""
+
+
+# Matches a whole selector set in one pass: queries the compiled union of the set
+# and returns the visible nodes themselves in `elements`, with `data[i]` listing the
+# indices of the member selectors elements[i] matches (and, when containers are
+# given, which containers hold it). `data` is null when a selector is invalid.
+_SELECTOR_SET_MATCH_JS = r"""
+(payload) => {
+    let nodes;
+    try { nodes = document.querySelectorAll(payload.combined); } catch (e) { return {elements: [], data: null}; }
+    const visible = (el) => {
+        const rect = el.getBoundingClientRect();
+        if (!(rect.width > 0 && rect.height > 0)) return false;
+        const style = window.getComputedStyle(el);
+        return style.visibility !== 'hidden' && style.display !== 'none' && style.opacity !== '0';
+    };
+    const containers = payload.containers || [];
+    const elements = [];
+    const hits = [];
+    nodes.forEach((el) => {
+        let within = [];
+        if (containers.length) {
+            containers.forEach((cont, ci) => {
+                if (cont && cont !== el && cont.contains(el)) within.push(ci);
+            });
+            if (!within.length) return;
+        }
+        if (!visible(el)) return;
+        const matches = [];
+        payload.selectors.forEach((sel, si) => {
+            try { if (el.matches(sel)) matches.push(si); } catch (e) {}
+        });
+        if (matches.length) {
+            elements.push(el);
+            hits.push({matches, within});
+        }
+    });
+    return {elements, data: hits};
+}
+"""
+
+_JSONLD_SCRIPTS_XPATH = "//script[@type='application/ld+json']"
+_INLINE_JSON_SCRIPTS_XPATH = "//script[@type='application/json' or @type='text/json' or @type='text/plain']"
+_INLINE_JSON_MAX_CHARS = 500_000
+_MICRODATA_PRODUCT_SELECTOR = '[itemscope][itemtype*="Product" i]'
+
+# Collects every cheap structured-data source of the page in one evaluation:
+# ld+json and inline JSON script bodies, and the outerHTML of microdata Product
+# trees outside blacklisted sections (same ancestor walk as _ELEMENT_PROFILE_JS).
+_STRUCTURED_SOURCES_JS = r"""
+(payload) => {
+    const blacklist = new Set(payload.blacklist);
+    const blacklisted = (el) => {
+        let node = el;
+        for (let depth = 0; depth < 6 && node; depth++) {
+            const tag = (node.tagName || '').toLowerCase();
+            if (blacklist.has(tag)) return true;
+            if (tag === 'body' || tag === 'html') return false;
+            node = node.parentElement;
+        }
+        return false;
+    };
+    const bodies = (selector) => Array.from(document.querySelectorAll(selector), (s) => s.textContent || '');
+    return {
+        jsonld: bodies('script[type="application/ld+json"]'),
+        inline_json: bodies('script[type="application/json"], script[type="text/json"], script[type="text/plain"]')
+            .filter((text) => text && text.length <= payload.maxInlineChars),
+        microdata: payload.microdata
+            ? Array.from(document.querySelectorAll(payload.microdataSelector))
+                .filter((el) => !blacklisted(el))
+                .map((el) => el.outerHTML)
+            : null,
+    };
+}
+"""
+
+# Installed before any page script runs; counts fetch/XHR requests still in flight
+# so readiness waits can tell a network-idle window from a pause between requests.
+_INFLIGHT_TRACKER_JS = r"""
+(() => {
+    if (window.__extractorInflight !== undefined) return;
+    window.__extractorInflight = 0;
+    const done = () => { window.__extractorInflight = Math.max(0, window.__extractorInflight - 1); };
+    const originalFetch = window.fetch;
+    if (originalFetch) {
+        window.fetch = function () {
+            window.__extractorInflight += 1;
+            return originalFetch.apply(this, arguments).finally(done);
+        };
+    }
+    const originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        window.__extractorInflight += 1;
+        this.addEventListener('loadend', done, { once: true });
+        return originalSend.apply(this, arguments);
+    };
+})();
+"""
+
+
+# Resolves once the page has been quiet for `quietMs` (no DOM mutations, no new or
+# in-flight requests, product-card count unchanged) or `timeoutMs` has elapsed.
+_WAIT_FOR_QUIET_JS = r"""
+(payload) => new Promise((resolve) => {
+    const start = performance.now();
+    const countCards = () => {
+        let count = 0;
+        for (const sel of payload.cardSelectors || []) {
+            try { count = Math.max(count, document.querySelectorAll(sel).length); } catch (e) {}
+        }
+        return count;
+    };
+    const resourceCount = () => performance.getEntriesByType('resource').length;
+    let lastChange = start;
+    let cards = countCards();
+    let resources = resourceCount();
+    const observer = new MutationObserver(() => { lastChange = performance.now(); });
+    observer.observe(document.documentElement, { childList: true, subtree: true });
+    const finish = (reason) => {
+        observer.disconnect();
+        resolve({ reason: reason, waitedMs: Math.round(performance.now() - start), cards: cards });
+    };
+    const tick = () => {
+        const now = performance.now();
+        const nextCards = countCards();
+        const nextResources = resourceCount();
+        if (nextCards !== cards || nextResources !== resources || (window.__extractorInflight || 0) > 0) {
+            cards = nextCards;
+            resources = nextResources;
+            lastChange = now;
+        }
+        if (now - lastChange >= payload.quietMs) return finish('quiet');
+        if (now - start >= payload.timeoutMs) return finish('ceiling');
+        setTimeout(tick, Math.min(50, payload.quietMs));
+    };
+    tick();
+})
+"""
+
+
+# Resolves to {matched: selector} for the first selector with a visible match,
+# re-checking on DOM mutations, or {matched: null} after `timeoutMs`.
+_WAIT_FOR_SELECTOR_JS = r"""
+(payload) => new Promise((resolve) => {
+    const visible = (el) => {
+        const rect = el.getBoundingClientRect();
+        if (rect.width <= 0 || rect.height <= 0) return false;
+        const style = window.getComputedStyle(el);
+        return style.visibility !== 'hidden' && style.display !== 'none';
+    };
+    const match = () => {
+        for (const sel of payload.selectors) {
+            let els;
+            try { els = document.querySelectorAll(sel); } catch (e) { continue; }
+            for (const el of els) { if (visible(el)) return sel; }
+        }
+        return null;
+    };
+    const found = match();
+    if (found) return resolve({ matched: found });
+    let scheduled = false;
+    let timer = null;
+    const observer = new MutationObserver(() => {
+        if (scheduled) return;
+        scheduled = true;
+        // Batch bursts of mutations into one visibility check
+        setTimeout(() => {
+            scheduled = false;
+            const sel = match();
+            if (sel) { observer.disconnect(); clearTimeout(timer); resolve({ matched: sel }); }
+        }, 50);
+    });
+    observer.observe(document.documentElement, { childList: true, subtree: true, attributes: true });
+    timer = setTimeout(() => { observer.disconnect(); resolve({ matched: match() }); }, payload.timeoutMs);
+})
+"""
+
+
+# ============================================================================
+# Stage latency instrumentation
+# ============================================================================
+
+
+@contextmanager
+def _stage_span(timings: Optional[Dict[str, float]], stage: str):
+    """Add the wall time of the enclosed block to `timings[stage]` (no-op when timings is None)."""
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = round(timings.get(stage, 0.0) + time.perf_counter() - start, 4)
+
+
+class _StageTimings:
+    """Rolling per-stage latency samples (seconds) with percentile summaries."""
+
+    def __init__(self, window: int = 5000):
+        self.window = max(1, window)
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, timings: Optional[Dict[str, float]]):
+        if not timings:
+            return
+        with self._lock:
+            for stage, seconds in timings.items():
+                samples = self._samples.get(stage)
+                if samples is None:
+                    samples = self._samples[stage] = deque(maxlen=self.window)
+                samples.append(seconds)
+
+    def percentiles(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            snapshot = {stage: sorted(samples) for stage, samples in self._samples.items()}
+        summary: Dict[str, Dict[str, float]] = {}
+        for stage, ordered in snapshot.items():
+            count = len(ordered)
+            summary[stage] = {"count": count}
+            for pct in (50, 95, 99):
+                # Nearest-rank percentile
+                summary[stage][f"p{pct}"] = ordered[max(0, math.ceil(pct * count / 100) - 1)]
+        return summary
+
+
+class _ScrollRoundStats:
+    """Per-domain count of scroll rounds pages needed, and how often scrolling stopped early."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._domains: Dict[str, Dict[str, int]] = {}
+
+    def record(self, domain: str, rounds: int, stopped_early: bool):
+        with self._lock:
+            entry = self._domains.setdefault(domain, {"pages": 0, "rounds": 0, "max_rounds": 0, "stopped_early": 0})
+            entry["pages"] += 1
+            entry["rounds"] += rounds
+            entry["max_rounds"] = max(entry["max_rounds"], rounds)
+            entry["stopped_early"] += int(stopped_early)
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {domain: dict(entry) for domain, entry in self._domains.items()}
+
+
+_SCROLL_STATS = _ScrollRoundStats()
+
+
+_STAGE_TIMINGS_LOCK = threading.Lock()
+_STAGE_TIMINGS: Optional[_StageTimings] = None
+
+
+def _get_stage_timings() -> Optional[_StageTimings]:
+    """Return the process-wide stage histograms, or None when STAGE_TIMINGS is disabled."""
+    global _STAGE_TIMINGS
+    if not _parse_bool_env("STAGE_TIMINGS", True):
+        return None
+    with _STAGE_TIMINGS_LOCK:
+        if _STAGE_TIMINGS is None:
+            _STAGE_TIMINGS = _StageTimings(_get_env_int("STAGE_TIMING_WINDOW", 5000))
+        return _STAGE_TIMINGS
+
+
+# ============================================================================
+# Prometheus metrics endpoint
+# ============================================================================
+
+
+_METRIC_HELP: Dict[str, Tuple[str, str]] = {
+    "extractor_urls_claimed_total": ("counter", "URLs claimed from the database queue"),
+    "extractor_urls_succeeded_total": ("counter", "URL jobs that finished successfully"),
+    "extractor_urls_failed_total": ("counter", "URL jobs that finished with an error"),
+    "extractor_urls_retried_total": ("counter", "URL status updates after a failure, by resulting status"),
+    "extractor_products_found_total": ("counter", "Products extracted from pages"),
+    "extractor_products_saved_total": ("counter", "Product rows saved to the database"),
+    "extractor_job_duration_seconds": ("histogram", "Wall time of a URL job"),
+    "extractor_stage_duration_seconds": ("histogram", "Wall time of an extraction stage within a URL job"),
+    "extractor_pending_jobs": ("gauge", "Jobs currently running in worker slots"),
+    "extractor_active_drivers": ("gauge", "Selenium drivers currently kept alive"),
+    "extractor_open_fds": ("gauge", "Open file descriptors of this process"),
+    "extractor_child_processes": ("gauge", "Direct child processes (browsers, drivers, workers)"),
+    "extractor_ram_used_bytes": ("gauge", "Host RAM in use"),
+    "extractor_ram_used_percent": ("gauge", "Host RAM in use, percent"),
+}
+
+
+class _MetricsRegistry:
+    """
+    Process-wide counters and fixed-bucket histograms, plus gauges sampled at scrape
+    time, rendered in the Prometheus text exposition format.
+    """
+
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], List[float]] = {}
+        # ParallelURLExtractor or _ProcessSupervisor: anything with pending_count/active_driver_count
+        self._runners: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+    def inc(self, name: str, value: float = 1, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            # Per-bucket counts followed by sum and count
+            values = self._histograms.get(key)
+            if values is None:
+                values = self._histograms[key] = [0] * len(self.BUCKETS) + [0.0, 0]
+            for index, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    values[index] += 1
+            values[-2] += seconds
+            values[-1] += 1
+
+    def track_runner(self, runner: Any):
+        self._runners.add(runner)
+
+    def counter_values(self, name: str) -> Dict[Tuple[Tuple[str, str], ...], float]:
+        """Current value of every label set of counter `name`."""
+        with self._lock:
+            return {labels: value for (metric, labels), value in self._counters.items() if metric == name}
+
+    def _gauges(self) -> Dict[str, float]:
+        runners = list(self._runners)
+        ram = _get_ram_usage()
+        return {
+            "extractor_pending_jobs": sum(runner.pending_count() for runner in runners),
+            "extractor_active_drivers": sum(runner.active_driver_count() for runner in runners),
+            "extractor_open_fds": _count_open_fds(),
+            "extractor_child_processes": _count_child_processes(),
+            "extractor_ram_used_bytes": ram["used_gb"] * (1024 ** 3),
+            "extractor_ram_used_percent": ram["percent"],
+        }
+
+    @staticmethod
+    def _labels(labels: Tuple[Tuple[str, str], ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(labels) + ([extra] if extra else [])
+        if not pairs:
+            return ""
+        rendered = []
+        for key, value in pairs:
+            value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            rendered.append(f'{key}="{value}"')
+        return "{" + ",".join(rendered) + "}"
+
+    def render(self) -> str:
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(values) for key, values in self._histograms.items()}
+        gauges = self._gauges()
+
+        lines: List[str] = []
+        for name, (kind, help_text) in _METRIC_HELP.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "gauge":
+                lines.append(f"{name} {gauges.get(name, 0)}")
+            elif kind == "counter":
+                series = [(labels, value) for (metric, labels), value in counters.items() if metric == name]
+                for labels, value in series or [((), 0)]:
+                    lines.append(f"{name}{self._labels(labels)} {value}")
+            else:
+                for (metric, labels), values in histograms.items():
+                    if metric != name:
+                        continue
+                    for bound, count in zip(self.BUCKETS, values):
+                        lines.append(f"{name}_bucket{self._labels(labels, ('le', str(bound)))} {count}")
+                    lines.append(f"{name}_bucket{self._labels(labels, ('le', '+Inf'))} {values[-1]}")
+                    lines.append(f"{name}_sum{self._labels(labels)} {round(values[-2], 6)}")
+                    lines.append(f"{name}_count{self._labels(labels)} {values[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Scrapes every few seconds would flood the job log
+
+
+_METRICS_LOCK = threading.Lock()
+_METRICS: Optional[_MetricsRegistry] = None
+_METRICS_DISABLED = False
+
+
+def _get_metrics() -> Optional[_MetricsRegistry]:
+    """Return the process-wide metrics registry, serving /metrics on METRICS_PORT; None when disabled."""
+    global _METRICS, _METRICS_DISABLED
+    if _METRICS is not None:
+        return _METRICS
+    port = _get_env_int("METRICS_PORT", 0)
+    if port <= 0 or _METRICS_DISABLED:
+        return None
+    with _METRICS_LOCK:
+        if _METRICS is None:
+            registry = _MetricsRegistry()
+            try:
+                server = ThreadingHTTPServer((os.getenv("METRICS_HOST", "0.0.0.0"), port), _MetricsRequestHandler)
+            except OSError as exc:
+                print(f"[!] Metrics endpoint could not bind port {port} ({exc}); metrics disabled")
+                _METRICS_DISABLED = True
+                return None
+            server.daemon_threads = True
+            server.registry = registry
+            threading.Thread(target=server.serve_forever, name="MetricsServer", daemon=True).start()
+            print(f"[*] Metrics endpoint listening on :{port}/metrics")
+            _METRICS = registry
+        return _METRICS
+
+
+def _use_unserved_metrics() -> _MetricsRegistry:
+    """Record metrics in this process without serving them; worker processes forward theirs."""
+    global _METRICS
+    with _METRICS_LOCK:
+        if _METRICS is None:
+            _METRICS = _MetricsRegistry()
+        return _METRICS
+
+
 class UniversalProductExtractor:
     """
     Extract product data (title, price, image, link, availability, ratings, etc.)
     from any e-commerce listing/search page using layered strategies.
     """
 
-    def __init__(self):
+    def __init__(self, connect_db: bool = True):
         self.selector_sets = self._build_selector_sets()
         self._thread_local = threading.local()
         self._drivers_lock = threading.Lock()
@@ -201,17 +2423,20 @@ class UniversalProductExtractor:
         # Resource thresholds
         self._fd_threshold = _get_env_int("FD_THRESHOLD", 2048)
         self._child_proc_threshold = _get_env_int("CHILD_PROC_THRESHOLD", 150)
+        # Lazily created pool for blocking work issued by extract_products_async
+        self._async_executor: Optional[ThreadPoolExecutor] = None
         
         # Initialize Supabase connection
         self.supabase: Optional[Client] = None
-        if SUPABASE_AVAILABLE and SUPABASE_KEY:
-            self.supabase = _get_supabase_client()
-            if not self.supabase:
-                print("[!] Warning: Failed to connect to Supabase. Products will not be saved to database\n")
-        elif not SUPABASE_AVAILABLE:
-            print("[!] Warning: supabase-py not installed. Products will not be saved to database\n")
-        elif not SUPABASE_KEY:
-            print("[!] Warning: SUPABASE_KEY not set. Products will not be saved to database\n")
+        if connect_db:
+            if _storage_backend() == "sqlite" or (SUPABASE_AVAILABLE and SUPABASE_KEY):
+                self.supabase = _get_supabase_client()
+                if not self.supabase:
+                    print("[!] Warning: Failed to connect to Supabase. Products will not be saved to database\n")
+            elif not SUPABASE_AVAILABLE:
+                print("[!] Warning: supabase-py not installed. Products will not be saved to database\n")
+            elif not SUPABASE_KEY:
+                print("[!] Warning: SUPABASE_KEY not set. Products will not be saved to database\n")
 
         # Heuristic phrases and keywords used across strategies
         self.no_results_phrases = [
@@ -274,6 +2499,30 @@ class UniversalProductExtractor:
         ]
 
         self.max_scroll_attempts = 4
+        # Stop scrolling once the page already shows max_items product cards
+        self.scroll_early_stop = _parse_bool_env("SCROLL_EARLY_STOP", True)
+        # Wait on in-page quiescence (DOM mutations, requests, card count) instead of fixed sleeps
+        self.event_readiness = _parse_bool_env("EVENT_READINESS", True)
+        self.readiness_quiet_ms = max(50, _get_env_int("READINESS_QUIET_MS", 300))
+        # 0: never wait longer than the fixed sleep a readiness wait replaces
+        ceiling_ms = _get_env_int("READINESS_CEILING_MS", 0)
+        self.readiness_ceiling_ms = max(self.readiness_quiet_ms, ceiling_ms) if ceiling_ms > 0 else 0
+        # Answer visibility/ancestry for a whole selector match set in one script call
+        self.bulk_element_queries = _parse_bool_env("BULK_ELEMENT_QUERIES", True)
+        # Match container/card selector sets as one combined query instead of one per selector
+        self.compiled_selector_sets = _parse_bool_env("COMPILED_SELECTOR_SETS", True)
+        # Run DOM and all structured-data sources together and merge, instead of first-non-empty
+        self.structured_data_fanout = _parse_bool_env("STRUCTURED_DATA_FANOUT", False)
+        # Evaluate all card fields in one script call instead of per-field WebDriver calls
+        self.in_page_card_extraction = _parse_bool_env("IN_PAGE_CARD_EXTRACTION", True)
+        # Grab page HTML once and run strategies offline against a parsed tree
+        self.snapshot_parsing = _parse_bool_env("SNAPSHOT_PARSING", False) and LXML_AVAILABLE
+        # Try a plain HTTP GET + structured data before launching a browser
+        self.http_fast_path = _parse_bool_env("HTTP_FAST_PATH", False) and LXML_AVAILABLE and REQUESTS_AVAILABLE
+        # Per-domain learned strategy/selector recipes, replayed before the full ladder
+        self.recipe_store = _get_recipe_store()
+        # Rows per insert request when saving products
+        self.db_insert_chunk_size = _get_env_int("DB_INSERT_CHUNK_SIZE", 100)
 
     # ------------------------------------------------------------------
     # Driver lifecycle helpers
@@ -283,8 +2532,14 @@ class UniversalProductExtractor:
         driver = getattr(self._thread_local, "driver", None)
         thread_urls = getattr(self._thread_local, "urls_processed", 0)
         
+        # Playwright pages go back to the warm pool after every URL: the pool resets their
+        # state and recycles them on heap growth, so the URL-count restart is Selenium-only
+        if isinstance(driver, UniversalProductExtractor._PWDriver) and thread_urls > 0:
+            self._reset_thread_driver()
+            driver = None
+            self._thread_local.urls_processed = 0
         # Force cleanup and restart driver after N URLs to prevent resource accumulation
-        if driver is not None and thread_urls >= self._urls_per_driver_cleanup:
+        elif driver is not None and thread_urls >= self._urls_per_driver_cleanup:
             try:
                 _log_with_thread(f"Restarting driver after {thread_urls} URLs to prevent resource accumulation", "[*]")
                 self._reset_thread_driver()
@@ -372,14 +2627,24 @@ class UniversalProductExtractor:
         def set_page_load_timeout(self, ms: int):
             timeout_ms = max(ms * 1000, 1)
             try:
-                self._run(self._page.set_default_navigation_timeout(timeout_ms))
-                self._run(self._page.set_default_timeout(timeout_ms))
+                # Timeout setters are synchronous in the async API; apply them on the loop thread
+                self._manager.loop.call_soon_threadsafe(self._page.set_default_navigation_timeout, timeout_ms)
+                self._manager.loop.call_soon_threadsafe(self._page.set_default_timeout, timeout_ms)
             except Exception:
                 pass
 
         def get(self, url: str):
+            if url != "about:blank":
+                self._manager.start_job(self._context, url)
             self._run(self._page.goto(url, wait_until="domcontentloaded", timeout=30000))
 
+        def blocking_stats(self) -> Optional[Dict[str, Any]]:
+            return self._manager.blocking_stats(self._context)
+
+        @property
+        def page_source(self) -> str:
+            return self._run(self._page.content())
+
         def find_elements(self, by, selector: str):
             query = selector
             if by == By.XPATH:
@@ -424,6 +2689,50 @@ class UniversalProductExtractor:
             except Exception:
                 return None
 
+        @staticmethod
+        def _unwrap(value):
+            if isinstance(value, UniversalProductExtractor._PWElement):
+                return value._handle
+            if isinstance(value, dict):
+                return {k: UniversalProductExtractor._PWDriver._unwrap(v) for k, v in value.items()}
+            if isinstance(value, (list, tuple)):
+                return [UniversalProductExtractor._PWDriver._unwrap(v) for v in value]
+            return value
+
+        def evaluate_function(self, function_source: str, arg: Any = None):
+            """Evaluate a JS function expression with a single (possibly nested) argument."""
+            try:
+                return self._run(self._page.evaluate(function_source, self._unwrap(arg)))
+            except Exception:
+                return None
+
+        def evaluate_elements(self, function_source: str, arg: Any = None) -> Optional[Dict[str, Any]]:
+            """
+            Evaluate a JS function returning `{elements, data}`; `elements` come back as
+            element adapters and `data` as JSON. `page.evaluate` cannot return nodes, so the
+            result is kept as a handle and unpacked in the same loop-thread call.
+            """
+
+            async def evaluate():
+                handle = await self._page.evaluate_handle(function_source, self._unwrap(arg))
+                try:
+                    data = await (await handle.get_property("data")).json_value()
+                    properties = await (await handle.get_property("elements")).get_properties()
+                    items = sorted((int(k), v) for k, v in properties.items() if str(k).isdigit())
+                    return {"elements": [v.as_element() for _, v in items], "data": data}
+                finally:
+                    await handle.dispose()
+
+            try:
+                result = self._run(evaluate())
+            except Exception:
+                return None
+            result["elements"] = [
+                UniversalProductExtractor._PWElement(self._manager, handle) if handle is not None else None
+                for handle in result["elements"]
+            ]
+            return result
+
         def delete_all_cookies(self):
             try:
                 self._run(self._context.clear_cookies())
@@ -431,11 +2740,164 @@ class UniversalProductExtractor:
                 pass
 
         def quit(self):
+            # Hand the page back to the warm pool; it is reset or recycled there
             try:
-                self._manager.close_context(self._context)
+                self._manager.release_context_page(self._context, self._page)
             except Exception:
                 pass
 
+    # ------------------------ HTML Snapshot Integration ------------------------
+    # Driver/element adapters over an lxml tree so every strategy can run offline
+    # against a single `page_source` snapshot with the same selector_sets.
+
+    _SNAPSHOT_SKIP_TEXT_TAGS = frozenset({"script", "style", "noscript", "template"})
+    _SNAPSHOT_HIDDEN_TAGS = frozenset({"head", "script", "style", "noscript", "template", "meta", "link", "title"})
+    _SNAPSHOT_BLOCK_TAGS = frozenset({
+        "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "fieldset",
+        "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header",
+        "hr", "li", "main", "nav", "ol", "p", "pre", "section", "table", "td", "th", "tr", "ul",
+    })
+    _SNAPSHOT_CSS_CACHE: Dict[str, Any] = {}
+
+    @classmethod
+    def _snapshot_query(cls, node, by, selector: str) -> List[Any]:
+        if by == By.XPATH:
+            matches = node.xpath(selector)
+        elif by == By.TAG_NAME:
+            matches = list(node.iter(selector))
+        else:
+            compiled = cls._SNAPSHOT_CSS_CACHE.get(selector)
+            if compiled is None:
+                compiled = CSSSelector(selector, translator="html")
+                cls._SNAPSHOT_CSS_CACHE[selector] = compiled
+            matches = compiled(node)
+        # Selenium semantics: element-scoped queries never return the element itself
+        return [m for m in matches if m is not node and isinstance(getattr(m, "tag", None), str)]
+
+    class _SnapshotElement:
+        def __init__(self, node):
+            self._node = node
+            self._text: Optional[str] = None
+
+        def find_elements(self, by, selector: str):
+            try:
+                return [
+                    UniversalProductExtractor._SnapshotElement(match)
+                    for match in UniversalProductExtractor._snapshot_query(self._node, by, selector)
+                ]
+            except Exception:
+                return []
+
+        def find_element(self, by, selector: str):
+            elements = self.find_elements(by, selector)
+            if not elements:
+                raise NoSuchElementException(f"No element matches {selector!r} in snapshot")
+            return elements[0]
+
+        @property
+        def tag_name(self) -> str:
+            return str(self._node.tag).lower()
+
+        def is_displayed(self) -> bool:
+            node = self._node
+            while node is not None:
+                tag = str(node.tag).lower()
+                if tag in UniversalProductExtractor._SNAPSHOT_HIDDEN_TAGS:
+                    return False
+                if node.get("hidden") is not None:
+                    return False
+                if tag == "input" and (node.get("type") or "").lower() == "hidden":
+                    return False
+                style = (node.get("style") or "").replace(" ", "").lower()
+                if "display:none" in style or "visibility:hidden" in style:
+                    return False
+                node = node.getparent()
+            return True
+
+        def is_enabled(self) -> bool:
+            return self._node.get("disabled") is None
+
+        def get_attribute(self, name: str) -> Optional[str]:
+            if name in ("innerText", "textContent"):
+                return self.text
+            return self._node.get(name)
+
+        @property
+        def text(self) -> str:
+            if self._text is None:
+                self._text = UniversalProductExtractor._snapshot_text(self._node)
+            return self._text
+
+        def click(self):
+            pass
+
+    @classmethod
+    def _snapshot_text(cls, node) -> str:
+        """Approximate rendered text: skip script/style subtrees, break lines at block elements."""
+        if str(node.tag).lower() in cls._SNAPSHOT_SKIP_TEXT_TAGS:
+            return node.text_content() or ""
+        parts: List[str] = []
+
+        def walk(el):
+            tag = str(el.tag).lower()
+            block = tag in cls._SNAPSHOT_BLOCK_TAGS
+            if block:
+                parts.append("\n")
+            if el.text:
+                parts.append(el.text)
+            for child in el:
+                if isinstance(child.tag, str) and str(child.tag).lower() not in cls._SNAPSHOT_SKIP_TEXT_TAGS:
+                    walk(child)
+                if child.tail:
+                    parts.append(child.tail)
+            if block:
+                parts.append("\n")
+
+        walk(node)
+        lines = (re.sub(r"[ \t\r\f\v\xa0]+", " ", line).strip() for line in "".join(parts).split("\n"))
+        return "\n".join(line for line in lines if line)
+
+    class _SnapshotDriver:
+        def __init__(self, html: str, url: str):
+            if not LXML_AVAILABLE:
+                raise RuntimeError("lxml/cssselect are not installed or failed to import")
+            self.current_url = url
+            self.page_source = html
+            self._root = lxml.html.document_fromstring(html)
+
+        def find_elements(self, by, selector: str):
+            try:
+                return [
+                    UniversalProductExtractor._SnapshotElement(match)
+                    for match in UniversalProductExtractor._snapshot_query(self._root, by, selector)
+                ]
+            except Exception:
+                return []
+
+        def find_element(self, by, selector: str):
+            elements = self.find_elements(by, selector)
+            if not elements:
+                raise NoSuchElementException(f"No element matches {selector!r} in snapshot")
+            return elements[0]
+
+        def execute_script(self, script: str, *args):
+            return None
+
+        def evaluate_function(self, function_source: str, arg: Any = None):
+            return None
+
+        def evaluate_elements(self, function_source: str, arg: Any = None):
+            return None
+
+        def get(self, url: str):
+            pass
+
+        def delete_all_cookies(self):
+            pass
+
+        def quit(self):
+            pass
+
     _PW_SINGLETON_LOCK = threading.Lock()
     _PW_MANAGER: Optional[_PlaywrightAsyncManager] = None
 
@@ -489,6 +2951,9 @@ class UniversalProductExtractor:
     def shutdown(self):
         """Close any drivers kept alive for reuse."""
         self._close_all_drivers()
+        executor, self._async_executor = self._async_executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
 
     def __del__(self):
         try:
@@ -667,6 +3132,26 @@ class UniversalProductExtractor:
 
         Returns a dict containing metadata and an array of product dicts.
         """
+        timings: Dict[str, float] = {}
+
+        # Browserless fast path: structured data from a plain GET, escalate to a browser on zero products
+        if self.http_fast_path:
+            with _stage_span(timings, "http_fast_path"):
+                fast_products = self._try_http_fast_path(url, max_items)
+            if fast_products:
+                result = self._finalize_products(
+                    fast_products,
+                    url,
+                    max_items,
+                    product_type_id=product_type_id,
+                    searched_product_id=searched_product_id,
+                    url_id=url_id,
+                    timings=timings,
+                )
+                result["fetch_mode"] = "http"
+                result["strategy"] = "http_fast_path"
+                return result
+
         attempt = 0
         max_attempts = 2 if reuse_driver else 1
         last_error: Optional[Exception] = None
@@ -675,98 +3160,98 @@ class UniversalProductExtractor:
             driver = None
             managed_driver = False
             try:
-                if reuse_driver:
-                    driver = self._get_or_create_driver()
-                    # Clear any residual state from previous URL when reusing driver
-                    try:
-                        # Clear cookies and cache to prevent state pollution
-                        driver.delete_all_cookies()
-                    except Exception:
-                        pass  # Ignore if cookies can't be cleared
-                else:
-                    driver = self._setup_driver()
-                    managed_driver = True
+                with _stage_span(timings, "driver_acquire"):
+                    if reuse_driver:
+                        driver = self._get_or_create_driver()
+                        # Clear any residual state from previous URL when reusing driver
+                        try:
+                            # Clear cookies and cache to prevent state pollution
+                            driver.delete_all_cookies()
+                        except Exception:
+                            pass  # Ignore if cookies can't be cleared
+                    else:
+                        driver = self._setup_driver()
+                        managed_driver = True
 
                 _log_with_thread(f"Navigating: {url}", "[Universal Extractor]")
-                driver.get(url)
-
-                # Wait for the DOM to be ready
-                WebDriverWait(driver, wait_seconds).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "body"))
-                )
+                with _stage_span(timings, "navigate"):
+                    self._apply_blocking_profile(driver, url)
+                    self._install_readiness_hooks(driver)
+                    driver.get(url)
+
+                    # Wait for the DOM to be ready
+                    WebDriverWait(driver, wait_seconds).until(
+                        EC.presence_of_element_located((By.TAG_NAME, "body"))
+                    )
 
                 # Handle popups/load-more/infinite scroll before extraction
-                self._dismiss_known_popups(driver)
-                self._progressive_scroll_and_load(driver)
+                with _stage_span(timings, "popups"):
+                    self._dismiss_known_popups(driver)
+                with _stage_span(timings, "scroll"):
+                    scroll = self._progressive_scroll_and_load(driver, max_items)
 
                 # Try to wait for any of the product card selectors after prep
-                self._wait_for_any_selector(driver, self.selector_sets["product_cards"], wait_seconds)
-
-                # Strategy 1: DOM-based extraction within scoped containers
-                products = self._extract_from_dom(driver, url, max_items)
-
-                # If nothing found, try JSON-LD fallback
-                if not products:
-                    products = self._extract_from_jsonld(driver, url, max_items)
-
-                # Structured data via microdata (itemscope/itemprop)
-                if len(products) == 0:
-                    products = self._extract_from_microdata(driver, url, max_items)
-
-                # Inline JSON data structures (application/json scripts)
-                if len(products) == 0:
-                    products = self._extract_from_inline_data_scripts(driver, url, max_items)
-
-                # Strategy 2: Heuristic global scan if still weak results
-                if len(products) == 0:
-                    products = self._extract_by_global_heuristics(driver, url, max_items)
+                with _stage_span(timings, "wait_selector"):
+                    self._wait_for_any_selector(driver, self.selector_sets["product_cards"], wait_seconds)
+
+                blocking = self._collect_blocking_stats(driver, url)
+                domain = urlparse(url).netloc
+                recipe = self.recipe_store.get(domain) if self.recipe_store else None
+                outcome: Optional[Dict[str, Any]] = None
+                if self.snapshot_parsing:
+                    with _stage_span(timings, "snapshot"):
+                        html = self._capture_page_snapshot(driver)
+                    if html:
+                        # Release the browser page right away; parsing runs offline
+                        if managed_driver:
+                            try:
+                                driver.quit()
+                            except Exception:
+                                pass
+                            driver = None
+                        else:
+                            self._release_page(driver)
+                        with _stage_span(timings, "parse"):
+                            outcome = self._extract_from_snapshot(html, url, max_items, recipe)
 
-                # Strategy 3: Last resort - anchors that look like products (image + product-like path)
-                if len(products) == 0:
-                    products = self._extract_from_links_with_images(driver, url, max_items)
+                if outcome is None:
+                    outcome = self._run_extraction_strategies(driver, url, max_items, recipe)
+                timings.update(outcome.get("timings") or {})
+                self._record_recipe_outcome(domain, outcome)
+                products = outcome["products"]
 
                 # If still nothing and page clearly indicates "no results", return empty
-                if not products and self._page_indicates_no_results(driver):
+                if not products and outcome["no_results"]:
                     return {
                         "success": True,
                         "page_url": url,
-                        "platform": urlparse(url).netloc,
+                        "platform": domain,
                         "num_products": 0,
                         "products": [],
+                        "blocking": blocking,
+                        "scroll": scroll,
+                        "timings": timings,
                     }
 
-                # Deduplicate by product_url
-                products = self._dedupe_by_url(products)
-                if len(products) > max_items:
-                    products = products[:max_items]
-
-                # Get platform URL from the extracted URL
-                platform_url = url
-                platform = urlparse(url).netloc
-
-                # Save products to database (with product type and searched product info)
-                saved_count = self._save_products_to_db(
+                result = self._finalize_products(
                     products,
-                    platform_url,
-                    platform,
+                    url,
+                    max_items,
                     product_type_id=product_type_id,
                     searched_product_id=searched_product_id,
+                    url_id=url_id,
+                    timings=timings,
                 )
-                
+                result["blocking"] = blocking
+                result["strategy"] = outcome["strategy"]
+                result["scroll"] = scroll
+
                 # Increment URL counter for driver cleanup
                 if reuse_driver:
                     thread_urls = getattr(self._thread_local, "urls_processed", 0)
                     self._thread_local.urls_processed = thread_urls + 1
 
-                return {
-                    "success": True,
-                    "page_url": url,
-                    "platform": platform,
-                    "num_products": len(products),
-                    "products": products,
-                    "saved_to_db": saved_count,
-                    "url_id": url_id,
-                }
+                return result
 
             except Exception as e:
                 last_error = e
@@ -780,70 +3265,681 @@ class UniversalProductExtractor:
                             pass
                     driver = None
 
-                if not reuse_driver:
-                    break
+                if not reuse_driver:
+                    break
+
+            finally:
+                if managed_driver and driver:
+                    try:
+                        driver.quit()
+                    except Exception:
+                        pass
+
+            attempt += 1
+
+        return {
+            "success": False,
+            "page_url": url,
+            "error": str(last_error) if last_error else "Unknown error",
+            "url_id": url_id,
+            "timings": timings,
+        }
+
+    # ----------------------------- Async Pipeline -----------------------------
+
+    async def extract_products_async(
+        self,
+        url: str,
+        max_items: int = 50,
+        wait_seconds: int = 12,
+        product_type_id: Optional[int] = None,
+        searched_product_id: Optional[int] = None,
+        url_id: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Coroutine counterpart of extract_products; must run on the Playwright manager's loop.
+
+        Page work uses the async Playwright API directly. The page is released as soon as
+        its HTML snapshot is taken; strategy parsing and DB writes run in a small thread
+        pool so the event loop only ever waits on I/O.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_async_executor()
+        manager = self._get_playwright_manager()
+        last_error: Optional[Exception] = None
+        timings: Dict[str, float] = {}
+
+        for _ in range(2):
+            try:
+                html, blocking, scroll = await self._load_page_snapshot_async(
+                    manager, url, wait_seconds, timings, max_items
+                )
+                domain = urlparse(url).netloc
+                recipe = self.recipe_store.get(domain) if self.recipe_store else None
+                with _stage_span(timings, "parse"):
+                    outcome = await loop.run_in_executor(
+                        executor, self._extract_from_snapshot, html, url, max_items, recipe
+                    )
+                timings.update(outcome.get("timings") or {})
+                self._record_recipe_outcome(domain, outcome)
+                products = outcome["products"]
+
+                if not products and outcome["no_results"]:
+                    return {
+                        "success": True,
+                        "page_url": url,
+                        "platform": domain,
+                        "num_products": 0,
+                        "products": [],
+                        "blocking": blocking,
+                        "scroll": scroll,
+                        "timings": timings,
+                    }
+
+                result = await loop.run_in_executor(
+                    executor,
+                    functools.partial(
+                        self._finalize_products,
+                        products,
+                        url,
+                        max_items,
+                        product_type_id=product_type_id,
+                        searched_product_id=searched_product_id,
+                        url_id=url_id,
+                        timings=timings,
+                    ),
+                )
+                result["blocking"] = blocking
+                result["strategy"] = outcome["strategy"]
+                result["scroll"] = scroll
+                return result
+            except Exception as exc:
+                last_error = exc
+
+        return {
+            "success": False,
+            "page_url": url,
+            "error": str(last_error) if last_error else "Unknown error",
+            "url_id": url_id,
+            "timings": timings,
+        }
+
+    async def _load_page_snapshot_async(
+        self,
+        manager: "_PlaywrightAsyncManager",
+        url: str,
+        wait_seconds: int,
+        timings: Optional[Dict[str, float]] = None,
+        max_items: Optional[int] = None,
+    ) -> Tuple[str, Optional[Dict[str, Any]], Dict[str, Any]]:
+        """Render `url` on a pooled page; returns its HTML, the job's blocking counters and scroll rounds."""
+        with _stage_span(timings, "driver_acquire"):
+            context, page = await manager._acquire_context_page()
+        try:
+            _log_with_thread(f"Navigating: {url}", "[Universal Extractor]")
+            manager.start_job(context, url)
+            with _stage_span(timings, "navigate"):
+                await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+                await page.wait_for_selector("body", state="attached", timeout=max(1, wait_seconds) * 1000)
+
+            # Handle popups/load-more/infinite scroll before extraction
+            with _stage_span(timings, "popups"):
+                await self._dismiss_known_popups_async(page)
+            with _stage_span(timings, "scroll"):
+                scroll = await self._progressive_scroll_and_load_async(page, max_items)
+            with _stage_span(timings, "wait_selector"):
+                await self._wait_for_any_selector_async(page, self.selector_sets["product_cards"], wait_seconds)
+            with _stage_span(timings, "snapshot"):
+                html = await page.content()
+            return html, manager.blocking_stats(context), scroll
+        finally:
+            await manager._release_context_page(context, page)
+
+    async def _click_visible_async(self, page, selectors: List[str], require_enabled: bool = False) -> int:
+        try:
+            clicked = await page.evaluate(
+                _CLICK_VISIBLE_JS,
+                {"selectors": selectors, "limit": 2, "requireEnabled": require_enabled},
+            )
+            return int(clicked or 0)
+        except Exception:
+            return 0
+
+    async def _wait_until_quiet_async(self, page, fallback_seconds: float, ceiling_ms: Optional[int] = None):
+        if self.event_readiness:
+            timeout_ms = self._readiness_timeout_ms(fallback_seconds, ceiling_ms)
+            payload = {
+                "quietMs": min(self.readiness_quiet_ms, timeout_ms),
+                "timeoutMs": timeout_ms,
+                "cardSelectors": self.selector_sets["product_cards"],
+            }
+            try:
+                await page.evaluate(_WAIT_FOR_QUIET_JS, payload)
+                return
+            except Exception:
+                pass
+        await asyncio.sleep(fallback_seconds)
+
+    async def _dismiss_known_popups_async(self, page):
+        if await self._click_visible_async(page, self.popup_close_selectors):
+            await self._wait_until_quiet_async(page, 0.3, ceiling_ms=max(300, self.readiness_quiet_ms))
+
+    async def _click_load_more_async(self, page) -> bool:
+        clicked = await self._click_visible_async(page, self.load_more_selectors, require_enabled=True)
+        if clicked:
+            await self._wait_until_quiet_async(page, 1)
+        return bool(clicked)
+
+    async def _count_product_cards_async(self, page) -> int:
+        try:
+            count = await page.evaluate(_COUNT_CARDS_JS, {"selectors": self.selector_sets["product_cards"]})
+        except Exception:
+            return 0
+        return int(count) if isinstance(count, (int, float)) else 0
+
+    async def _progressive_scroll_and_load_async(self, page, max_items: Optional[int] = None) -> Dict[str, Any]:
+        scroll = {"rounds": 0, "stopped_early": False}
+        check_cards = self.scroll_early_stop and bool(max_items)
+        if check_cards and await self._count_product_cards_async(page) >= max_items:
+            scroll["stopped_early"] = True
+            return scroll
+
+        height_js = "document.body ? document.body.scrollHeight : 0"
+        try:
+            last_height = await page.evaluate(height_js)
+        except Exception:
+            last_height = 0
+
+        for _ in range(self.max_scroll_attempts):
+            try:
+                await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            except Exception:
+                break
+            scroll["rounds"] += 1
+            await self._wait_until_quiet_async(page, 1.2)
+            if check_cards and await self._count_product_cards_async(page) >= max_items:
+                scroll["stopped_early"] = True
+                break
+            await self._click_load_more_async(page)
+            await self._dismiss_known_popups_async(page)
+            try:
+                new_height = await page.evaluate(height_js)
+            except Exception:
+                break
+            if new_height <= last_height:
+                break
+            last_height = new_height
+        return scroll
+
+    async def _wait_for_any_selector_async(self, page, selectors: List[str], wait_seconds: int):
+        try:
+            await page.wait_for_selector(", ".join(selectors), state="visible", timeout=max(1, wait_seconds) * 1000)
+        except Exception:
+            pass  # Soft timeout only; extraction still attempts heuristics
+
+    def _get_async_executor(self) -> ThreadPoolExecutor:
+        """Thread pool for blocking work (parsing, DB writes) issued from the async pipeline."""
+        with self._drivers_lock:
+            if self._async_executor is None:
+                self._async_executor = ThreadPoolExecutor(
+                    max_workers=max(1, _get_env_int("ASYNC_WORKER_THREADS", 8)),
+                    thread_name_prefix="AsyncPipelineWorker",
+                )
+            return self._async_executor
+
+    def _finalize_products(
+        self,
+        products: List[Dict[str, Any]],
+        url: str,
+        max_items: int,
+        product_type_id: Optional[int] = None,
+        searched_product_id: Optional[int] = None,
+        url_id: Optional[int] = None,
+        timings: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, Any]:
+        """Deduplicate, persist and wrap extracted products into the extract_products result."""
+        # Deduplicate by product_url
+        products = self._dedupe_by_url(products)
+        if len(products) > max_items:
+            products = products[:max_items]
+
+        # Get platform URL from the extracted URL
+        platform_url = url
+        platform = urlparse(url).netloc
+
+        # Save products to database (with product type and searched product info)
+        write_counts: Dict[str, int] = {}
+        with _stage_span(timings, "db_write"):
+            saved_count = self._save_products_to_db(
+                products,
+                platform_url,
+                platform,
+                product_type_id=product_type_id,
+                searched_product_id=searched_product_id,
+                url_id=url_id,
+                counts_out=write_counts,
+            )
+
+        result = {
+            "success": True,
+            "page_url": url,
+            "platform": platform,
+            "num_products": len(products),
+            "products": products,
+            "saved_to_db": saved_count,
+            "inserted_to_db": write_counts.get("inserted", 0),
+            "updated_in_db": write_counts.get("updated", 0),
+            "unchanged_skipped": write_counts.get("unchanged", 0),
+            "url_id": url_id,
+        }
+        if timings is not None:
+            result["timings"] = timings
+        return result
+
+    def _strategy_ladder(self) -> List[Tuple[str, Any]]:
+        """Named extraction strategies in the order they are tried."""
+        return [
+            # Strategy 1: DOM-based extraction within scoped containers
+            ("dom", self._extract_from_dom),
+            # If nothing found, try JSON-LD fallback
+            ("jsonld", self._extract_from_jsonld),
+            # Structured data via microdata (itemscope/itemprop)
+            ("microdata", self._extract_from_microdata),
+            # Inline JSON data structures (application/json scripts)
+            ("inline_json", self._extract_from_inline_data_scripts),
+            # Strategy 2: Heuristic global scan if still weak results
+            ("global_heuristics", self._extract_by_global_heuristics),
+            # Strategy 3: Last resort - anchors that look like products (image + product-like path)
+            ("links_with_images", self._extract_from_links_with_images),
+        ]
+
+    def _run_extraction_strategies(
+        self,
+        driver,
+        url: str,
+        max_items: int,
+        recipe: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run the strategy ladder against a live driver or an HTML snapshot.
+
+        A learned per-domain `recipe` is replayed first and the full ladder only runs
+        when it yields nothing. With STRUCTURED_DATA_FANOUT the DOM and structured-data
+        strategies run together and merge (see _run_structured_fanout); the remaining
+        heuristics only run when all of them come up empty. Returns a dict with the
+        products, the strategy that produced them, the recipe learned from this page,
+        whether the replayed recipe hit, and whether the page reads as a "no results"
+        page.
+        """
+        outcome: Dict[str, Any] = {
+            "products": [],
+            "strategy": None,
+            "recipe": None,
+            "recipe_hit": None,
+            "no_results": False,
+            "timings": {},
+        }
+        timings = outcome["timings"]
+        trace: Dict[str, Any] = {}
+        products: List[Dict[str, Any]] = []
+        ladder = self._strategy_ladder()
+
+        skip_strategy = None
+        if self.structured_data_fanout:
+            products = self._run_structured_fanout(driver, url, max_items, recipe, outcome, trace)
+            if outcome["recipe_hit"]:
+                outcome["products"] = products
+                return outcome
+            ladder = [(name, strategy) for name, strategy in ladder if name not in self._FANOUT_STRATEGIES]
+        elif recipe:
+            with _stage_span(timings, "recipe_replay"):
+                products = self._replay_recipe(driver, url, max_items, recipe)
+            outcome["recipe_hit"] = bool(products)
+            if products:
+                outcome["products"] = products
+                outcome["strategy"] = recipe.get("strategy")
+                return outcome
+            # Unnarrowed replays ran the whole strategy already; don't repeat it
+            if not (recipe.get("strategy") == "dom" and recipe.get("card_selectors")):
+                skip_strategy = recipe.get("strategy")
+
+        for name, strategy in ladder:
+            if products or name == skip_strategy:
+                continue
+            with _stage_span(timings, f"strategy.{name}"):
+                if name == "dom":
+                    products = strategy(driver, url, max_items, trace=trace)
+                else:
+                    products = strategy(driver, url, max_items)
+            if products:
+                outcome["strategy"] = name
+                break
+
+        if products:
+            outcome["products"] = products
+            learned: Dict[str, Any] = {"strategy": outcome["strategy"]}
+            if outcome["strategy"] == "dom" and trace.get("card_selectors") and not trace.get("permissive"):
+                learned["container_selector"] = trace.get("container_selector")
+                learned["card_selectors"] = trace["card_selectors"]
+                learned["field_selectors"] = trace.get("field_selectors") or {}
+            outcome["recipe"] = learned
+        else:
+            with _stage_span(timings, "no_results_check"):
+                outcome["no_results"] = self._page_indicates_no_results(driver)
+        return outcome
+
+    # Ladder strategies covered by the structured-data fan-out, in merge priority order
+    _FANOUT_STRATEGIES = ("dom", "jsonld", "microdata", "inline_json")
+
+    def _collect_structured_sources(self, driver) -> Dict[str, Optional[List[Any]]]:
+        """Script bodies and microdata Product trees of the page, keyed by strategy name.
+
+        Live drivers answer in one evaluation (microdata as outerHTML, or None when lxml
+        is missing to parse it); snapshot drivers read the parsed tree directly.
+        """
+        payload = {
+            "blacklist": sorted(self.blacklisted_sections),
+            "maxInlineChars": _INLINE_JSON_MAX_CHARS,
+            "microdata": LXML_AVAILABLE,
+            "microdataSelector": _MICRODATA_PRODUCT_SELECTOR,
+        }
+        try:
+            sources = self._evaluate_in_page(driver, _STRUCTURED_SOURCES_JS, payload)
+        except Exception:
+            sources = None
+        if isinstance(sources, dict):
+            return sources
+        microdata = [
+            node
+            for node, info in self._query_elements(driver, _MICRODATA_PRODUCT_SELECTOR, visibility=False)
+            if not info["blacklisted"]
+        ]
+        return {
+            "jsonld": self._script_texts(driver, _JSONLD_SCRIPTS_XPATH),
+            "inline_json": self._script_texts(driver, _INLINE_JSON_SCRIPTS_XPATH),
+            "microdata": microdata,
+        }
+
+    def _run_structured_fanout(
+        self,
+        driver,
+        url: str,
+        max_items: int,
+        recipe: Optional[Dict[str, Any]],
+        outcome: Dict[str, Any],
+        trace: Dict[str, Any],
+    ) -> List[Dict[str, Any]]:
+        """
+        Run the DOM strategy and every structured-data source of the page together.
+
+        Sources are collected in one evaluation and parsed in the structured-data pool
+        while the DOM strategy (or a narrowed DOM recipe) runs on the calling thread.
+        Results merge in _FANOUT_STRATEGIES order through _dedupe_by_url, so later
+        sources only fill fields that earlier ones left empty. Sets outcome["strategy"]
+        to the first source that produced products.
+        """
+        timings = outcome["timings"]
+        with _stage_span(timings, "structured_collect"):
+            sources = self._collect_structured_sources(driver)
+
+        parsers = {
+            "jsonld": self._products_from_jsonld_texts,
+            "microdata": self._products_from_microdata_nodes,
+            "inline_json": self._products_from_inline_json_texts,
+        }
+        pool = _get_structured_data_pool()
+        futures = {
+            name: pool.submit(parse, sources[name], url, max_items)
+            for name, parse in parsers.items()
+            if sources.get(name)
+        }
+
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        if recipe and recipe.get("strategy") == "dom" and recipe.get("card_selectors"):
+            with _stage_span(timings, "recipe_replay"):
+                results["dom"] = self._extract_from_dom(driver, url, max_items, recipe=recipe)
+            outcome["recipe_hit"] = bool(results["dom"])
+        if not results.get("dom"):
+            with _stage_span(timings, "strategy.dom"):
+                results["dom"] = self._extract_from_dom(driver, url, max_items, trace=trace)
+        if sources.get("microdata") is None:
+            # No lxml to parse the collected trees; read microdata through the driver
+            with _stage_span(timings, "strategy.microdata"):
+                results["microdata"] = self._extract_from_microdata(driver, url, max_items)
+
+        with _stage_span(timings, "structured_parse"):
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                except Exception as exc:
+                    _log_with_thread(f"Structured data parsing ({name}) failed for {url}: {exc}", "[!]")
+
+        merged: List[Dict[str, Any]] = []
+        for name in self._FANOUT_STRATEGIES:
+            found = results.get(name) or []
+            if found and outcome["strategy"] is None:
+                outcome["strategy"] = name
+            merged.extend(found)
+        return self._dedupe_by_url(merged)[:max_items]
+
+    def _replay_recipe(self, driver, url: str, max_items: int, recipe: Dict[str, Any]) -> List[Dict[str, Any]]:
+        strategy = recipe.get("strategy")
+        if strategy == "dom" and recipe.get("card_selectors"):
+            return self._extract_from_dom(driver, url, max_items, recipe=recipe)
+        for name, method in self._strategy_ladder():
+            if name == strategy:
+                return method(driver, url, max_items)
+        return []
+
+    def _record_recipe_outcome(self, domain: str, outcome: Dict[str, Any]):
+        if self.recipe_store is None:
+            return
+        if outcome.get("recipe_hit") is True:
+            self.recipe_store.record_hit(domain)
+        elif outcome.get("recipe_hit") is False:
+            self.recipe_store.record_miss(domain)
+        if outcome.get("recipe"):
+            self.recipe_store.learn(domain, outcome["recipe"])
+
+    # ----------------------------- Snapshot Parsing -----------------------------
+
+    def _try_http_fast_path(self, url: str, max_items: int) -> List[Dict[str, Any]]:
+        """Fetch raw HTML without a browser and run the structured-data strategies on it."""
+        if not LXML_AVAILABLE:
+            return []
+        html = _get_http_fetcher().fetch_html(url)
+        if not html:
+            return []
+        try:
+            driver = UniversalProductExtractor._SnapshotDriver(html, url)
+            products = self._extract_from_jsonld(driver, url, max_items)
+            if not products:
+                products = self._extract_from_microdata(driver, url, max_items)
+            if not products:
+                products = self._extract_from_inline_data_scripts(driver, url, max_items)
+        except Exception as exc:
+            _log_with_thread(f"HTTP fast path parsing failed for {url}: {exc}", "[!]")
+            return []
+        if products:
+            _log_with_thread(f"HTTP fast path found {len(products)} products: {url}", "[✓]")
+        else:
+            _log_with_thread(f"HTTP fast path found no products, escalating to browser: {url}", "[*]")
+        return products
 
-            finally:
-                if managed_driver and driver:
-                    try:
-                        driver.quit()
-                    except Exception:
-                        pass
+    def _apply_blocking_profile(self, driver, url: str):
+        """Install the blocking profile for `url` before navigating (Selenium via CDP URL patterns)."""
+        if isinstance(driver, UniversalProductExtractor._PWDriver) or not hasattr(driver, "execute_cdp_cmd"):
+            return  # Playwright drivers select the profile inside get()
+        profile = _resolve_blocking_profile(url)
+        if getattr(driver, "_blocking_profile_name", None) == profile["name"]:
+            return
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": _selenium_blocked_url_patterns(profile)})
+            driver._blocking_profile_name = profile["name"]
+        except Exception as exc:
+            _log_with_thread(f"Could not apply blocking profile '{profile['name']}': {exc}", "[!]")
+
+    def _collect_blocking_stats(self, driver, url: str) -> Optional[Dict[str, Any]]:
+        """Blocked request/byte counters for the current job (profile name only for Selenium)."""
+        if isinstance(driver, UniversalProductExtractor._PWDriver):
+            return driver.blocking_stats()
+        if hasattr(driver, "execute_cdp_cmd"):
+            return {"profile": _resolve_blocking_profile(url)["name"]}
+        return None
 
-            attempt += 1
+    def _capture_page_snapshot(self, driver) -> Optional[str]:
+        """Grab the rendered HTML once so extraction can run without the browser."""
+        if not LXML_AVAILABLE:
+            return None
+        try:
+            html = driver.page_source
+        except Exception:
+            return None
+        return html if isinstance(html, str) and html.strip() else None
 
-        return {
-            "success": False,
-            "page_url": url,
-            "error": str(last_error) if last_error else "Unknown error",
-            "url_id": url_id,
-        }
+    def _release_page(self, driver):
+        """Park a reusable driver on about:blank so the page stops consuming resources."""
+        try:
+            driver.get("about:blank")
+        except Exception:
+            pass
+
+    def _extract_from_snapshot(
+        self, html: str, url: str, max_items: int, recipe: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Run all strategies against a parsed snapshot, in a process pool when configured."""
+        pool = _get_snapshot_process_pool()
+        if pool is not None:
+            return pool.submit(_extract_products_from_snapshot, html, url, max_items, recipe).result()
+        return self._run_extraction_strategies(
+            UniversalProductExtractor._SnapshotDriver(html, url), url, max_items, recipe
+        )
 
     # ----------------------------- DOM Extraction -----------------------------
 
-    def _extract_from_dom(self, driver: webdriver.Chrome, base_url: str, max_items: int) -> List[Dict[str, Any]]:
+    def _extract_from_dom(
+        self,
+        driver: webdriver.Chrome,
+        base_url: str,
+        max_items: int,
+        recipe: Optional[Dict[str, Any]] = None,
+        trace: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Extract products from card elements inside the first matching result container.
+
+        `recipe` narrows containers/cards/fields to selectors learned for this domain;
+        `trace` (if given) records the selectors that produced accepted products.
+        """
         products: List[Dict[str, Any]] = []
+        selector_sets = self._recipe_selector_sets(recipe) if recipe else self.selector_sets
 
         # Scope search to likely result containers first
-        container_elements = self._find_first_nonempty_set(
-            driver, self.selector_sets.get("result_containers", []), By.CSS_SELECTOR
+        container_elements, container_selector = self._find_first_nonempty_set_with_selector(
+            driver, selector_sets.get("result_containers", []), By.CSS_SELECTOR
         )
 
         card_elements = []
+        card_sources: List[Optional[str]] = []
+        card_selectors = selector_sets["product_cards"]
+        matched_cards = None
         if container_elements:
+            matched_cards = self._match_selector_set(driver, card_selectors, containers=container_elements)
+        if matched_cards is not None:
+            # Same order as the nested loop below: container, then selector priority, then document order
+            by_container: Dict[int, List[List[Any]]] = {}
+            for el, hit in matched_cards:
+                for ci in hit["within"]:
+                    buckets = by_container.setdefault(ci, [[] for _ in card_selectors])
+                    for si in hit["matches"]:
+                        buckets[si].append(el)
+            for ci in range(len(container_elements)):
+                for si, bucket in enumerate(by_container.get(ci, ())):
+                    card_elements.extend(bucket)
+                    card_sources.extend([card_selectors[si]] * len(bucket))
+        elif container_elements:
             for cont in container_elements:
                 try:
-                    for sel in self.selector_sets["product_cards"]:
-                        els = cont.find_elements(By.CSS_SELECTOR, sel)
-                        card_elements.extend([e for e in els if e.is_displayed()])
+                    for sel in card_selectors:
+                        matches = self._query_elements(driver, sel, root=cont, ancestry=False)
+                        visible = [e for e, info in matches if info["visible"]]
+                        card_elements.extend(visible)
+                        card_sources.extend([sel] * len(visible))
                 except Exception:
                     continue
         else:
-            card_elements = self._find_first_nonempty_set(
-                driver, self.selector_sets["product_cards"], By.CSS_SELECTOR
+            card_elements, card_selector = self._find_first_nonempty_set_with_selector(
+                driver, card_selectors, By.CSS_SELECTOR
             )
+            card_sources = [card_selector] * len(card_elements)
 
         # If no obvious cards, try a permissive guess: any li/div with link+image
-        if not card_elements:
+        # (not when replaying a recipe; the full ladder runs if the recipe misses)
+        if not card_elements and recipe is None:
             candidates = driver.find_elements(By.CSS_SELECTOR, "li, div, article")
             card_elements = [el for el in candidates if self._looks_like_product_card(el)]
-
-        accepted = 0
-        for card in card_elements:
-            try:
-                if self._is_within_blacklisted_section(card):
+            card_sources = [None] * len(card_elements)
+
+        # Cards are extracted in chunks so we can stop as soon as max_items are accepted
+        chunk_size = max(1, max_items)
+        for start in range(0, len(card_elements), chunk_size):
+            chunk = []
+            sources = []
+            window = card_elements[start:start + chunk_size]
+            profiles = self._profile_elements(driver, window, visibility=False)
+            for card, source, info in zip(window, card_sources[start:start + chunk_size], profiles):
+                if info["blacklisted"]:
                     continue
-                product = self._extract_fields_from_card(card, base_url)
+                chunk.append(card)
+                sources.append(source)
+            matched: List[Dict[str, str]] = []
+            extracted = self._extract_fields_from_cards(driver, chunk, base_url, selector_sets, matched)
+            for product, source, fields in zip(extracted, sources, matched):
                 if product and self._is_valid_product(product, base_url):
                     products.append(product)
-                    accepted += 1
-                    if accepted >= max_items:
-                        break
-            except Exception:
-                continue
+                    if trace is not None:
+                        self._trace_dom_match(trace, container_selector, source, fields)
+                    if len(products) >= max_items:
+                        return products
 
         return products
 
+    def _trace_dom_match(
+        self,
+        trace: Dict[str, Any],
+        container_selector: Optional[str],
+        card_selector: Optional[str],
+        fields: Dict[str, str],
+    ):
+        trace["container_selector"] = container_selector
+        card_selectors = trace.setdefault("card_selectors", [])
+        if card_selector is None:
+            # Permissive guess: no selector-level recipe can be learned
+            trace["permissive"] = True
+        elif card_selector not in card_selectors:
+            card_selectors.append(card_selector)
+        field_selectors = trace.setdefault("field_selectors", {})
+        for field, sel in fields.items():
+            learned = field_selectors.setdefault(field, [])
+            if sel not in learned:
+                learned.append(sel)
+
+    def _recipe_selector_sets(self, recipe: Dict[str, Any]) -> Dict[str, List[str]]:
+        """Narrow selector_sets to the selectors recorded in a learned DOM recipe."""
+        sets = dict(self.selector_sets)
+        container = recipe.get("container_selector")
+        sets["result_containers"] = [container] if container else []
+        sets["product_cards"] = list(recipe.get("card_selectors") or [])
+        for field, learned in (recipe.get("field_selectors") or {}).items():
+            if field not in self.selector_sets:
+                continue
+            # Keep the original priority order among learned selectors
+            narrowed = [sel for sel in self.selector_sets[field] if sel in learned]
+            if narrowed:
+                sets[field] = narrowed
+        return sets
+
     def _looks_like_product_card(self, el) -> bool:
         try:
             has_link = False
@@ -864,30 +3960,103 @@ class UniversalProductExtractor:
         except Exception:
             return False
 
-    def _extract_fields_from_card(self, card, base_url: str) -> Dict[str, Any]:
-        def find_text(selectors: List[str]) -> Optional[str]:
-            for sel in selectors:
-                try:
-                    el = card.find_element(By.CSS_SELECTOR, sel)
-                    txt = el.get_attribute("content") or el.get_attribute("aria-label") or el.text
-                    txt = self._clean_text(txt)
-                    if txt:
-                        return txt
-                except Exception:
-                    continue
-            return None
+    def _extract_fields_from_cards(
+        self,
+        driver,
+        cards: List[Any],
+        base_url: str,
+        selector_sets: Optional[Dict[str, List[str]]] = None,
+        matched_out: Optional[List[Dict[str, str]]] = None,
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Extract fields for many cards, preferring a single in-page evaluation.
 
-        def find_attr(selectors: List[str], attr: str) -> Optional[str]:
-            for sel in selectors:
+        When `matched_out` is given, it receives one {field: selector} dict per card
+        naming the selector that produced each field.
+        """
+        if not cards:
+            return []
+        sets = selector_sets or self.selector_sets
+        if self.in_page_card_extraction:
+            raw_cards = None
+            try:
+                raw_cards = self._evaluate_in_page(
+                    driver,
+                    _CARD_FIELDS_JS,
+                    {"cards": list(cards), "sets": sets},
+                )
+            except Exception:
+                raw_cards = None
+            if isinstance(raw_cards, list) and len(raw_cards) == len(cards):
+                products: List[Optional[Dict[str, Any]]] = []
+                for raw in raw_cards:
+                    if not isinstance(raw, dict):
+                        products.append(None)
+                        if matched_out is not None:
+                            matched_out.append({})
+                        continue
+                    if matched_out is not None:
+                        matched_out.append(dict(raw.get("_matched") or {}))
+                    products.append(self._build_product_from_raw_fields(raw, base_url))
+                return products
+
+        products = []
+        for card in cards:
+            matched: Dict[str, str] = {}
+            try:
+                products.append(self._extract_fields_from_card(card, base_url, sets, matched))
+            except Exception:
+                products.append(None)
+            if matched_out is not None:
+                matched_out.append(matched)
+        return products
+
+    def _evaluate_in_page(self, driver, function_source: str, payload: Any) -> Any:
+        """Run a JS function expression against `payload` in one driver round trip."""
+        evaluate = getattr(driver, "evaluate_function", None)
+        if evaluate is not None:
+            return evaluate(function_source, payload)
+        return driver.execute_script(f"return ({function_source})(arguments[0]);", payload)
+
+    def _evaluate_elements_in_page(self, driver, function_source: str, payload: Any) -> Any:
+        """Like _evaluate_in_page for functions returning `{elements, data}` with live nodes."""
+        evaluate = getattr(driver, "evaluate_elements", None)
+        if evaluate is not None:
+            return evaluate(function_source, payload)
+        # Selenium hands back WebElements nested anywhere in the returned object
+        return driver.execute_script(f"return ({function_source})(arguments[0]);", payload)
+
+    def _extract_fields_from_card(
+        self,
+        card,
+        base_url: str,
+        selector_sets: Optional[Dict[str, List[str]]] = None,
+        matched: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        sets = selector_sets or self.selector_sets
+        if matched is None:
+            matched = {}
+
+        def pick(field: str, read) -> Optional[str]:
+            for sel in sets[field]:
                 try:
                     el = card.find_element(By.CSS_SELECTOR, sel)
-                    val = el.get_attribute(attr)
+                    val = read(el)
                     if val:
+                        matched[field] = sel
                         return val
                 except Exception:
                     continue
             return None
 
+        def read_text(el) -> Optional[str]:
+            return self._clean_text(el.get_attribute("content") or el.get_attribute("aria-label") or el.text)
+
+        def read_attr(attr: str):
+            return lambda el: el.get_attribute(attr)
+
+        raw: Dict[str, Any] = {}
+
         # Prefer link text as title if available
         title = None
         try:
@@ -903,98 +4072,83 @@ class UniversalProductExtractor:
             except Exception:
                 pass
         if not title:
-            title = find_text(self.selector_sets["title"]) or None
+            title = pick("title", read_text) or None
+        raw["title"] = title
 
         # Prefer link from the most specific selector order
-        link_href = None
-        for sel in self.selector_sets["link"]:
-            try:
-                el = card.find_element(By.CSS_SELECTOR, sel)
-                href = el.get_attribute("href") or el.get_attribute("content")
-                if href:
-                    link_href = href
-                    break
-            except Exception:
-                continue
-
-        image_src = None
-        for sel in self.selector_sets["image"]:
-            try:
-                el = card.find_element(By.CSS_SELECTOR, sel)
-                image_src = (
-                    el.get_attribute("src")
-                    or el.get_attribute("data-src")
-                    or el.get_attribute("data-original")
-                    or el.get_attribute("data-srcset")
-                    or el.get_attribute("content")
-                )
-                if image_src:
-                    break
-            except Exception:
-                continue
+        raw["link"] = pick("link", lambda el: el.get_attribute("href") or el.get_attribute("content"))
+
+        raw["image"] = pick(
+            "image",
+            lambda el: (
+                el.get_attribute("src")
+                or el.get_attribute("data-src")
+                or el.get_attribute("data-original")
+                or el.get_attribute("data-srcset")
+                or el.get_attribute("content")
+            ),
+        )
 
         # Price and currency
-        raw_price = None
-        for sel in self.selector_sets["price"]:
-            try:
-                el = card.find_element(By.CSS_SELECTOR, sel)
-                raw_price = el.get_attribute("content") or el.text
-                raw_price = self._clean_text(raw_price)
-                if raw_price:
-                    break
-            except Exception:
-                continue
+        raw_price = pick("price", lambda el: self._clean_text(el.get_attribute("content") or el.text))
+        raw["raw_price"] = raw_price
+        raw["currency"] = pick("currency", lambda el: self._clean_text(el.get_attribute("content") or el.text))
 
-        currency = None
-        for sel in self.selector_sets["currency"]:
+        # Card text is only needed to recover a price the selectors missed
+        raw["card_text"] = None
+        if not raw_price:
             try:
-                el = card.find_element(By.CSS_SELECTOR, sel)
-                currency = el.get_attribute("content") or el.text
-                currency = self._clean_text(currency)
-                if currency:
-                    break
+                raw["card_text"] = card.text
             except Exception:
-                continue
+                pass
 
+        # Ratings, reviews and availability (best-effort heuristics)
+        raw["rating"] = pick("rating", read_text) or None
+        raw["reviews"] = pick("reviews", read_text) or None
+        raw["availability"] = pick("availability", read_text) or None
+
+        # Brand / SKU / Description
+        raw["brand"] = pick("brand", read_text) or pick("brand", read_attr("data-brand"))
+        raw["sku"] = (
+            pick("sku", read_text)
+            or pick("sku", read_attr("data-sku"))
+            or pick("sku", read_attr("data-product-sku"))
+        )
+
+        def read_description(el) -> Optional[str]:
+            desc = self._clean_text(el.get_attribute("content") or el.text)
+            return desc if desc and len(desc) > 15 else None
+
+        raw["description"] = pick("description", read_description)
+
+        return self._build_product_from_raw_fields(raw, base_url)
+
+    def _build_product_from_raw_fields(self, raw: Dict[str, Any], base_url: str) -> Dict[str, Any]:
+        """Normalize raw card field values (from WebDriver calls or in-page JS) into a product dict."""
+        title = self._clean_text(raw.get("title"))
+        link_href = raw.get("link")
+        image_src = raw.get("image")
+
+        raw_price = self._clean_text(raw.get("raw_price"))
         # Try parsing price from entire card text if selector missed
         if not raw_price:
             try:
-                raw_price = self._extract_price_from_text(card.text)
+                raw_price = self._extract_price_from_text(raw.get("card_text"))
             except Exception:
                 pass
 
+        currency = self._clean_text(raw.get("currency"))
         parsed_price, detected_currency = self._parse_price(raw_price)
         if not currency:
             currency = detected_currency
 
-        # Ratings and reviews (best-effort heuristics)
-        rating_text = find_text(self.selector_sets["rating"]) or None
-        review_text = find_text(self.selector_sets["reviews"]) or None
-        rating_value = self._parse_rating(rating_text)
-        review_count = self._parse_int(review_text)
+        rating_value = self._parse_rating(raw.get("rating"))
+        review_count = self._parse_int(raw.get("reviews"))
+        in_stock = self._infer_in_stock(raw.get("availability"))
 
-        # Availability
-        availability_text = find_text(self.selector_sets["availability"]) or None
-        in_stock = self._infer_in_stock(availability_text)
-
-        # Brand / SKU / Description
-        brand = find_text(self.selector_sets["brand"]) or find_attr(self.selector_sets["brand"], "data-brand")
-
-        sku = find_text(self.selector_sets["sku"]) or find_attr(self.selector_sets["sku"], "data-sku")
-        if not sku:
-            sku = find_attr(self.selector_sets["sku"], "data-product-sku")
-
-        description = None
-        for sel in self.selector_sets["description"]:
-            try:
-                el = card.find_element(By.CSS_SELECTOR, sel)
-                desc = el.get_attribute("content") or el.text
-                desc = self._clean_text(desc)
-                if desc and len(desc) > 15:
-                    description = desc[:400]
-                    break
-            except Exception:
-                continue
+        description = self._clean_text(raw.get("description"))
+        if description:
+            description = description[:400]
 
         return {
             "title": title,
@@ -1006,19 +4160,29 @@ class UniversalProductExtractor:
             "rating": rating_value,
             "review_count": review_count,
             "in_stock": in_stock,
-            "brand": brand,
-            "sku": sku,
+            "brand": raw.get("brand"),
+            "sku": raw.get("sku"),
             "description": description,
         }
 
     # ----------------------------- JSON-LD Fallback ----------------------------
 
     def _extract_from_jsonld(self, driver: webdriver.Chrome, base_url: str, max_items: int) -> List[Dict[str, Any]]:
+        return self._products_from_jsonld_texts(self._script_texts(driver, _JSONLD_SCRIPTS_XPATH), base_url, max_items)
+
+    def _script_texts(self, driver, xpath: str) -> List[str]:
+        texts: List[str] = []
+        for s in driver.find_elements(By.XPATH, xpath):
+            try:
+                texts.append(s.get_attribute("innerText") or "")
+            except Exception:
+                continue
+        return texts
+
+    def _products_from_jsonld_texts(self, texts: List[str], base_url: str, max_items: int) -> List[Dict[str, Any]]:
         products: List[Dict[str, Any]] = []
-        scripts = driver.find_elements(By.XPATH, "//script[@type='application/ld+json']")
-        for s in scripts:
+        for content in texts:
             try:
-                content = s.get_attribute("innerText") or ""
                 blobs = self._safe_jsons_from_script(content)
                 for blob in blobs:
                     self._collect_products_from_ldjson(blob, base_url, products, max_items)
@@ -1119,7 +4283,56 @@ class UniversalProductExtractor:
 
     # ------------------------------- Utilities --------------------------------
 
+    def _install_readiness_hooks(self, driver):
+        """Register the fetch/XHR in-flight counter for future documents (Selenium via CDP)."""
+        if not self.event_readiness or getattr(driver, "_readiness_hooks", False):
+            return
+        if not hasattr(driver, "execute_cdp_cmd"):
+            return  # Playwright contexts get the init script when they are created
+        try:
+            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": _INFLIGHT_TRACKER_JS})
+            driver._readiness_hooks = True
+        except Exception:
+            pass
+
+    def _await_in_page(self, driver, function_source: str, payload: Any, timeout_ms: int) -> Any:
+        """Run a promise-returning JS function and return what it resolves to (None on failure)."""
+        evaluate = getattr(driver, "evaluate_function", None)
+        if evaluate is not None:
+            return evaluate(function_source, payload)
+        try:
+            # Selenium's async-script timeout must outlast the in-page ceiling
+            needed = timeout_ms / 1000 + 5
+            if getattr(driver, "_script_timeout", 0) < needed:
+                driver.set_script_timeout(max(30, needed))
+                driver._script_timeout = max(30, needed)
+            return driver.execute_async_script(
+                "const done = arguments[arguments.length - 1];"
+                f"Promise.resolve(({function_source})(arguments[0])).then(done, () => done(null));",
+                payload,
+            )
+        except Exception:
+            return None
+
+    def _readiness_timeout_ms(self, fallback_seconds: float, ceiling_ms: Optional[int] = None) -> int:
+        """Longest quiet wait: an explicit ceiling, READINESS_CEILING_MS, or else the sleep it replaces."""
+        return ceiling_ms or self.readiness_ceiling_ms or max(1, int(fallback_seconds * 1000))
+
+    def _wait_until_quiet(self, driver, fallback_seconds: float, ceiling_ms: Optional[int] = None):
+        """Return once the page settles (capped at the readiness ceiling); fixed sleep when disabled."""
+        if self.event_readiness:
+            timeout_ms = self._readiness_timeout_ms(fallback_seconds, ceiling_ms)
+            payload = {
+                "quietMs": min(self.readiness_quiet_ms, timeout_ms),
+                "timeoutMs": timeout_ms,
+                "cardSelectors": self.selector_sets["product_cards"],
+            }
+            if self._await_in_page(driver, _WAIT_FOR_QUIET_JS, payload, timeout_ms) is not None:
+                return
+        time.sleep(fallback_seconds)
+
     def _dismiss_known_popups(self, driver: webdriver.Chrome):
+        clicked = False
         for selector in self.popup_close_selectors:
             try:
                 elements = driver.find_elements(By.CSS_SELECTOR, selector)
@@ -1127,13 +4340,36 @@ class UniversalProductExtractor:
                     try:
                         if element.is_displayed():
                             driver.execute_script("arguments[0].click();", element)
-                            time.sleep(0.3)
+                            clicked = True
+                            if not self.event_readiness:
+                                time.sleep(0.3)
                     except Exception:
                         continue
             except Exception:
                 continue
+        if clicked and self.event_readiness:
+            # Overlays animate out quickly; never hold the page for the full ceiling
+            self._wait_until_quiet(driver, 0.3, ceiling_ms=max(300, self.readiness_quiet_ms))
+
+    def _count_product_cards(self, driver) -> int:
+        try:
+            count = self._evaluate_in_page(driver, _COUNT_CARDS_JS, {"selectors": self.selector_sets["product_cards"]})
+        except Exception:
+            return 0
+        return int(count) if isinstance(count, (int, float)) else 0
+
+    def _progressive_scroll_and_load(self, driver: webdriver.Chrome, max_items: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Scroll and click load-more until the page stops growing or, when max_items is
+        given, until enough product cards are present. Returns the rounds used and
+        whether the card count ended scrolling early.
+        """
+        scroll = {"rounds": 0, "stopped_early": False}
+        check_cards = self.scroll_early_stop and bool(max_items)
+        if check_cards and self._count_product_cards(driver) >= max_items:
+            scroll["stopped_early"] = True
+            return scroll
 
-    def _progressive_scroll_and_load(self, driver: webdriver.Chrome):
         try:
             last_height = driver.execute_script("return document.body.scrollHeight")
         except Exception:
@@ -1144,7 +4380,11 @@ class UniversalProductExtractor:
                 driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
             except Exception:
                 break
-            time.sleep(1.2)
+            scroll["rounds"] += 1
+            self._wait_until_quiet(driver, 1.2)
+            if check_cards and self._count_product_cards(driver) >= max_items:
+                scroll["stopped_early"] = True
+                break
             self._click_load_more(driver)
             self._dismiss_known_popups(driver)
             try:
@@ -1154,6 +4394,7 @@ class UniversalProductExtractor:
             if new_height <= last_height:
                 break
             last_height = new_height
+        return scroll
 
     def _click_load_more(self, driver: webdriver.Chrome) -> bool:
         clicked = False
@@ -1164,12 +4405,15 @@ class UniversalProductExtractor:
                     if btn.is_displayed() and btn.is_enabled():
                         try:
                             driver.execute_script("arguments[0].click();", btn)
-                            time.sleep(1)
                             clicked = True
+                            if not self.event_readiness:
+                                time.sleep(1)
                         except Exception:
                             continue
             except Exception:
                 continue
+        if clicked and self.event_readiness:
+            self._wait_until_quiet(driver, 1)
         return clicked
 
     def _setup_driver(self) -> webdriver.Chrome:
@@ -1186,7 +4430,7 @@ class UniversalProductExtractor:
         if use_playwright and PLAYWRIGHT_AVAILABLE:
             try:
                 manager = self._get_playwright_manager()
-                context, page = manager.new_context_page()
+                context, page = manager.acquire_context_page()
                 self._thread_local.profile_dir = None
                 return UniversalProductExtractor._PWDriver(manager, context, page)  # type: ignore[return-value]
             except Exception as exc:
@@ -1205,7 +4449,7 @@ class UniversalProductExtractor:
         chrome_options.add_argument('--disable-blink-features=AutomationControlled')
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"]) 
         chrome_options.add_experimental_option('useAutomationExtension', False)
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+        chrome_options.add_argument(f"--user-agent={_BROWSER_USER_AGENT}")
         # Reduce Chrome child-process fan-out and memory
         chrome_options.add_argument('--no-zygote')
         chrome_options.add_argument('--renderer-process-limit=1')
@@ -1332,13 +4576,17 @@ class UniversalProductExtractor:
         raise RuntimeError("Failed to create Chrome driver after all retries")
 
     def _wait_for_any_selector(self, driver: webdriver.Chrome, selectors: List[str], wait_seconds: int):
+        if self.event_readiness:
+            timeout_ms = max(1, wait_seconds) * 1000
+            payload = {"selectors": selectors, "timeoutMs": timeout_ms}
+            # A timeout resolves too (soft, as below); None means the script itself failed
+            if self._await_in_page(driver, _WAIT_FOR_SELECTOR_JS, payload, timeout_ms) is not None:
+                return
         end = time.time() + wait_seconds
         while time.time() < end:
             for sel in selectors:
                 try:
-                    els = driver.find_elements(By.CSS_SELECTOR, sel)
-                    visible = [e for e in els if e.is_displayed()]
-                    if visible:
+                    if any(info["visible"] for _, info in self._query_elements(driver, sel, ancestry=False)):
                         return
                 except Exception:
                     continue
@@ -1346,15 +4594,65 @@ class UniversalProductExtractor:
         # Soft timeout only; DOM extraction still attempts heuristics
 
     def _find_first_nonempty_set(self, driver: webdriver.Chrome, selectors: List[str], by: By):
+        return self._find_first_nonempty_set_with_selector(driver, selectors, by)[0]
+
+    def _find_first_nonempty_set_with_selector(
+        self, driver: webdriver.Chrome, selectors: List[str], by: By
+    ) -> Tuple[List[Any], Optional[str]]:
+        if by == By.CSS_SELECTOR:
+            matched = self._match_selector_set(driver, selectors)
+            if matched is not None:
+                best = min((min(hit["matches"]) for _, hit in matched), default=None)
+                if best is None:
+                    return [], None
+                return [el for el, hit in matched if best in hit["matches"]], selectors[best]
         for sel in selectors:
             try:
                 els = driver.find_elements(by, sel)
-                els = [e for e in els if e.is_displayed()]
+                profiles = self._profile_elements(driver, els, ancestry=False)
+                els = [e for e, info in zip(els, profiles) if info["visible"]]
                 if els:
-                    return els
+                    return els, sel
             except Exception:
                 continue
-        return []
+        return [], None
+
+    _SELECTOR_SET_CACHE: Dict[Tuple[str, ...], str] = {}
+
+    @classmethod
+    def _compile_selector_set(cls, selectors: List[str]) -> str:
+        key = tuple(selectors)
+        combined = cls._SELECTOR_SET_CACHE.get(key)
+        if combined is None:
+            combined = ", ".join(key)
+            cls._SELECTOR_SET_CACHE[key] = combined
+        return combined
+
+    def _match_selector_set(
+        self, driver, selectors: List[str], containers: Optional[List[Any]] = None
+    ) -> Optional[List[Tuple[Any, Dict[str, Any]]]]:
+        """Visible matches of a selector set as (element, {matches, within}) in document order.
+
+        `matches` lists the indices of the selectors the element matches and `within`
+        the indices of `containers` holding it. The elements come back from the same
+        evaluation, so the page is matched in a single round trip. Returns None when the
+        set cannot be matched in-page (snapshot drivers, an invalid member selector) so
+        callers fall back to one query per selector.
+        """
+        if not self.compiled_selector_sets or not selectors:
+            return None
+        combined = self._compile_selector_set(selectors)
+        payload = {"combined": combined, "selectors": list(selectors), "containers": list(containers or [])}
+        try:
+            result = self._evaluate_elements_in_page(driver, _SELECTOR_SET_MATCH_JS, payload)
+        except Exception:
+            return None
+        if not isinstance(result, dict) or not isinstance(result.get("data"), list):
+            return None
+        elements = result.get("elements") or []
+        if len(elements) != len(result["data"]) or any(el is None for el in elements):
+            return None
+        return list(zip(elements, result["data"]))
 
     def _page_indicates_no_results(self, driver: webdriver.Chrome) -> bool:
         try:
@@ -1366,19 +4664,22 @@ class UniversalProductExtractor:
     # ------------------------ Structured Data Strategies -----------------------
 
     def _extract_from_microdata(self, driver: webdriver.Chrome, base_url: str, max_items: int) -> List[Dict[str, Any]]:
-        products: List[Dict[str, Any]] = []
         try:
-            nodes = driver.find_elements(By.CSS_SELECTOR, '[itemscope][itemtype*="Product" i]')
+            matches = self._query_elements(driver, _MICRODATA_PRODUCT_SELECTOR, visibility=False)
         except Exception:
-            nodes = []
+            matches = []
 
+        return self._products_from_microdata_nodes(
+            [node for node, info in matches if not info["blacklisted"]], base_url, max_items
+        )
+
+    def _products_from_microdata_nodes(self, nodes: List[Any], base_url: str, max_items: int) -> List[Dict[str, Any]]:
+        """Map itemscope Product nodes; `nodes` may also hold their outerHTML (parsed with lxml)."""
+        products: List[Dict[str, Any]] = []
         for node in nodes:
             try:
-                if self._is_within_blacklisted_section(node):
-                    continue
-            except Exception:
-                pass
-            try:
+                if isinstance(node, str):
+                    node = UniversalProductExtractor._SnapshotElement(lxml.html.fragment_fromstring(node))
                 product = self._extract_microdata_node(node, base_url)
                 if product and self._is_valid_product(product, base_url):
                     products.append(product)
@@ -1474,14 +4775,17 @@ class UniversalProductExtractor:
         }
 
     def _extract_from_inline_data_scripts(self, driver: webdriver.Chrome, base_url: str, max_items: int) -> List[Dict[str, Any]]:
+        return self._products_from_inline_json_texts(
+            self._script_texts(driver, _INLINE_JSON_SCRIPTS_XPATH), base_url, max_items
+        )
+
+    def _products_from_inline_json_texts(self, texts: List[str], base_url: str, max_items: int) -> List[Dict[str, Any]]:
         products: List[Dict[str, Any]] = []
-        scripts = driver.find_elements(By.XPATH, "//script[@type='application/json' or @type='text/json' or @type='text/plain']")
-        for s in scripts:
+        for raw in texts:
             try:
-                raw = s.get_attribute('innerText') or ''
                 if not raw:
                     continue
-                if len(raw) > 500_000:
+                if len(raw) > _INLINE_JSON_MAX_CHARS:
                     continue  # avoid huge blobs
                 blobs = self._safe_jsons_from_script(raw)
                 for blob in blobs:
@@ -1582,17 +4886,13 @@ class UniversalProductExtractor:
     def _extract_by_global_heuristics(self, driver: webdriver.Chrome, base_url: str, max_items: int) -> List[Dict[str, Any]]:
         products: List[Dict[str, Any]] = []
         # Avoid header/footer/nav/aside
-        candidates = driver.find_elements(By.CSS_SELECTOR, "main, section, div")
-        candidates = [c for c in candidates if c.is_displayed()]
-        for cont in candidates:
+        candidates = self._query_elements(driver, "main, section, div")
+        for cont, cont_info in candidates:
+            if not cont_info["visible"] or cont_info["blacklisted"]:
+                continue
             try:
-                if self._is_within_blacklisted_section(cont):
-                    continue
-                cards = cont.find_elements(By.CSS_SELECTOR, 'li, div, article')
-                for card in cards:
-                    if not card.is_displayed():
-                        continue
-                    if self._is_within_blacklisted_section(card):
+                for card, info in self._query_elements(driver, 'li, div, article', root=cont):
+                    if not info["visible"] or info["blacklisted"]:
                         continue
                     if not self._looks_like_product_card(card):
                         continue
@@ -1607,13 +4907,11 @@ class UniversalProductExtractor:
 
     def _extract_from_links_with_images(self, driver: webdriver.Chrome, base_url: str, max_items: int) -> List[Dict[str, Any]]:
         products: List[Dict[str, Any]] = []
-        anchors = driver.find_elements(By.CSS_SELECTOR, 'a[href]')
-        for a in anchors:
+        anchors = self._query_elements(driver, 'a[href]')
+        for a, info in anchors:
+            if not info["visible"] or info["blacklisted"]:
+                continue
             try:
-                if not a.is_displayed():
-                    continue
-                if self._is_within_blacklisted_section(a):
-                    continue
                 href = a.get_attribute('href')
                 if not self._is_potential_product_href(href, base_url):
                     continue
@@ -1684,6 +4982,44 @@ class UniversalProductExtractor:
             return False
         return False
 
+    def _profile_elements(
+        self, driver, elements: List[Any], visibility: bool = True, ancestry: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Return {visible, blacklisted, rect} for each element, in order.
+
+        The in-page program always answers every field; the per-element fallback only
+        runs the checks asked for and reports the others as visible / not blacklisted.
+        """
+        if not elements:
+            return []
+        if self.bulk_element_queries:
+            try:
+                payload = {"elements": list(elements), "blacklist": sorted(self.blacklisted_sections)}
+                profiles = self._evaluate_in_page(driver, _ELEMENT_PROFILE_JS, payload)
+            except Exception:
+                profiles = None
+            if isinstance(profiles, list) and len(profiles) == len(elements):
+                return [p or {"visible": False, "blacklisted": False, "rect": None} for p in profiles]
+        # Snapshot drivers have no script engine; per-element checks are cheap there
+        profiles = []
+        for el in elements:
+            visible = True
+            if visibility:
+                try:
+                    visible = bool(el.is_displayed())
+                except Exception:
+                    visible = False
+            blacklisted = bool(ancestry and visible and self._is_within_blacklisted_section(el))
+            profiles.append({"visible": visible, "blacklisted": blacklisted, "rect": None})
+        return profiles
+
+    def _query_elements(
+        self, driver, selector: str, root=None, visibility: bool = True, ancestry: bool = True
+    ) -> List[Tuple[Any, Dict[str, Any]]]:
+        """Match `selector` under `root` (default: the document) and profile every match."""
+        elements = (root or driver).find_elements(By.CSS_SELECTOR, selector)
+        return list(zip(elements, self._profile_elements(driver, elements, visibility, ancestry)))
+
     def _is_valid_product(self, product: Dict[str, Any], base_url: str) -> bool:
         url = product.get('product_url')
         title = self._clean_text(product.get('title')) if product.get('title') else None
@@ -1866,8 +5202,77 @@ class UniversalProductExtractor:
 
     # ----------------------------- Database Operations -----------------------------
 
+    @staticmethod
+    def _build_db_row(product: Dict[str, Any], platform_url: str, product_type_id: Optional[int] = None,
+                      searched_product_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Validate a product and map it to an r_product_data row; None if name or URL is missing."""
+        # Validate and sanitize rating (must be between 0 and 100)
+        rating = product.get("rating")
+        if rating is not None:
+            try:
+                rating_float = float(rating)
+                # Clamp rating between 0 and 100 (some sites use 0-10, some 0-5, some 0-100)
+                if rating_float < 0:
+                    rating = 0.0
+                elif rating_float > 100:
+                    rating = 100.0
+                else:
+                    rating = round(rating_float, 2)
+            except (ValueError, TypeError):
+                rating = None
+
+        # Validate and sanitize price
+        price = product.get("price")
+        if price is not None:
+            try:
+                price_float = float(price)
+                # Ensure price is positive and reasonable (max 999999999.99)
+                if price_float < 0:
+                    price = None
+                elif price_float > 999999999.99:
+                    price = 999999999.99
+                else:
+                    price = round(price_float, 2)
+            except (ValueError, TypeError):
+                price = None
+
+        # Validate reviews count (must be positive integer)
+        reviews = product.get("review_count")
+        if reviews is not None:
+            try:
+                reviews_int = int(float(reviews))  # Handle float strings
+                if reviews_int < 0:
+                    reviews = None
+                else:
+                    reviews = reviews_int
+            except (ValueError, TypeError):
+                reviews = None
+
+        # Map extracted fields to database fields
+        db_data = {
+            "platform_url": platform_url,
+            "product_name": product.get("title") or "",
+            "original_price": product.get("raw_price"),  # Keep as text for display
+            "current_price": price,
+            "product_url": product.get("product_url") or "",
+            "product_image_url": product.get("image_url"),
+            "description": product.get("description"),
+            "rating": rating,
+            "reviews": reviews,
+            "in_stock": product.get("in_stock"),
+            "brand": product.get("brand"),
+            "product_type_id": product_type_id,
+            "searched_product_id": searched_product_id,
+        }
+
+        # Skip if required fields are missing
+        if not db_data["product_name"] or not db_data["product_url"]:
+            return None
+        return db_data
+
     def _save_products_to_db(self, products: List[Dict[str, Any]], platform_url: str, platform: str,
-                           product_type_id: Optional[int] = None, searched_product_id: Optional[int] = None) -> int:
+                           product_type_id: Optional[int] = None, searched_product_id: Optional[int] = None,
+                           url_id: Optional[int] = None, counts_out: Optional[Dict[str, int]] = None) -> int:
         """
         Save extracted products to the r_product_data table in Supabase
         
@@ -1877,9 +5282,11 @@ class UniversalProductExtractor:
             platform: Platform domain name
             product_type_id: ID of the product type from product_type_table (optional)
             searched_product_id: ID of the product from products table that was searched for (optional)
+            url_id: product_page_urls row the products came from (optional)
+            counts_out: Receives "inserted"/"updated" row counts when given (optional)
             
         Returns:
-            Number of products successfully saved
+            Number of products successfully saved (queued, when WRITE_BEHIND is enabled)
         """
         if not self.supabase:
             print("[!] Supabase not available - products not saved to database")
@@ -1889,110 +5296,441 @@ class UniversalProductExtractor:
             print("[!] No products to save")
             return 0
         
-        saved_count = 0
-        failed_count = 0
-        
         _log_with_thread(f"Saving {len(products)} products to database...", "[*]")
-        
+
+        rows: List[Dict[str, Any]] = []
+        failed_count = 0
         for product in products:
+            row = self._build_db_row(product, platform_url, product_type_id, searched_product_id)
+            if row is None:
+                _log_with_thread("Skipping product - missing required fields (name or URL)", "[!]")
+                failed_count += 1
+                continue
+            rows.append(row)
+
+        # Rows identical to what was last written are already in the database
+        unchanged = 0
+        change_index = _get_change_index()
+        if change_index is not None:
+            rows, unchanged = change_index.filter_changed(rows)
+            if unchanged:
+                _log_with_thread(f"Skipping {unchanged} unchanged products", "[*]")
+        if counts_out is not None:
+            counts_out["unchanged"] = unchanged
+
+        write_queue = _get_write_queue()
+        if write_queue is not None:
+            queued = write_queue.submit_rows(url_id, rows, already_saved=unchanged)
+            _log_with_thread(f"Queued {queued}/{len(products)} products for database write", "[✓]")
+            return queued + unchanged
+
+        outcomes, inserted, updated = _write_product_rows(self.supabase, rows, self.db_insert_chunk_size)
+        saved_count = sum(outcomes) + unchanged
+        failed_count += len(outcomes) - sum(outcomes)
+        if counts_out is not None:
+            counts_out["inserted"] = inserted
+            counts_out["updated"] = updated
+        if updated:
+            _log_with_thread(f"Inserted {inserted} new products, updated {updated} existing", "[*]")
+
+        _log_with_thread(f"Saved {saved_count}/{len(products)} products to database", "[✓]")
+        if failed_count > 0:
+            _log_with_thread(f"Failed to save {failed_count} products", "[!]")
+        
+        return saved_count
+
+
+# ============================================================================
+# Snapshot parsing process pool
+# ============================================================================
+
+
+_SNAPSHOT_POOL_LOCK = threading.Lock()
+_SNAPSHOT_POOL: Optional[ProcessPoolExecutor] = None
+_SNAPSHOT_POOL_DISABLED = False
+_SNAPSHOT_WORKER_EXTRACTOR: Optional[UniversalProductExtractor] = None
+
+
+def _get_snapshot_process_pool() -> Optional[ProcessPoolExecutor]:
+    """Return the shared snapshot parsing pool, or None to parse in the calling thread."""
+    global _SNAPSHOT_POOL, _SNAPSHOT_POOL_DISABLED
+    workers = _get_env_int("SNAPSHOT_PROCESS_WORKERS", 0)
+    if workers <= 0 or _SNAPSHOT_POOL_DISABLED:
+        return None
+    with _SNAPSHOT_POOL_LOCK:
+        if _SNAPSHOT_POOL is None:
             try:
-                # Validate and sanitize rating (must be between 0 and 100)
-                rating = product.get("rating")
-                if rating is not None:
-                    try:
-                        rating_float = float(rating)
-                        # Clamp rating between 0 and 100 (some sites use 0-10, some 0-5, some 0-100)
-                        if rating_float < 0:
-                            rating = 0.0
-                        elif rating_float > 100:
-                            rating = 100.0
-                        else:
-                            rating = round(rating_float, 2)
-                    except (ValueError, TypeError):
-                        rating = None
-                
-                # Validate and sanitize price
-                price = product.get("price")
-                if price is not None:
-                    try:
-                        price_float = float(price)
-                        # Ensure price is positive and reasonable (max 999999999.99)
-                        if price_float < 0:
-                            price = None
-                        elif price_float > 999999999.99:
-                            price = 999999999.99
-                        else:
-                            price = round(price_float, 2)
-                    except (ValueError, TypeError):
-                        price = None
-                
-                # Validate reviews count (must be positive integer)
-                reviews = product.get("review_count")
-                if reviews is not None:
-                    try:
-                        reviews_int = int(float(reviews))  # Handle float strings
-                        if reviews_int < 0:
-                            reviews = None
-                        else:
-                            reviews = reviews_int
-                    except (ValueError, TypeError):
-                        reviews = None
-                
-                # Map extracted fields to database fields
-                db_data = {
-                    "platform_url": platform_url,
-                    "product_name": product.get("title") or "",
-                    "original_price": product.get("raw_price"),  # Keep as text for display
-                    "current_price": price,
-                    "product_url": product.get("product_url") or "",
-                    "product_image_url": product.get("image_url"),
-                    "description": product.get("description"),
-                    "rating": rating,
-                    "reviews": reviews,
-                    "in_stock": product.get("in_stock"),
-                    "brand": product.get("brand"),
-                    "product_type_id": product_type_id,
-                    "searched_product_id": searched_product_id,
-                }
-                
-                # Skip if required fields are missing
-                if not db_data["product_name"] or not db_data["product_url"]:
-                    _log_with_thread("Skipping product - missing required fields (name or URL)", "[!]")
-                    failed_count += 1
-                    continue
-                
-                # Insert into database
-                # If product_url has unique constraint, duplicates will be handled by database
-                response = self.supabase.table("r_product_data").insert(db_data).execute()
-                
-                if response.data:
-                    saved_count += 1
-                    if saved_count % 10 == 0:
-                        _log_with_thread(f"Saved {saved_count} products so far...", "[*]")
-                else:
-                    failed_count += 1
-                    
-            except Exception as e:
-                error_msg = str(e).lower()
-                # Handle duplicate key errors gracefully (if product_url has unique constraint)
-                if "duplicate" in error_msg or "unique" in error_msg or "constraint" in error_msg:
-                    # Product already exists, skip silently
-                    saved_count += 1  # Count as successful since product already exists
-                else:
-                    _log_with_thread(f"Error saving product: {e}", "[✗]")
-                    failed_count += 1
+                # Spawn avoids forking a process that already runs browser/event-loop threads
+                _SNAPSHOT_POOL = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                print(f"[*] Snapshot parsing process pool started with {workers} workers")
+            except Exception as exc:
+                print(f"[!] Failed to start snapshot parsing pool ({exc}); parsing in worker threads")
+                _SNAPSHOT_POOL_DISABLED = True
+                return None
+        return _SNAPSHOT_POOL
+
+
+def _shutdown_snapshot_process_pool() -> None:
+    global _SNAPSHOT_POOL
+    with _SNAPSHOT_POOL_LOCK:
+        pool = _SNAPSHOT_POOL
+        _SNAPSHOT_POOL = None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+# ============================================================================
+# Structured-data parsing pool
+# ============================================================================
+
+
+_STRUCTURED_DATA_POOL_LOCK = threading.Lock()
+_STRUCTURED_DATA_POOL: Optional[ThreadPoolExecutor] = None
+
+
+def _get_structured_data_pool() -> ThreadPoolExecutor:
+    """Shared thread pool that parses structured-data sources for STRUCTURED_DATA_FANOUT."""
+    global _STRUCTURED_DATA_POOL
+    with _STRUCTURED_DATA_POOL_LOCK:
+        if _STRUCTURED_DATA_POOL is None:
+            _STRUCTURED_DATA_POOL = ThreadPoolExecutor(
+                max_workers=max(1, _get_env_int("STRUCTURED_DATA_WORKERS", 4)),
+                thread_name_prefix="StructuredDataParser",
+            )
+        return _STRUCTURED_DATA_POOL
+
+
+def _extract_products_from_snapshot(
+    html: str, url: str, max_items: int, recipe: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Process pool entry point: run the strategy ladder on an HTML snapshot."""
+    global _SNAPSHOT_WORKER_EXTRACTOR
+    if _SNAPSHOT_WORKER_EXTRACTOR is None:
+        _SNAPSHOT_WORKER_EXTRACTOR = UniversalProductExtractor(connect_db=False)
+    extractor = _SNAPSHOT_WORKER_EXTRACTOR
+    driver = UniversalProductExtractor._SnapshotDriver(html, url)
+    return extractor._run_extraction_strategies(driver, url, max_items, recipe)
+
+
+# ============================================================================
+# Parallel execution helpers
+# ============================================================================
+
+
+class _AIMDController:
+    """
+    Additive-increase / multiplicative-decrease limit on concurrently running jobs.
+
+    Every `increase_interval` seconds without trouble while all slots are busy, one
+    slot is added (up to `max_slots`). Overload (child-process/FD/RAM pressure, browser
+    launch failures or a domain's job latency far above that domain's best observed)
+    multiplies the slot count by `decrease_factor`, at most once per `cooldown` seconds.
+    Latency is tracked per domain so a mix of fast and slow sites is not read as load.
+    """
+
+    # Jobs a domain must finish before its latency average counts as a signal
+    _LATENCY_WARMUP = 5
+
+    _LAUNCH_FAILURE_MARKERS = (
+        "errno 11", "resource temporarily unavailable", "playwright setup failed",
+        "session not created", "chrome failed to start", "cannot allocate memory",
+    )
+
+    def __init__(self, initial_slots: int, min_slots: int, max_slots: int):
+        self.min_slots = max(1, min_slots)
+        self.max_slots = max(self.min_slots, max_slots)
+        self.slots = min(self.max_slots, max(self.min_slots, initial_slots))
+        self.decrease_factor = min(0.95, max(0.1, _get_env_int("ADAPTIVE_DECREASE_PERCENT", 70) / 100.0))
+        self.increase_interval = float(_get_env_int("ADAPTIVE_INCREASE_SECONDS", 10))
+        self.cooldown = float(_get_env_int("ADAPTIVE_COOLDOWN_SECONDS", 15))
+        self.sample_interval = float(_get_env_int("ADAPTIVE_SAMPLE_SECONDS", 2))
+        self.latency_factor = max(1.2, _get_env_int("ADAPTIVE_LATENCY_FACTOR_PERCENT", 250) / 100.0)
+        self.ram_high_percent = float(_get_env_int("ADAPTIVE_RAM_HIGH_PERCENT", 85))
+        self.child_limit = _get_env_int("CHILD_PROC_THRESHOLD", 150)
+        self.fd_limit = _get_env_int("FD_THRESHOLD", 2048)
+        self._lock = threading.Lock()
+        now = time.time()
+        self._last_increase = now
+        self._last_decrease = 0.0
+        self._last_sample = 0.0
+        # netloc -> {"ewma", "best", "samples"}
+        self._latency: Dict[str, Dict[str, Any]] = {}
+        self._stats = {"increases": 0, "decreases": 0, "min_seen": self.slots, "max_seen": self.slots}
+
+    @classmethod
+    def from_env(cls, workers: int) -> "_AIMDController":
+        # Never exceed the worker count sized for this host unless raised explicitly
+        max_slots = _get_env_int("ADAPTIVE_MAX_SLOTS", workers)
+        return cls(
+            initial_slots=_get_env_int("ADAPTIVE_INITIAL_SLOTS", workers),
+            min_slots=_get_env_int("ADAPTIVE_MIN_SLOTS", 1),
+            max_slots=max_slots,
+        )
+
+    def observe(self, result: Dict[str, Any], in_flight: int):
+        """Feed one finished job into the controller and adjust the slot count."""
+        now = time.time()
+        error = str(result.get("error") or "").lower()
+        reason: Optional[str] = None
+        if error and any(marker in error for marker in self._LAUNCH_FAILURE_MARKERS):
+            reason = "launch failure"
+        elif result.get("success") and result.get("duration_seconds"):
+            domain = urlparse(result.get("page_url") or result.get("url") or "").netloc
+            reason = self._observe_latency(domain, float(result["duration_seconds"]))
+        if reason is None and now - self._last_sample >= self.sample_interval:
+            self._last_sample = now
+            reason = self._resource_pressure()
+        if reason is not None:
+            self._decrease(reason, now)
+        elif in_flight >= self.slots:
+            self._maybe_increase(now)
+
+    def _observe_latency(self, domain: str, duration: float) -> Optional[str]:
+        with self._lock:
+            entry = self._latency.setdefault(domain, {"ewma": None, "best": None, "samples": 0})
+            entry["samples"] += 1
+            ewma = duration if entry["ewma"] is None else 0.8 * entry["ewma"] + 0.2 * duration
+            entry["ewma"] = ewma
+            if entry["samples"] < self._LATENCY_WARMUP:
+                return None
+            if entry["best"] is None or ewma < entry["best"]:
+                entry["best"] = ewma
+            if ewma > entry["best"] * self.latency_factor:
+                return f"{domain or 'unknown'} latency {ewma:.1f}s vs its best {entry['best']:.1f}s"
+        return None
+
+    def _resource_pressure(self) -> Optional[str]:
+        children = _count_child_processes()
+        if self.child_limit and children > self.child_limit:
+            return f"child processes {children}>{self.child_limit}"
+        fds = _count_open_fds()
+        if self.fd_limit and fds > self.fd_limit:
+            return f"open fds {fds}>{self.fd_limit}"
+        ram = _get_ram_usage()
+        if ram["total_gb"] > 0 and ram["percent"] >= self.ram_high_percent:
+            return f"RAM {ram['percent']:.0f}%"
+        return None
+
+    def _decrease(self, reason: str, now: float):
+        with self._lock:
+            if now - self._last_decrease < self.cooldown:
+                return
+            old = self.slots
+            self.slots = max(self.min_slots, int(self.slots * self.decrease_factor))
+            self._last_decrease = now
+            self._last_increase = now
+            # Let latency re-baseline at the new level; each domain keeps its best
+            for entry in self._latency.values():
+                entry["ewma"] = None
+                entry["samples"] = 0
+            if self.slots == old:
+                return
+            self._stats["decreases"] += 1
+            self._stats["min_seen"] = min(self._stats["min_seen"], self.slots)
+        _log_with_thread(f"Concurrency {old} → {self.slots} slots ({reason})", "[AIMD]")
+
+    def _maybe_increase(self, now: float):
+        with self._lock:
+            if self.slots >= self.max_slots or now - self._last_increase < self.increase_interval:
+                return
+            if now - self._last_decrease < self.cooldown:
+                return
+            self.slots += 1
+            self._last_increase = now
+            self._stats["increases"] += 1
+            self._stats["max_seen"] = max(self._stats["max_seen"], self.slots)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, slots=self.slots)
+
+
+class _DomainScheduler:
+    """
+    Politeness-aware job queue. Jobs are grouped by `urlparse(url).netloc` and handed
+    out round-robin across domains, never exceeding a domain's max in-flight count
+    (0 means unlimited) or starting two of its jobs closer together than its min interval.
+    """
+
+    def __init__(self, max_in_flight: int, min_interval: float, overrides: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.max_in_flight = max(0, max_in_flight)
+        self.min_interval = max(0.0, min_interval)
+        self.overrides = overrides or {}
+        self._queues: Dict[str, deque] = {}
+        self._order: deque = deque()
+        self._in_flight: Dict[str, int] = {}
+        self._last_start: Dict[str, float] = {}
+        self._limits: Dict[str, Tuple[int, float]] = {}
+        self._size = 0
+
+    @classmethod
+    def from_env(cls) -> "_DomainScheduler":
+        overrides: Dict[str, Dict[str, Any]] = {}
+        raw = os.getenv("DOMAIN_LIMIT_OVERRIDES")
+        if raw:
+            try:
+                overrides = {str(k).strip().lower().lstrip("."): dict(v) for k, v in json.loads(raw).items()}
+            except (ValueError, TypeError, AttributeError) as exc:
+                print(f"[!] Invalid DOMAIN_LIMIT_OVERRIDES: {exc}")
+        return cls(
+            _get_env_int("DOMAIN_MAX_IN_FLIGHT", 0),
+            _get_env_int("DOMAIN_MIN_INTERVAL_MS", 0) / 1000.0,
+            overrides,
+        )
+
+    @staticmethod
+    def domain_of(job: Dict[str, Any]) -> str:
+        return urlparse(job.get("url") or "").netloc.lower()
+
+    def _limits_for(self, domain: str) -> Tuple[int, float]:
+        limits = self._limits.get(domain)
+        if limits is None:
+            max_in_flight, min_interval = self.max_in_flight, self.min_interval
+            host = domain.split(":")[0]
+            for suffix in _host_suffixes(host) or [host]:
+                override = self.overrides.get(suffix)
+                if override:
+                    max_in_flight = max(0, int(override.get("max_in_flight", max_in_flight)))
+                    min_interval = max(0.0, float(override.get("min_interval_ms", min_interval * 1000)) / 1000.0)
+                    break
+            limits = (max_in_flight, min_interval)
+            self._limits[domain] = limits
+        return limits
+
+    def extend(self, jobs: Iterable[Dict[str, Any]]):
+        for job in jobs:
+            domain = self.domain_of(job)
+            queue = self._queues.get(domain)
+            if queue is None:
+                queue = self._queues[domain] = deque()
+                self._order.append(domain)
+            queue.append(job)
+            self._size += 1
+
+    def __len__(self) -> int:
+        return self._size
+
+    def next_ready(self, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Pop the next job whose domain has a free slot and has waited its interval."""
+        now = time.time() if now is None else now
+        for _ in range(len(self._order)):
+            domain = self._order[0]
+            self._order.rotate(-1)
+            queue = self._queues[domain]
+            if not queue:
                 continue
-        
-        _log_with_thread(f"Saved {saved_count}/{len(products)} products to database", "[✓]")
-        if failed_count > 0:
-            _log_with_thread(f"Failed to save {failed_count} products", "[!]")
-        
-        return saved_count
+            max_in_flight, min_interval = self._limits_for(domain)
+            if max_in_flight and self._in_flight.get(domain, 0) >= max_in_flight:
+                continue
+            if now - self._last_start.get(domain, 0.0) < min_interval:
+                continue
+            self._in_flight[domain] = self._in_flight.get(domain, 0) + 1
+            self._last_start[domain] = now
+            self._size -= 1
+            return queue.popleft()
+        return None
+
+    def seconds_until_ready(self, now: Optional[float] = None) -> Optional[float]:
+        """Delay until an interval-throttled domain may start again; None if none is waiting on time."""
+        now = time.time() if now is None else now
+        delays = []
+        for domain, queue in self._queues.items():
+            if not queue:
+                continue
+            max_in_flight, min_interval = self._limits_for(domain)
+            if not max_in_flight or self._in_flight.get(domain, 0) < max_in_flight:
+                delays.append(max(0.0, self._last_start.get(domain, 0.0) + min_interval - now))
+        return min(delays) if delays else None
+
+    def done(self, job: Dict[str, Any]):
+        domain = self.domain_of(job)
+        self._in_flight[domain] = max(0, self._in_flight.get(domain, 0) - 1)
+        if not self._queues.get(domain) and not self._in_flight[domain]:
+            # Forget drained domains so the round-robin stays short
+            self._queues.pop(domain, None)
+            self._in_flight.pop(domain, None)
+            try:
+                self._order.remove(domain)
+            except ValueError:
+                pass
 
+    def queue_depths(self) -> Dict[str, Dict[str, int]]:
+        domains = set(self._queues) | set(self._in_flight)
+        return {
+            domain: {"queued": len(self._queues.get(domain) or ()), "in_flight": self._in_flight.get(domain, 0)}
+            for domain in sorted(domains)
+        }
 
-# ============================================================================
-# Parallel execution helpers
-# ============================================================================
+
+class _ClaimFeeder:
+    """
+    Local job queue refilled from a claim source. A new claim is requested whenever the
+    queue drops below `low_water`, so the next jobs are already local by the time a
+    worker frees up. The source is exhausted once a claim comes back empty.
+    """
+
+    def __init__(
+        self,
+        queue: "_DomainScheduler",
+        claim_size: int,
+        low_water: int,
+        limit: Optional[int] = None,
+        max_claims: Optional[int] = None,
+    ):
+        self.queue = queue
+        self.claim_size = max(1, claim_size)
+        self.low_water = max(1, low_water)
+        self.limit = limit
+        self.max_claims = max_claims
+        self.claimed = 0
+        self.claims = 0
+        self.pending = False
+        self.exhausted = False
+
+    @classmethod
+    def from_jobs(cls, queue: "_DomainScheduler", jobs: List[Dict[str, Any]]) -> "_ClaimFeeder":
+        """A feeder over a fixed job list that never claims."""
+        feeder = cls(queue, claim_size=1, low_water=1, max_claims=0)
+        feeder.deliver(jobs)
+        feeder.exhausted = True
+        return feeder
+
+    def next_claim_size(self, free_slots: int = 0) -> Optional[int]:
+        """
+        Size of the claim to start now, or None when no claim is due. `free_slots` counts
+        workers left idle although jobs are queued (their domains are at their limit);
+        up to that many extra rows are pulled in to find other domains, so rows held as
+        `processing` behind a domain limit stay bounded by the idle capacity.
+        """
+        if self.pending or self.exhausted:
+            return None
+        free_slots = max(0, free_slots)
+        if len(self.queue) >= self.low_water + free_slots:
+            return None
+        size = self.claim_size if len(self.queue) < self.low_water else min(self.claim_size, free_slots)
+        if self.limit is not None:
+            size = min(size, self.limit - self.claimed)
+        if size <= 0 or (self.max_claims is not None and self.claims >= self.max_claims):
+            self.exhausted = True
+            return None
+        self.claims += 1
+        self.pending = True
+        return size
+
+    def deliver(self, jobs: List[Dict[str, Any]]):
+        self.pending = False
+        if not jobs:
+            self.exhausted = True
+            return
+        self.claimed += len(jobs)
+        self.queue.extend(jobs)
+
+    @property
+    def finished(self) -> bool:
+        return self.exhausted and not self.pending and not self.queue
 
 
 class ParallelURLExtractor:
@@ -2014,7 +5752,6 @@ class ParallelURLExtractor:
         self.default_max_items = default_max_items
         self.max_retries = _get_env_int("MAX_RETRIES", 3)
 
-        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
         self._thread_local = threading.local()
         self._extractors_lock = threading.Lock()
         self._extractors: List[UniversalProductExtractor] = []
@@ -2031,6 +5768,33 @@ class ParallelURLExtractor:
         self._global_pause_until = 0  # Timestamp when pause ends
         # Stats tracking for RAM monitoring
         self._stats = {"success_count": 0}
+        # Fully async extraction on the Playwright event loop instead of one thread per page
+        self.async_pipeline = (
+            _parse_bool_env("ASYNC_PIPELINE", False) and PLAYWRIGHT_AVAILABLE and LXML_AVAILABLE
+        )
+        self.async_max_concurrency = _get_env_int("ASYNC_MAX_CONCURRENCY", 50)
+        self.stream_claims = _parse_bool_env("STREAM_CLAIMS", True)
+        # Per-domain politeness scheduler of the run in progress (see domain_queue_depths)
+        self._scheduler: Optional[_DomainScheduler] = None
+        # Streaming claims: jobs handed to the pool beyond running ones, claim size and refill mark
+        self.stream_queue_depth = _get_env_int("STREAM_QUEUE_DEPTH", self.max_workers)
+        self.stream_claim_size = min(self.batch_size, _get_env_int("STREAM_CLAIM_SIZE", max(50, self.max_workers * 4)))
+        self.stream_low_water = _get_env_int("STREAM_LOW_WATER", max(1, self.stream_claim_size // 2))
+        concurrent_pages = self.async_max_concurrency if self.async_pipeline else self.max_workers
+        if PLAYWRIGHT_AVAILABLE:
+            _PlaywrightAsyncManager.configure_shards(_determine_browser_shards(concurrent_pages))
+        # AIMD slot controller: adapts concurrency to measured pressure instead of the
+        # fixed worker count plus Errno 11 global pause (kept for ADAPTIVE_CONCURRENCY=0)
+        self.adaptive_concurrency = _parse_bool_env("ADAPTIVE_CONCURRENCY", True)
+        self._controller: Optional[_AIMDController] = (
+            _AIMDController.from_env(concurrent_pages) if self.adaptive_concurrency else None
+        )
+        pool_size = self._controller.max_slots if self._controller and not self.async_pipeline else self.max_workers
+        self._executor = ThreadPoolExecutor(max_workers=pool_size)
+
+        metrics = _get_metrics()
+        if metrics is not None:
+            metrics.track_runner(self)
 
     # ------------------------------------------------------------------
     # Context management & lifecycle
@@ -2063,6 +5827,17 @@ class ParallelURLExtractor:
                     extractor.shutdown()
                 except Exception:
                     pass
+            try:
+                _shutdown_snapshot_process_pool()
+            except Exception:
+                pass
+            try:
+                _shutdown_write_queue()
+            except Exception as exc:
+                print(f"[!] Failed to flush write-behind queue: {exc}")
+            recipe_store = _get_recipe_store()
+            if recipe_store is not None:
+                recipe_store.flush()
 
     # ------------------------------------------------------------------
     # Worker helpers
@@ -2081,6 +5856,11 @@ class ParallelURLExtractor:
         with self._pending_lock:
             return self._pending
 
+    def active_driver_count(self) -> int:
+        with self._extractors_lock:
+            extractors = list(self._extractors)
+        return sum(len(extractor._active_drivers) for extractor in extractors)
+
     # ------------------------------------------------------------------
     # Job execution
     # ------------------------------------------------------------------
@@ -2128,7 +5908,6 @@ class ParallelURLExtractor:
         start_time = time.time()
         url_id = job.get("url_id")
         retry_count = job.get("retry_count", 0) or 0
-        attempt_count = retry_count + 1
         max_retries = job.get("max_retries", 0) or 0
         error_message: Optional[str] = None
         result: Dict[str, Any]
@@ -2147,8 +5926,11 @@ class ParallelURLExtractor:
             duration = time.time() - start_time
             error_message = str(exc)
             
-            # If Errno 11 (resource unavailable), add longer backoff before retry
-            if "Errno 11" in error_message or "Resource temporarily unavailable" in error_message:
+            # If Errno 11 (resource unavailable), add longer backoff before retry.
+            # With the adaptive controller this is handled by cutting slots instead.
+            if self._controller is None and (
+                "Errno 11" in error_message or "Resource temporarily unavailable" in error_message
+            ):
                 # Track consecutive Errno 11 errors
                 with self._errno11_lock:
                     self._errno11_count += 1
@@ -2232,6 +6014,15 @@ class ParallelURLExtractor:
             with self._pending_lock:
                 self._pending -= 1
 
+        return self._finalize_job_result(job, result, start_time)
+
+    def _finalize_job_result(self, job: Dict[str, Any], result: Dict[str, Any], start_time: float) -> Dict[str, Any]:
+        """Annotate a finished job's result and record its outcome on the URL row."""
+        url_id = job.get("url_id")
+        retry_count = job.get("retry_count", 0) or 0
+        attempt_count = retry_count + 1
+        max_retries = job.get("max_retries", 0) or 0
+
         duration = time.time() - start_time
         result.setdefault("page_url", job["url"])
         result.setdefault("url", job["url"])
@@ -2282,6 +6073,16 @@ class ParallelURLExtractor:
 
         return result
 
+    def _prewarm_browser_pages(self, total_jobs: int):
+        """Start creating pooled browser pages before the first jobs ask for them."""
+        if not PLAYWRIGHT_AVAILABLE or os.getenv("USE_PLAYWRIGHT", "1") != "1":
+            return
+        concurrent_pages = self.async_max_concurrency if self.async_pipeline else self.max_workers
+        try:
+            self._get_extractor()._get_playwright_manager().prewarm(min(total_jobs, concurrent_pages))
+        except Exception as exc:
+            _log_with_thread(f"Browser pre-warm skipped: {exc}", "[!]")
+
     def run_bulk(
         self,
         urls: Iterable[Union[str, Dict[str, Any]]],
@@ -2304,39 +6105,259 @@ class ParallelURLExtractor:
                 "results": [],
             }
 
+        self._prewarm_browser_pages(total_jobs)
+        return self._run_scheduled(lambda scheduler: _ClaimFeeder.from_jobs(scheduler, jobs), None, progress_callback)
+
+    def run_stream(
+        self,
+        claim_jobs: Any,
+        limit: Optional[int] = None,
+        progress_callback: Optional[Any] = None,
+        max_claims: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Process jobs from `claim_jobs(n)` (returns up to n URL entries, [] when none are
+        left) without batch barriers. Worker slots are refilled as soon as any job
+        finishes, and the next claim is fetched in the background once the local queue
+        falls below the low-water mark.
+        """
+        concurrency = self.async_max_concurrency if self.async_pipeline else self.max_workers
+        self._prewarm_browser_pages(concurrency if limit is None else min(limit, concurrency))
+
+        def claim(size: int) -> List[Dict[str, Any]]:
+            try:
+                return [self._normalize_job(entry, None, None) for entry in claim_jobs(size)]
+            except Exception as exc:
+                _log_with_thread(f"Claiming jobs failed: {exc}", "[!]")
+                return []
+
+        def make_feeder(scheduler: _DomainScheduler) -> _ClaimFeeder:
+            return _ClaimFeeder(
+                scheduler,
+                self.stream_claim_size,
+                max(self.stream_low_water, concurrency),
+                limit=limit,
+                max_claims=max_claims,
+            )
+
+        return self._run_scheduled(make_feeder, claim, progress_callback)
+
+    def domain_queue_depths(self) -> Dict[str, Dict[str, int]]:
+        """Queued and in-flight job counts per domain for the run in progress."""
+        scheduler = self._scheduler
+        return scheduler.queue_depths() if scheduler is not None else {}
+
+    def _run_scheduled(self, make_feeder: Any, claim: Optional[Any], progress_callback: Optional[Any]) -> Dict[str, Any]:
         overall_start = time.time()
         results: List[Dict[str, Any]] = []
         stats = {
-            "submitted": total_jobs,
+            "submitted": 0,
             "succeeded": 0,
             "failed": 0,
             "total_products_found": 0,
             "total_saved_to_db": 0,
         }
+        scheduler = _DomainScheduler.from_env()
+        feeder = make_feeder(scheduler)
+        self._scheduler = scheduler
+        try:
+            if self.async_pipeline:
+                extractor = self._get_extractor()
+                manager = extractor._get_playwright_manager()
+                manager.run_sync(self._run_stream_async(extractor, feeder, claim, results, stats, progress_callback))
+            else:
+                self._run_stream_threads(feeder, claim, results, stats, progress_callback)
+        finally:
+            self._scheduler = None
+
+        if self._controller is not None:
+            stats["adaptive_slots"] = self._controller.stats()
+        stats["duration_seconds"] = round(time.time() - overall_start, 2)
+        return {"stats": stats, "results": results}
 
-        batch_size = self.batch_size if self.batch_size and self.batch_size > 0 else total_jobs
-        for batch_start in range(0, total_jobs, batch_size):
-            batch = jobs[batch_start: batch_start + batch_size]
-            futures = [self._executor.submit(self._run_job, job) for job in batch]
-            for future in as_completed(futures):
-                result = future.result()
-                results.append(result)
-
-                if result.get("success"):
-                    stats["succeeded"] += 1
-                    stats["total_products_found"] += result.get("num_products", 0) or 0
-                    stats["total_saved_to_db"] += result.get("saved_to_db", 0) or 0
+    def _run_stream_threads(
+        self,
+        feeder: _ClaimFeeder,
+        claim: Optional[Any],
+        results: List[Dict[str, Any]],
+        stats: Dict[str, Any],
+        progress_callback: Optional[Any],
+    ):
+        scheduler = feeder.queue
+        controller = self._controller
+        in_flight: Dict[Any, Dict[str, Any]] = {}
+        claim_future = None
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="URLClaimer") as claimer:
+            while True:
+                if controller is not None:
+                    # Pool threads == max slots, so in-flight jobs are exactly the running ones
+                    target_in_flight = controller.slots
                 else:
-                    stats["failed"] += 1
+                    target_in_flight = self.max_workers + max(0, self.stream_queue_depth)
+                while len(in_flight) < target_in_flight:
+                    job = scheduler.next_ready()
+                    if job is None:
+                        break
+                    stats["submitted"] += 1
+                    in_flight[self._executor.submit(self._run_job, job)] = job
+                free_slots = min(target_in_flight, self.max_workers) - len(in_flight) if len(scheduler) else 0
+                size = feeder.next_claim_size(free_slots) if claim is not None else None
+                if size is not None:
+                    claim_future = claimer.submit(claim, size)
+                waitables = set(in_flight)
+                if claim_future is not None:
+                    waitables.add(claim_future)
+                # Only wake up for throttled domains while a slot is actually free
+                delay = scheduler.seconds_until_ready() if len(in_flight) < target_in_flight else None
+                if not waitables:
+                    if feeder.finished:
+                        break
+                    time.sleep(delay or 0.05)
+                    continue
+                done, _ = wait(waitables, timeout=delay, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future is claim_future:
+                        claim_future = None
+                        feeder.deliver(future.result())
+                    else:
+                        scheduler.done(in_flight.pop(future))
+                        result = future.result()
+                        if controller is not None:
+                            controller.observe(result, len(in_flight) + 1)
+                        self._record_bulk_result(result, results, stats, progress_callback)
 
-                if progress_callback:
-                    try:
-                        progress_callback(result, dict(stats))
-                    except Exception:
-                        pass
+    async def _run_stream_async(
+        self,
+        extractor: UniversalProductExtractor,
+        feeder: _ClaimFeeder,
+        claim: Optional[Any],
+        results: List[Dict[str, Any]],
+        stats: Dict[str, Any],
+        progress_callback: Optional[Any],
+    ):
+        """Counterpart of _run_stream_threads on the Playwright event loop."""
+        loop = asyncio.get_running_loop()
+        scheduler = feeder.queue
+        controller = self._controller
+        max_slots = max(self.async_max_concurrency, controller.max_slots if controller else 0)
+        semaphore = asyncio.Semaphore(max(1, max_slots))
+        in_flight: Dict[Any, Dict[str, Any]] = {}
+        claim_future = None
+        while True:
+            target_in_flight = controller.slots if controller is not None else self.async_max_concurrency
+            while len(in_flight) < target_in_flight:
+                job = scheduler.next_ready()
+                if job is None:
+                    break
+                stats["submitted"] += 1
+                in_flight[asyncio.ensure_future(self._run_job_async(extractor, job, semaphore))] = job
+            free_slots = target_in_flight - len(in_flight) if len(scheduler) else 0
+            size = feeder.next_claim_size(free_slots) if claim is not None else None
+            if size is not None:
+                claim_future = loop.run_in_executor(extractor._get_async_executor(), claim, size)
+            waitables = set(in_flight)
+            if claim_future is not None:
+                waitables.add(claim_future)
+            delay = scheduler.seconds_until_ready() if len(in_flight) < target_in_flight else None
+            if not waitables:
+                if feeder.finished:
+                    break
+                await asyncio.sleep(delay or 0.05)
+                continue
+            done, _ = await asyncio.wait(waitables, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                if future is claim_future:
+                    claim_future = None
+                    feeder.deliver(future.result())
+                else:
+                    scheduler.done(in_flight.pop(future))
+                    result = future.result()
+                    if controller is not None:
+                        controller.observe(result, len(in_flight) + 1)
+                    self._record_bulk_result(result, results, stats, progress_callback)
+
+    @staticmethod
+    def _record_bulk_result(
+        result: Dict[str, Any],
+        results: List[Dict[str, Any]],
+        stats: Dict[str, Any],
+        progress_callback: Optional[Any],
+    ):
+        results.append(result)
 
-        stats["duration_seconds"] = round(time.time() - overall_start, 2)
-        return {"stats": stats, "results": results}
+        stage_timings = _get_stage_timings()
+        if stage_timings is not None and result.get("timings") is not None:
+            stage_timings.record(dict(result["timings"], total=result.get("duration_seconds") or 0.0))
+
+        scroll = result.get("scroll")
+        if scroll is not None:
+            domain = result.get("platform") or urlparse(result.get("page_url") or result.get("url") or "").netloc
+            _SCROLL_STATS.record(domain, scroll["rounds"], scroll["stopped_early"])
+
+        metrics = _get_metrics()
+        if metrics is not None:
+            if result.get("success"):
+                metrics.inc("extractor_urls_succeeded_total")
+                metrics.inc("extractor_products_found_total", result.get("num_products", 0) or 0)
+                metrics.inc("extractor_products_saved_total", result.get("saved_to_db", 0) or 0)
+            else:
+                metrics.inc("extractor_urls_failed_total")
+            if result.get("duration_seconds") is not None:
+                metrics.observe("extractor_job_duration_seconds", result["duration_seconds"])
+            for stage, seconds in (result.get("timings") or {}).items():
+                metrics.observe("extractor_stage_duration_seconds", seconds, stage=stage)
+
+        if result.get("success"):
+            stats["succeeded"] += 1
+            stats["total_products_found"] += result.get("num_products", 0) or 0
+            stats["total_saved_to_db"] += result.get("saved_to_db", 0) or 0
+            stats["total_updated_in_db"] = stats.get("total_updated_in_db", 0) + (result.get("updated_in_db") or 0)
+        else:
+            stats["failed"] += 1
+
+        blocking = result.get("blocking") or {}
+        for key in ("requests_blocked", "bytes_blocked_est", "bytes_loaded"):
+            stats[key] = stats.get(key, 0) + (blocking.get(key) or 0)
+
+        if progress_callback:
+            try:
+                progress_callback(result, dict(stats))
+            except Exception:
+                pass
+
+    # ------------------------------------------------------------------
+    # Native asyncio pipeline
+    # ------------------------------------------------------------------
+
+    async def _run_job_async(
+        self,
+        extractor: UniversalProductExtractor,
+        job: Dict[str, Any],
+        semaphore: asyncio.Semaphore,
+    ) -> Dict[str, Any]:
+        async with semaphore:
+            with self._pending_lock:
+                self._pending += 1
+            start_time = time.time()
+            try:
+                result = await extractor.extract_products_async(
+                    job["url"],
+                    max_items=job.get("max_items", self.default_max_items),
+                    wait_seconds=job.get("wait_seconds", self.default_wait_seconds),
+                    product_type_id=job.get("product_type_id"),
+                    searched_product_id=job.get("searched_product_id"),
+                    url_id=job.get("url_id"),
+                )
+            except Exception as exc:
+                result = {"success": False, "page_url": job["url"], "error": str(exc), "url_id": job.get("url_id")}
+            finally:
+                with self._pending_lock:
+                    self._pending -= 1
+            # URL status writes are blocking REST calls; keep them off the event loop
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                extractor._get_async_executor(), self._finalize_job_result, job, result, start_time
+            )
 
     def dry_run(
         self,
@@ -2354,6 +6375,308 @@ class ParallelURLExtractor:
         return self.run_bulk(sample, **kwargs)
 
 
+# ============================================================================
+# Multi-process supervisor
+# ============================================================================
+
+
+def _compact_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Result without the product list and job echo, small enough to send over IPC."""
+    return {key: value for key, value in result.items() if key not in ("products", "job")}
+
+
+def _worker_process_main(
+    index: int, threads: int, job_queue: Any, event_queue: Any, forward_metrics: bool = False
+) -> None:
+    """Child process: run a ParallelURLExtractor fed from the supervisor's job queue."""
+    # The supervisor serves metrics; children must not compete for its port
+    os.environ["METRICS_PORT"] = "0"
+    local_metrics = _use_unserved_metrics() if forward_metrics else None
+    # Take only about as many jobs as this process can run so siblings are not starved
+    os.environ["STREAM_CLAIM_SIZE"] = str(max(1, threads))
+    os.environ["STREAM_LOW_WATER"] = str(max(1, threads))
+    closed = False
+    seqs_by_url: Dict[str, deque] = {}
+
+    def claim(size: int) -> List[Dict[str, Any]]:
+        nonlocal closed
+        jobs: List[Dict[str, Any]] = []
+        while not closed and len(jobs) < size:
+            try:
+                job = job_queue.get(timeout=1.0) if not jobs else job_queue.get_nowait()
+            except queue_module.Empty:
+                if jobs:
+                    break
+                continue
+            if job is None:
+                closed = True
+                break
+            jobs.append(job)
+        if jobs:
+            for job in jobs:
+                seqs_by_url.setdefault(job["url"], deque()).append(job["_seq"])
+            event_queue.put(("taken", index, [job["_seq"] for job in jobs]))
+        return jobs
+
+    def report(result: Dict[str, Any], _stats: Dict[str, Any]) -> None:
+        # Failure results do not echo the job, so fall back to the URL to find its sequence
+        url = (result.get("job") or {}).get("url") or result.get("url") or result.get("page_url")
+        seq = (result.get("job") or {}).get("_seq")
+        pending_seqs = seqs_by_url.get(url)
+        if pending_seqs:
+            if seq in pending_seqs:
+                pending_seqs.remove(seq)
+            else:
+                seq = pending_seqs.popleft()
+            if not pending_seqs:
+                seqs_by_url.pop(url, None)
+        compact = _compact_result(result)
+        compact["_seq"] = seq
+        event_queue.put(("result", index, compact))
+        send_metrics()
+
+    def send_metrics() -> None:
+        # Gauges the supervisor cannot observe itself, plus cumulative retry counters
+        if local_metrics is None or runner is None:
+            return
+        event_queue.put((
+            "metrics",
+            index,
+            {
+                "pid": os.getpid(),
+                "pending": runner.pending_count(),
+                "active_drivers": runner.active_driver_count(),
+                "retried": local_metrics.counter_values("extractor_urls_retried_total"),
+            },
+        ))
+
+    runner: Optional[ParallelURLExtractor] = None
+    with ParallelURLExtractor(max_workers=threads) as runner:
+        summary = runner.run_stream(claim, progress_callback=report)
+        send_metrics()
+    event_queue.put(("exit", index, summary["stats"]))
+
+
+class _ProcessSupervisor:
+    """
+    Runs URL jobs across `processes` child processes, each with its own
+    ParallelURLExtractor, Playwright manager/browser shards and thread pool, so
+    parsing is not serialized on one GIL. The supervisor owns claiming, hands jobs out
+    over an IPC queue, aggregates results into the run_bulk summary format and
+    restarts children that die, re-queuing the jobs they held.
+    """
+
+    def __init__(self, processes: int, threads_per_process: int, max_restarts: int = 5):
+        self.processes = max(1, processes)
+        self.threads = max(1, threads_per_process)
+        self.max_restarts = max(0, max_restarts)
+        self._ctx = multiprocessing.get_context("spawn")
+        self._job_queue = self._ctx.Queue()
+        self._event_queue = self._ctx.Queue()
+        self._children: Dict[int, Any] = {}
+        self._restarts: Dict[int, int] = {}
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        # Latest metrics snapshot per child pid, forwarded while METRICS_PORT is served here
+        self._child_metrics: Dict[int, Dict[str, Any]] = {}
+
+    def pending_count(self) -> int:
+        """Jobs handed to children that have not reported a result yet."""
+        return len(self._pending)
+
+    def active_driver_count(self) -> int:
+        live = {process.pid for process in list(self._children.values())}
+        return sum(
+            snapshot["active_drivers"] for pid, snapshot in list(self._child_metrics.items()) if pid in live
+        )
+
+    def _merge_child_metrics(self, snapshot: Dict[str, Any]):
+        """Add a child's retry counter growth since its last snapshot to this process's registry."""
+        metrics = _get_metrics()
+        previous = self._child_metrics.get(snapshot["pid"])
+        self._child_metrics[snapshot["pid"]] = snapshot
+        if metrics is None:
+            return
+        seen = previous["retried"] if previous else {}
+        for labels, value in snapshot["retried"].items():
+            delta = value - seen.get(labels, 0)
+            if delta > 0:
+                metrics.inc("extractor_urls_retried_total", delta, **dict(labels))
+
+    @classmethod
+    def from_env(cls, default_threads: int) -> Optional["_ProcessSupervisor"]:
+        """Supervisor configured from WORKER_PROCESS* env vars, or None for single-process mode."""
+        processes = _get_env_int("WORKER_PROCESSES", 1)
+        if processes <= 1:
+            return None
+        threads = _get_env_int("WORKER_PROCESS_THREADS", max(1, default_threads // processes))
+        return cls(processes, threads, _get_env_int("WORKER_PROCESS_MAX_RESTARTS", 5))
+
+    def _start_child(self, index: int):
+        process = self._ctx.Process(
+            target=_worker_process_main,
+            args=(index, self.threads, self._job_queue, self._event_queue, _get_metrics() is not None),
+            name=f"ExtractorWorker-{index}",
+            daemon=False,
+        )
+        process.start()
+        self._children[index] = process
+        print(f"[*] Worker process {index} started (pid={process.pid}, {self.threads} threads)")
+
+    def run(
+        self,
+        claim_jobs: Any,
+        limit: Optional[int] = None,
+        progress_callback: Optional[Any] = None,
+        max_claims: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        overall_start = time.time()
+        results: List[Dict[str, Any]] = []
+        stats: Dict[str, Any] = {
+            "submitted": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "total_products_found": 0,
+            "total_saved_to_db": 0,
+        }
+        outstanding_target = self.processes * self.threads * 2
+        pending = self._pending
+        metrics = _get_metrics()
+        if metrics is not None:
+            metrics.track_runner(self)
+        taken_by: Dict[int, int] = {}
+        enqueue_epoch: Dict[int, int] = {}
+        crash_epoch = 0
+        seq = 0
+        claims = 0
+        claimed = 0
+        exhausted = False
+
+        for index in range(self.processes):
+            self._start_child(index)
+
+        def enqueue(job: Dict[str, Any]):
+            pending[job["_seq"]] = job
+            enqueue_epoch[job["_seq"]] = crash_epoch
+            self._job_queue.put(job)
+
+        def fail(job: Dict[str, Any], message: str):
+            pending.pop(job["_seq"], None)
+            taken_by.pop(job["_seq"], None)
+            if job.get("url_id") is not None:
+                _mark_for_retry(job["url_id"], job.get("retry_count", 0) or 0, message, job.get("max_retries", 0) or 0)
+            ParallelURLExtractor._record_bulk_result(
+                {"success": False, "page_url": job["url"], "url": job["url"], "error": message, "url_id": job.get("url_id")},
+                results, stats, progress_callback,
+            )
+
+        def requeue_lost(job: Dict[str, Any]):
+            taken_by.pop(job["_seq"], None)
+            job["_crashes"] = job.get("_crashes", 0) + 1
+            if job["_crashes"] >= 2:
+                fail(job, "Worker process crashed twice while processing this URL")
+            else:
+                enqueue(job)
+
+        try:
+            while True:
+                # Keep enough jobs queued for every child thread plus a prefetch margin
+                while not exhausted and len(pending) < outstanding_target:
+                    size = outstanding_target - len(pending)
+                    if limit is not None:
+                        size = min(size, limit - claimed)
+                    if size <= 0 or (max_claims is not None and claims >= max_claims):
+                        exhausted = True
+                        break
+                    claims += 1
+                    try:
+                        batch = claim_jobs(size)
+                    except Exception as exc:
+                        _log_with_thread(f"Claiming jobs failed: {exc}", "[!]")
+                        batch = []
+                    if not batch:
+                        exhausted = True
+                        break
+                    claimed += len(batch)
+                    for entry in batch:
+                        seq += 1
+                        job = dict(entry) if isinstance(entry, dict) else {"url": entry}
+                        job["_seq"] = seq
+                        stats["submitted"] += 1
+                        enqueue(job)
+
+                if exhausted and not pending:
+                    break
+
+                events = []
+                try:
+                    events.append(self._event_queue.get(timeout=1.0))
+                    while True:
+                        events.append(self._event_queue.get_nowait())
+                except queue_module.Empty:
+                    pass
+                for kind, index, payload in events:
+                    if kind == "taken":
+                        for job_seq in payload:
+                            if job_seq in pending:
+                                taken_by[job_seq] = index
+                    elif kind == "result":
+                        job_seq = payload.pop("_seq", None)
+                        if job_seq in pending:
+                            pending.pop(job_seq)
+                            taken_by.pop(job_seq, None)
+                            ParallelURLExtractor._record_bulk_result(payload, results, stats, progress_callback)
+                    elif kind == "metrics":
+                        self._merge_child_metrics(payload)
+
+                for index, process in list(self._children.items()):
+                    if process.is_alive():
+                        continue
+                    crash_epoch += 1
+                    lost = [job_seq for job_seq, owner in taken_by.items() if owner == index]
+                    print(f"[!] Worker process {index} exited (code {process.exitcode}) holding {len(lost)} jobs")
+                    for job_seq in lost:
+                        requeue_lost(pending[job_seq])
+                    del self._children[index]
+                    if self._restarts.get(index, 0) < self.max_restarts:
+                        self._restarts[index] = self._restarts.get(index, 0) + 1
+                        self._start_child(index)
+
+                if not self._children:
+                    print("[✗] All worker processes exited and restart budget is spent")
+                    for job in list(pending.values()):
+                        fail(job, "No worker process available")
+                    break
+
+                # A child can die before its "taken" event is flushed. Once the queue has
+                # drained and no events arrive, untaken jobs queued before a crash are lost
+                if not events and crash_epoch and self._job_queue.empty():
+                    for job_seq, job in list(pending.items()):
+                        if job_seq not in taken_by and enqueue_epoch.get(job_seq, 0) < crash_epoch:
+                            requeue_lost(job)
+        finally:
+            for _ in self._children:
+                self._job_queue.put(None)
+            # Keep draining events so children are not blocked flushing their queue on exit
+            deadline = time.time() + 60
+            while time.time() < deadline and any(process.is_alive() for process in self._children.values()):
+                try:
+                    kind, _, payload = self._event_queue.get(timeout=0.2)
+                except queue_module.Empty:
+                    continue
+                if kind == "metrics":
+                    self._merge_child_metrics(payload)
+            for process in self._children.values():
+                if process.is_alive():
+                    process.terminate()
+                process.join(5)
+            pending.clear()
+
+        stats["worker_processes"] = self.processes
+        stats["worker_restarts"] = sum(self._restarts.values())
+        stats["duration_seconds"] = round(time.time() - overall_start, 2)
+        return {"stats": stats, "results": results}
+
+
 # ============================================================================
 # Helper utilities for CLI usage
 # ============================================================================
@@ -2428,7 +6751,70 @@ def _print_bulk_summary(summary: Dict[str, Any], sample_limit: int = 5) -> None:
     print(f"Failed             : {stats.get('failed', 0)}")
     print(f"Products extracted : {stats.get('total_products_found', 0)}")
     print(f"Products saved     : {stats.get('total_saved_to_db', 0)}")
+    if stats.get("total_updated_in_db"):
+        print(f"  of which updated : {stats['total_updated_in_db']}")
     print(f"Duration (s)       : {stats.get('duration_seconds', 0.0)}")
+    if stats.get("worker_processes"):
+        print(f"Worker processes   : {stats['worker_processes']} ({stats.get('worker_restarts', 0)} restarts)")
+    adaptive = stats.get("adaptive_slots")
+    if adaptive:
+        print(
+            f"Adaptive slots     : {adaptive['slots']} now (range {adaptive['min_seen']}-{adaptive['max_seen']}, "
+            f"{adaptive['increases']} increases, {adaptive['decreases']} decreases)"
+        )
+    if stats.get("requests_blocked") or stats.get("bytes_loaded"):
+        print(
+            f"Network blocking   : {stats.get('requests_blocked', 0)} requests blocked "
+            f"(~{stats.get('bytes_blocked_est', 0) / 1_048_576:.1f} MB est.), "
+            f"{stats.get('bytes_loaded', 0) / 1_048_576:.1f} MB loaded"
+        )
+
+    scroll_summary = _SCROLL_STATS.summary()
+    if scroll_summary:
+        pages = sum(entry["pages"] for entry in scroll_summary.values())
+        rounds = sum(entry["rounds"] for entry in scroll_summary.values())
+        early = sum(entry["stopped_early"] for entry in scroll_summary.values())
+        print(f"Scroll rounds      : {rounds / pages:.2f}/page avg, {early}/{pages} pages stopped early at max_items")
+        busiest = sorted(scroll_summary.items(), key=lambda item: item[1]["pages"], reverse=True)[:sample_limit]
+        for domain, entry in busiest:
+            print(
+                f"  {domain:<40} {entry['pages']:>5} pages, {entry['rounds'] / entry['pages']:.2f} avg, "
+                f"max {entry['max_rounds']}, {entry['stopped_early']} early"
+            )
+
+    stage_timings = _get_stage_timings()
+    stage_summary = stage_timings.percentiles() if stage_timings is not None else {}
+    if stage_summary:
+        print("Stage latency (s)  :")
+        print(f"  {'stage':<28}{'n':>7}{'p50':>9}{'p95':>9}{'p99':>9}")
+        for stage, row in stage_summary.items():
+            print(f"  {stage:<28}{row['count']:>7}{row['p50']:>9.3f}{row['p95']:>9.3f}{row['p99']:>9.3f}")
+
+    recipe_store = _get_recipe_store()
+    if recipe_store is not None:
+        recipe_stats = recipe_store.stats()
+        print(
+            f"Recipe cache       : {recipe_stats['hits']} hits / {recipe_stats['misses']} misses "
+            f"(hit rate {recipe_stats['hit_rate']:.1%}), {recipe_stats['learned']} learned, "
+            f"{recipe_stats['expired']} expired, {recipe_stats['domains']} domains"
+        )
+
+    change_index = _get_change_index()
+    if change_index is not None:
+        change_stats = change_index.stats()
+        print(
+            f"Change detection   : {change_stats['unchanged']}/{change_stats['checked']} unchanged rows skipped "
+            f"({change_stats['write_savings']:.1%} writes saved), {change_stats['changed']} changed, "
+            f"{change_stats['new']} new, {change_stats['reconcile_fixed']} fixed by reconciliation"
+        )
+
+    pw_manager = UniversalProductExtractor._PW_MANAGER
+    if pw_manager is not None:
+        pool_stats = pw_manager.pool_stats()
+        print(
+            f"Context pool       : {pool_stats['reused']} reused / {pool_stats['created']} created, "
+            f"{pool_stats['recycled']} recycled on heap growth, {pool_stats['idle']} idle"
+        )
 
     results = summary.get("results", [])
     if not results:
@@ -2619,6 +7005,16 @@ def _log_chrome_versions() -> None:
     print(f"[{thread_id}] [VERSIONS] Chrome: {chrome_ver}")
     print(f"[{thread_id}] [VERSIONS] ChromeDriver: {chromedriver_ver}")
 
+def _determine_browser_shards(workers: int) -> int:
+    """Number of Playwright browser processes to spread worker contexts across."""
+    env_shards = _get_env_int("PLAYWRIGHT_BROWSERS", 0)
+    if env_shards > 0:
+        return env_shards
+    contexts_per_browser = max(1, _get_env_int("CONTEXTS_PER_BROWSER", 8))
+    by_workers = -(-max(1, workers) // contexts_per_browser)  # ceil division
+    return max(1, min(by_workers, os.cpu_count() or 1))
+
+
 def _determine_parallel_workers(explicit_workers: Optional[int] = None) -> int:
     if explicit_workers and explicit_workers > 0:
         return explicit_workers
@@ -2729,33 +7125,19 @@ def _process_url_batches(
             thread_id = _get_thread_id()
             print(f"[{thread_id}] [{status}] ({processed}/{total}) {result.get('url')} → {message}")
 
-        while True:
-            if effective_limit is not None and processed_count >= effective_limit:
-                break
-
-            remaining = (
-                effective_limit - processed_count if effective_limit is not None else runner.batch_size
-            )
-            batch_size = min(runner.batch_size, remaining) if effective_limit is not None else runner.batch_size
-            if batch_size <= 0:
-                break
-
-            claimed_rows, worker_id = _claim_urls_batch(
-                batch_size,
-                status_filters=status_filters,
-                worker_id=f"{worker_prefix}-{batch_index}",
-                min_id=min_id,
-            )
-            if not claimed_rows:
-                if batch_index == 0:
-                    print(f"[*] No URLs available with statuses {status_filters}")
-                break
+        if runner.stream_claims:
+            claim_index = 0
 
-            jobs: List[Dict[str, Any]] = []
-            for row in claimed_rows:
-                if effective_limit is not None and processed_count + len(jobs) >= effective_limit:
-                    break
-                jobs.append(
+            def _claim_jobs(size: int) -> List[Dict[str, Any]]:
+                nonlocal claim_index
+                claimed_rows, _ = _claim_urls_batch(
+                    size,
+                    status_filters=status_filters,
+                    worker_id=f"{worker_prefix}-{claim_index}",
+                    min_id=min_id,
+                )
+                claim_index += 1
+                return [
                     {
                         "url": row.get("product_page_url"),
                         "url_id": row.get("id"),
@@ -2763,29 +7145,85 @@ def _process_url_batches(
                         "max_retries": runner.max_retries,
                         "product_type_id": row.get("product_type_id"),
                     }
-                )
-
-            if not jobs:
-                break
+                    for row in claimed_rows
+                ]
 
-            batch_summary = runner.run_bulk(
-                jobs,
+            supervisor = _ProcessSupervisor.from_env(runner.max_workers)
+            summary_payload = (supervisor.run if supervisor is not None else runner.run_stream)(
+                _claim_jobs,
+                limit=effective_limit,
                 progress_callback=_progress_callback if progress_enabled else None,
+                max_claims=1 if only_dry_run else None,
             )
+            if summary_payload["stats"]["submitted"] == 0:
+                print(f"[*] No URLs available with statuses {status_filters}")
+            elif only_dry_run:
+                print("\n[!] DRY_RUN_ONLY enabled. Processed sample batch and exiting.")
+            aggregated_stats = summary_payload["stats"]
+            aggregated_results = summary_payload["results"]
+        else:
+            if _get_env_int("WORKER_PROCESSES", 1) > 1:
+                # Children are started per run, so batch barriers would respawn them every batch
+                print("[!] WORKER_PROCESSES needs STREAM_CLAIMS=true; batch mode runs in this process only")
+            while True:
+                if effective_limit is not None and processed_count >= effective_limit:
+                    break
 
-            processed_count += batch_summary["stats"]["submitted"]
-            aggregated_stats["submitted"] += batch_summary["stats"]["submitted"]
-            aggregated_stats["succeeded"] += batch_summary["stats"]["succeeded"]
-            aggregated_stats["failed"] += batch_summary["stats"]["failed"]
-            aggregated_stats["total_products_found"] += batch_summary["stats"]["total_products_found"]
-            aggregated_stats["total_saved_to_db"] += batch_summary["stats"]["total_saved_to_db"]
-            aggregated_results.extend(batch_summary["results"])
+                remaining = (
+                    effective_limit - processed_count if effective_limit is not None else runner.batch_size
+                )
+                batch_size = min(runner.batch_size, remaining) if effective_limit is not None else runner.batch_size
+                if batch_size <= 0:
+                    break
 
-            batch_index += 1
+                claimed_rows, worker_id = _claim_urls_batch(
+                    batch_size,
+                    status_filters=status_filters,
+                    worker_id=f"{worker_prefix}-{batch_index}",
+                    min_id=min_id,
+                )
+                if not claimed_rows:
+                    if batch_index == 0:
+                        print(f"[*] No URLs available with statuses {status_filters}")
+                    break
 
-            if only_dry_run:
-                print("\n[!] DRY_RUN_ONLY enabled. Processed sample batch and exiting.")
-                break
+                jobs: List[Dict[str, Any]] = []
+                for row in claimed_rows:
+                    if effective_limit is not None and processed_count + len(jobs) >= effective_limit:
+                        break
+                    jobs.append(
+                        {
+                            "url": row.get("product_page_url"),
+                            "url_id": row.get("id"),
+                            "retry_count": row.get("retry_count") or 0,
+                            "max_retries": runner.max_retries,
+                            "product_type_id": row.get("product_type_id"),
+                        }
+                    )
+
+                if not jobs:
+                    break
+
+                batch_summary = runner.run_bulk(
+                    jobs,
+                    progress_callback=_progress_callback if progress_enabled else None,
+                )
+
+                processed_count += batch_summary["stats"]["submitted"]
+                aggregated_stats["submitted"] += batch_summary["stats"]["submitted"]
+                aggregated_stats["succeeded"] += batch_summary["stats"]["succeeded"]
+                aggregated_stats["failed"] += batch_summary["stats"]["failed"]
+                aggregated_stats["total_products_found"] += batch_summary["stats"]["total_products_found"]
+                aggregated_stats["total_saved_to_db"] += batch_summary["stats"]["total_saved_to_db"]
+                for key in ("total_updated_in_db", "requests_blocked", "bytes_blocked_est", "bytes_loaded"):
+                    aggregated_stats[key] = aggregated_stats.get(key, 0) + batch_summary["stats"].get(key, 0)
+                aggregated_results.extend(batch_summary["results"])
+
+                batch_index += 1
+
+                if only_dry_run:
+                    print("\n[!] DRY_RUN_ONLY enabled. Processed sample batch and exiting.")
+                    break
 
     aggregated_stats["duration_seconds"] = round(time.time() - overall_start, 2)
     summary_payload = {"stats": aggregated_stats, "results": aggregated_results}
@@ -2825,6 +7263,9 @@ def _claim_urls_batch(
         rows = response.data or []
         if not rows:
             return [], effective_worker_id
+        metrics = _get_metrics()
+        if metrics is not None:
+            metrics.inc("extractor_urls_claimed_total", len(rows))
         return rows, effective_worker_id
     except Exception as exc:
         print(f"[!] Failed to claim URLs batch: {exc}")
@@ -2905,6 +7346,12 @@ def _update_url_status(
         payload["claimed_by"] = None
         payload["claimed_at"] = None
 
+    write_queue = _get_write_queue()
+    if write_queue is not None:
+        # Written after this URL's queued product rows, with the actual saved count
+        write_queue.submit_status(url_id, payload)
+        return
+
     try:
         client.table("product_page_urls").update(payload).eq("id", url_id).execute()
     except Exception as exc:
@@ -2926,6 +7373,9 @@ def _mark_for_retry(
     next_retry = current_retry_count + 1
     will_retry = next_retry <= max_retries
     new_status = "retrying" if will_retry else "failed"
+    metrics = _get_metrics()
+    if metrics is not None:
+        metrics.inc("extractor_urls_retried_total", status=new_status)
     _update_url_status(
         url_id,
         processing_status=new_status,
@@ -2969,10 +7419,18 @@ if __name__ == "__main__":
                 thread_id = _get_thread_id()
                 print(f"[{thread_id}] [{status}] ({processed}/{total}) {result.get('url')} → {message}")
 
-            summary = runner.run_bulk(
-                manual_entries,
-                progress_callback=_manual_progress if progress_enabled else None,
-            )
+            supervisor = _ProcessSupervisor.from_env(runner.max_workers)
+            if supervisor is not None:
+                remaining_entries = iter(manual_entries)
+                summary = supervisor.run(
+                    lambda size: list(itertools.islice(remaining_entries, size)),
+                    progress_callback=_manual_progress if progress_enabled else None,
+                )
+            else:
+                summary = runner.run_bulk(
+                    manual_entries,
+                    progress_callback=_manual_progress if progress_enabled else None,
+                )
         _print_bulk_summary(summary)
     else:
         _process_url_batches(